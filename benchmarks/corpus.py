@@ -0,0 +1,93 @@
+u"""
+Generation of synthetic caption files for the benchmarks.
+
+Every cue lasts 1.5 seconds and a new one starts every 2 seconds. The rich variant adds
+cue tags and, for WebVTT, STYLE blocks, NOTE blocks and cue identifiers.
+"""
+
+from __future__ import with_statement
+from __future__ import absolute_import
+import os
+from io import open
+
+NOTE_EVERY = 50  # cues between NOTE blocks in the rich variant
+FORMATS = (u'vtt', u'srt', u'sbv')
+VARIANTS = (u'plain', u'rich')
+
+STYLES = u"""STYLE
+::cue {
+  background-color: black;
+  color: white;
+}
+
+STYLE
+::cue(.yellow) {
+  color: yellow;
+}
+
+"""
+
+
+def _timestamp(ms, separator=u'.'):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return u'{:02d}:{:02d}:{:02d}{}{:03d}'.format(hours, minutes, seconds, separator, ms)
+
+
+def iter_cues(total, rich=False):
+    u"""Yields the start, end and lines of each synthetic cue."""
+    for index in xrange(total):
+        start = index * 2000
+        if rich:
+            lines = [
+                u'<v Speaker {}>Caption <c.yellow>text</c> number {}'.format(index % 3, index),
+                u'<{}>second <b>line</b> &amp; more'.format(_timestamp(start + 750)),
+            ]
+        else:
+            lines = [u'Caption text number {}'.format(index), u'second line']
+        yield start, start + 1500, lines
+
+
+def write_vtt(f, total, rich=False):
+    f.write(u'WEBVTT\n\n')
+    if rich:
+        f.write(STYLES)
+    for index, (start, end, lines) in enumerate(iter_cues(total, rich)):
+        if rich and index % NOTE_EVERY == 0:
+            f.write(u'NOTE generated block {}\n\n'.format(index))
+        if rich:
+            f.write(u'cue-{}\n'.format(index))
+        f.write(u'{} --> {}\n'.format(_timestamp(start), _timestamp(end)))
+        f.write(u'\n'.join(lines))
+        f.write(u'\n\n')
+
+
+def write_srt(f, total, rich=False):
+    for index, (start, end, lines) in enumerate(iter_cues(total, rich), start=1):
+        f.write(u'{}\n{} --> {}\n'.format(index, _timestamp(start, u','), _timestamp(end, u',')))
+        f.write(u'\n'.join(lines))
+        f.write(u'\n\n')
+
+
+def write_sbv(f, total, rich=False):
+    for start, end, lines in iter_cues(total, rich):
+        f.write(u'{},{}\n'.format(_timestamp(start), _timestamp(end)))
+        f.write(u'\n'.join(lines))
+        f.write(u'\n\n')
+
+
+WRITERS = {
+    u'vtt': write_vtt,
+    u'srt': write_srt,
+    u'sbv': write_sbv,
+}
+
+
+def generate(directory, format, total, variant=u'plain'):
+    u"""Writes a synthetic caption file (if it does not exist yet) and returns its path."""
+    path = os.path.join(directory, u'{}-{}-{}.{}'.format(format, variant, total, format))
+    if not os.path.exists(path):
+        with open(path, u'w', encoding=u'utf-8') as f:
+            WRITERS[format](f, total, variant == u'rich')
+    return path
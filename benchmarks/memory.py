@@ -0,0 +1,97 @@
+u"""
+Memory benchmark for the caption data structures.
+
+Builds a large synthetic corpus of captions and reports the number of bytes
+used per cue by the slotted structures compared to dict backed equivalents.
+
+Usage:
+  python -m benchmarks.memory [<cues>]
+"""
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import gc
+import sys
+import resource
+import multiprocessing
+
+from webvtt.structures import Caption
+
+DEFAULT_CUES = 200000
+
+
+def _without_slots(cls):
+    u"""Returns a copy of the class storing its attributes in a __dict__."""
+    namespace = dict(
+        (name, value) for name, value in cls.__dict__.items()
+        if name not in cls.__slots__ and name != u'__slots__'
+    )
+    return type(cls.__name__, (object,), namespace)
+
+
+DictCaption = _without_slots(Caption)
+
+
+def _build_corpus(cls, total):
+    return [
+        cls(index * 2000, index * 2000 + 1500, [u'Caption text #{}'.format(index)])
+        for index in xrange(total)
+    ]
+
+
+def _shallow_size(caption):
+    size = sys.getsizeof(caption)
+    if hasattr(caption, u'__dict__'):
+        size += sys.getsizeof(caption.__dict__)
+    return size
+
+
+def max_rss_bytes():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == u'darwin' else rss * 1024
+
+
+def _measure_rss(cls, total, queue):
+    gc.collect()
+    before = max_rss_bytes()
+    corpus = _build_corpus(cls, total)
+    queue.put((max_rss_bytes() - before) / len(corpus))
+
+
+def measure_rss(cls, total):
+    u"""Returns the resident memory growth per cue measured in a fresh process."""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure_rss, args=(cls, total, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run(total=DEFAULT_CUES):
+    results = {}
+    for name, cls in ((u'slots', Caption), (u'dict', DictCaption)):
+        results[name] = {
+            u'object_bytes': _shallow_size(_build_corpus(cls, 1)[0]),
+            u'rss_bytes_per_cue': measure_rss(cls, total),
+        }
+    return results
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CUES
+    results = run(total)
+
+    print(u'{} cues'.format(total))
+    print(u'{:<8}{:>16}{:>16}'.format(u'', u'object bytes', u'RSS bytes/cue'))
+    for name in (u'dict', u'slots'):
+        print(u'{:<8}{:>16}{:>16.1f}'.format(
+            name, results[name][u'object_bytes'], results[name][u'rss_bytes_per_cue']))
+    print(u'saved {:.1f} bytes per cue'.format(
+        results[u'dict'][u'rss_bytes_per_cue'] - results[u'slots'][u'rss_bytes_per_cue']))
+
+
+if __name__ == u'__main__':
+    main()
@@ -0,0 +1,218 @@
+u"""
+Benchmarks for the parsers, writers and segmenter.
+
+Every case runs in a separate process on synthetic corpora of several sizes and reports
+the best time of the repetitions and the peak memory of the process as JSON, so results
+can be compared between commits.
+
+Usage:
+  python -m benchmarks.run [--sizes=1000,100000,1000000] [--cases=<names>] [--repeat=N]
+                           [--corpus-dir=<dir>] [--output=<file>] [--compare=<file>]
+
+Available cases: parse_vtt, parse_srt, parse_sbv, write_vtt, write_srt, segment, load_binary.
+"""
+
+from __future__ import print_function
+from __future__ import with_statement
+from __future__ import division
+from __future__ import absolute_import
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from io import open
+
+from webvtt.parsers import WebVTTParser, SRTParser, SBVParser
+from webvtt.writers import WebVTTWriter, SRTWriter
+from webvtt.segmenter import WebVTTSegmenter
+from webvtt.webvtt import WebVTT
+
+from . import corpus
+from .memory import max_rss_bytes
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+
+def _parse(parser_class, format):
+    def case(context):
+        path = context[u'corpus'](format)
+        with context[u'timer']:
+            captions = parser_class().read(path).captions
+        return len(captions)
+    return case
+
+
+def _write(writer_class, extension):
+    def case(context):
+        captions = WebVTTParser().read(context[u'corpus'](u'vtt')).captions
+        output = os.path.join(context[u'workdir'], u'output.' + extension)
+        with open(output, u'w', encoding=u'utf-8') as f:
+            with context[u'timer']:
+                writer_class().write(captions, f)
+        return len(captions)
+    return case
+
+
+def _segment(context):
+    vtt = WebVTT.read(context[u'corpus'](u'vtt'))
+    with context[u'timer']:
+        WebVTTSegmenter().segment(vtt, os.path.join(context[u'workdir'], u'segments'))
+    return len(vtt.captions)
+
+
+def _load_binary(context):
+    path = os.path.join(context[u'workdir'], u'captions.vttb')
+    WebVTT.read(context[u'corpus'](u'vtt')).save_binary(path)
+    with context[u'timer']:
+        captions = WebVTT.load_binary(path).captions
+    return len(captions)
+
+
+CASES = {
+    u'parse_vtt': _parse(WebVTTParser, u'vtt'),
+    u'parse_srt': _parse(SRTParser, u'srt'),
+    u'parse_sbv': _parse(SBVParser, u'sbv'),
+    u'write_vtt': _write(WebVTTWriter, u'vtt'),
+    u'write_srt': _write(SRTWriter, u'srt'),
+    u'segment': _segment,
+    u'load_binary': _load_binary,
+}
+
+
+class Timer(object):
+    u"""Context manager measuring the elapsed time and the memory growth of a block."""
+
+    def __enter__(self):
+        self.rss_before = max_rss_bytes()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = time.time() - self.start
+        self.rss_growth = max_rss_bytes() - self.rss_before
+
+
+def _run_case(name, corpus_dir, size, variant, queue):
+    workdir = tempfile.mkdtemp(prefix=u'webvtt-benchmark-')
+    timer = Timer()
+    context = {
+        u'corpus': lambda format: corpus.generate(corpus_dir, format, size, variant),
+        u'workdir': workdir,
+        u'timer': timer,
+    }
+    try:
+        captions = CASES[name](context)
+        queue.put({
+            u'seconds': timer.elapsed,
+            u'captions': captions,
+            u'peak_rss_bytes': max_rss_bytes(),
+            u'rss_growth_bytes': timer.rss_growth,
+        })
+    finally:
+        shutil.rmtree(workdir)
+
+
+def run_case(name, corpus_dir, size, variant, repeat=3):
+    u"""Runs a case in fresh processes and returns the best measurement."""
+    # the corpora are generated beforehand so it is not accounted in the measurements
+    for format in corpus.FORMATS:
+        corpus.generate(corpus_dir, format, size, variant)
+
+    best = None
+    for _ in xrange(repeat):
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run_case, args=(name, corpus_dir, size, variant, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        if best is None or result[u'seconds'] < best[u'seconds']:
+            best = result
+
+    best.update({
+        u'case': name,
+        u'size': size,
+        u'variant': variant,
+        u'captions_per_second': best[u'captions'] / best[u'seconds'] if best[u'seconds'] else None,
+    })
+    return best
+
+
+def _revision():
+    try:
+        return subprocess.check_output(
+            [u'git', u'rev-parse', u'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=open(os.devnull, u'wb')
+        ).strip().decode(u'ascii')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    u"""Prints the time ratio of each case against a previous run."""
+    previous = dict(
+        ((r[u'case'], r[u'size'], r[u'variant']), r) for r in baseline[u'results']
+    )
+    for result in results[u'results']:
+        key = (result[u'case'], result[u'size'], result[u'variant'])
+        if key in previous:
+            print(u'{:<10} {:>8} {:<6} {:6.2f}x time {:6.2f}x memory'.format(
+                result[u'case'], result[u'size'], result[u'variant'],
+                result[u'seconds'] / previous[key][u'seconds'],
+                result[u'peak_rss_bytes'] / previous[key][u'peak_rss_bytes']), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=u'webvtt-py benchmarks')
+    parser.add_argument(u'--sizes', default=u','.join(map(unicode, DEFAULT_SIZES)))
+    parser.add_argument(u'--cases', default=u','.join(sorted(CASES)))
+    parser.add_argument(u'--variants', default=u','.join(corpus.VARIANTS))
+    parser.add_argument(u'--repeat', type=int, default=3)
+    parser.add_argument(u'--corpus-dir', help=u'directory where the generated corpora are kept')
+    parser.add_argument(u'--output', help=u'write the JSON results to a file instead of stdout')
+    parser.add_argument(u'--compare', help=u'JSON results of a previous run to compare with')
+    options = parser.parse_args(argv)
+
+    corpus_dir = options.corpus_dir or tempfile.mkdtemp(prefix=u'webvtt-corpus-')
+    if not os.path.exists(corpus_dir):
+        os.makedirs(corpus_dir)
+
+    results = {
+        u'revision': _revision(),
+        u'python': platform.python_version(),
+        u'platform': platform.platform(),
+        u'timestamp': time.time(),
+        u'results': [],
+    }
+    try:
+        for size in [int(size) for size in options.sizes.split(u',')]:
+            for variant in options.variants.split(u','):
+                for name in options.cases.split(u','):
+                    result = run_case(name, corpus_dir, size, variant, options.repeat)
+                    print(u'{case:<10} {size:>8} {variant:<6} {seconds:10.4f}s {peak_rss_bytes:>12}B'.format(
+                        **result), file=sys.stderr)
+                    results[u'results'].append(result)
+    finally:
+        if not options.corpus_dir:
+            shutil.rmtree(corpus_dir)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, u'w', encoding=u'utf-8') as f:
+            f.write(unicode(output))
+    else:
+        print(output)
+
+    if options.compare:
+        with open(options.compare, encoding=u'utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == u'__main__':
+    main()
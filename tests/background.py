@@ -0,0 +1,76 @@
+from __future__ import with_statement
+from __future__ import absolute_import
+import os
+import threading
+from shutil import rmtree
+
+import webvtt
+from webvtt import WebVTT, WebVTTSegmenter
+from webvtt import background
+from io import open
+
+from .generic import GenericParserTestCase
+
+BASE_DIR = os.path.dirname(__file__)
+OUTPUT_DIR = os.path.join(BASE_DIR, u'output')
+
+
+class BackgroundTestCase(GenericParserTestCase):
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_DIR):
+            rmtree(OUTPUT_DIR)
+
+    def test_aread(self):
+        vtt = webvtt.aread(self._get_file(u'sample.vtt')).get(5)
+        self.assertIsInstance(vtt, WebVTT)
+        self.assertEqual(len(vtt.captions), 16)
+
+    def test_aread_callback(self):
+        done = threading.Event()
+        results = []
+
+        def callback(vtt):
+            results.append(vtt)
+            done.set()
+
+        WebVTT.aread(self._get_file(u'sample.vtt'), callback=callback)
+        done.wait(5)
+        self.assertEqual(len(results[0].captions), 16)
+
+    def test_aread_error(self):
+        result = webvtt.aread(self._get_file(u'invalid.vtt'))
+        self.assertRaises(webvtt.MalformedFileError, result.get, 5)
+
+    def test_asave(self):
+        os.makedirs(OUTPUT_DIR)
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+
+        vtt.asave(os.path.join(OUTPUT_DIR, u'sample.vtt')).get(5)
+        vtt.asave_as_srt(os.path.join(OUTPUT_DIR, u'sample.srt')).get(5)
+
+        self.assertEqual(len(webvtt.read(os.path.join(OUTPUT_DIR, u'sample.vtt')).captions), 16)
+        self.assertEqual(len(webvtt.from_srt(os.path.join(OUTPUT_DIR, u'sample.srt')).captions), 16)
+
+    def test_asegment_concurrent_writes(self):
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        sequential = os.path.join(OUTPUT_DIR, u'sequential')
+        concurrent = os.path.join(OUTPUT_DIR, u'concurrent')
+
+        WebVTTSegmenter().segment(vtt, sequential)
+        segmenter = WebVTTSegmenter()
+        segmenter.asegment(vtt, concurrent, workers=3).get(5)
+
+        self.assertEqual(segmenter.total_segments, 7)
+        self.assertListEqual(sorted(os.listdir(concurrent)), sorted(os.listdir(sequential)))
+        for name in os.listdir(sequential):
+            with open(os.path.join(sequential, name), encoding=u'utf-8') as expected:
+                with open(os.path.join(concurrent, name), encoding=u'utf-8') as f:
+                    self.assertEqual(f.read(), expected.read())
+
+    def test_run_bounded_raises_first_error(self):
+        def fail(item):
+            if item == 3:
+                raise ValueError(item)
+
+        self.assertRaises(ValueError, background.run_bounded, fail, xrange(10), 2)
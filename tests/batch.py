@@ -0,0 +1,139 @@
+from __future__ import absolute_import
+import os
+from shutil import rmtree, copyfile
+from io import open
+
+from webvtt import WebVTT
+from webvtt.batch import convert_files, expand_paths
+
+from .generic import GenericParserTestCase
+
+
+BASE_DIR = os.path.dirname(__file__)
+OUTPUT_DIR = os.path.join(BASE_DIR, u'output')
+
+
+class BatchConversionTestCase(GenericParserTestCase):
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_DIR):
+            rmtree(OUTPUT_DIR)
+
+    def test_expand_paths(self):
+        paths = expand_paths([self._get_file(u'*.sbv')])
+        self.assertListEqual(
+            [os.path.basename(path) for path in paths],
+            [u'invalid_format.sbv', u'invalid_timeframe.sbv', u'missing_caption_text.sbv',
+             u'missing_timeframe.sbv', u'sample.sbv', u'two_captions.sbv']
+        )
+
+    def test_convert_files(self):
+        paths = [self._get_file(u'sample.srt'), self._get_file(u'two_captions.sbv')]
+        result = convert_files(paths, OUTPUT_DIR, workers=1)
+
+        self.assertListEqual(result.converted, paths)
+        self.assertListEqual(result.failures, [])
+        self.assertEqual(result.total_captions, 7)
+        self.assertTrue(os.path.exists(os.path.join(OUTPUT_DIR, u'sample.vtt')))
+        self.assertTrue(os.path.exists(os.path.join(OUTPUT_DIR, u'two_captions.vtt')))
+
+    def test_convert_files_to_srt(self):
+        convert_files([self._get_file(u'sample.vtt')], OUTPUT_DIR, format=u'srt', workers=1)
+        self.assertTrue(os.path.exists(os.path.join(OUTPUT_DIR, u'sample.srt')))
+
+    def test_convert_files_detect_format(self):
+        os.makedirs(OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'captions.txt')
+        copyfile(self._get_file(u'sample.srt'), path)
+
+        result = convert_files([path], workers=1)
+        self.assertEqual(len(result.failures), 1)
+
+        result = convert_files([path], workers=1, detect=True)
+        self.assertListEqual(result.converted, [path])
+        self.assertEqual(result.total_captions, 5)
+        self.assertTrue(os.path.exists(os.path.join(OUTPUT_DIR, u'captions.vtt')))
+
+    def test_convert_never_overwrites_source(self):
+        os.makedirs(OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'comments.vtt')
+        copyfile(self._get_file(u'comments.vtt'), path)
+        with open(path, u'rb') as f:
+            content = f.read()
+
+        result = convert_files([path], workers=1)
+        self.assertListEqual(result.converted, [])
+        self.assertEqual(
+            result.failures,
+            [(path, u'IOError: The output would overwrite the source file, choose another output directory.')]
+        )
+        with open(path, u'rb') as f:
+            self.assertEqual(f.read(), content)
+
+        # converting to another format next to the source is allowed
+        result = convert_files([path], format=u'srt', workers=1)
+        self.assertListEqual(result.converted, [path])
+
+    def test_convert_files_same_output(self):
+        os.makedirs(OUTPUT_DIR)
+        srt = os.path.join(OUTPUT_DIR, u'captions.srt')
+        vtt = os.path.join(OUTPUT_DIR, u'captions.vtt')
+        copyfile(self._get_file(u'sample.srt'), srt)
+        copyfile(self._get_file(u'two_captions.sbv'), os.path.join(OUTPUT_DIR, u'captions.sbv'))
+        output = os.path.join(OUTPUT_DIR, u'converted')
+        errors = []
+
+        result = convert_files(
+            [srt, os.path.join(OUTPUT_DIR, u'captions.sbv')],
+            output,
+            workers=2,
+            callback=lambda path, error: errors.append(error)
+        )
+        self.assertListEqual(result.converted, [srt])
+        self.assertEqual(
+            result.failures,
+            [(os.path.join(OUTPUT_DIR, u'captions.sbv'),
+              u'IOError: The output would overwrite the output of {}.'.format(srt))]
+        )
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(len(WebVTT.read(os.path.join(output, u'captions.vtt')).captions), 5)
+        self.assertFalse(os.path.exists(vtt))
+
+    def test_failures_do_not_abort(self):
+        paths = [
+            self._get_file(u'invalid_format1.srt'),
+            self._get_file(u'missing_timeframe.vtt'),
+            self._get_file(u'one_caption.vtt'),
+            os.path.join(BASE_DIR, u'generic.py'),
+        ]
+        result = convert_files(paths, OUTPUT_DIR, workers=2)
+
+        self.assertListEqual(result.converted, [self._get_file(u'one_caption.vtt')])
+        self.assertEqual(result.total_captions, 1)
+        self.assertDictEqual(
+            dict(result.failures),
+            {
+                self._get_file(u'invalid_format1.srt'):
+                    u'MalformedFileError: The file does not have a valid format.',
+                self._get_file(u'missing_timeframe.vtt'):
+                    u'MalformedCaptionError: Standalone cue identifier in line 6.',
+                os.path.join(BASE_DIR, u'generic.py'):
+                    u'MalformedFileError: Unsupported file format: .py',
+            }
+        )
+
+    def test_throughput(self):
+        result = convert_files([self._get_file(u'sample.vtt')], OUTPUT_DIR, workers=1)
+        self.assertEqual(result.total_files, 1)
+        self.assertGreater(result.files_per_second, 0)
+        self.assertGreater(result.captions_per_second, 0)
+        self.assertGreater(result.megabytes_per_second, 0)
+
+    def test_invalid_format(self):
+        self.assertRaises(
+            ValueError,
+            convert_files,
+            [self._get_file(u'sample.vtt')],
+            OUTPUT_DIR,
+            u'sbv'
+        )
@@ -0,0 +1,106 @@
+from __future__ import with_statement
+from __future__ import absolute_import
+import os
+import struct
+from shutil import rmtree
+
+import webvtt
+from webvtt import WebVTT, Caption, MemorySink
+from webvtt import binary
+from webvtt.errors import MalformedFileError
+
+from .generic import GenericParserTestCase
+
+BASE_DIR = os.path.dirname(__file__)
+OUTPUT_DIR = os.path.join(BASE_DIR, u'output')
+
+
+def _rows(vtt):
+    return [(c.start_ms, c.end_ms, c.lines, c.identifier, c.raw_settings) for c in vtt.captions]
+
+
+class BinaryTestCase(GenericParserTestCase):
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_DIR):
+            rmtree(OUTPUT_DIR)
+
+    def test_round_trip(self):
+        for filename in (u'sample.vtt', u'using_identifiers.vtt', u'cue_settings.vtt', u'regions.vtt'):
+            vtt = webvtt.read(self._get_file(filename))
+            loaded = WebVTT.load_binary(vtt.to_binary())
+            self.assertListEqual(_rows(loaded), _rows(vtt))
+            self.assertListEqual([s.lines for s in loaded.styles], [s.lines for s in vtt.styles])
+            self.assertListEqual([r.text for r in loaded.regions], [r.text for r in vtt.regions])
+
+    def test_save_and_load_file(self):
+        os.makedirs(OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'sample.vttb')
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        vtt.save_binary(path)
+
+        loaded = WebVTT.load_binary(path)
+        self.assertEqual(loaded.file, path)
+        self.assertListEqual(_rows(loaded), _rows(vtt))
+
+        # byte string paths are kept too so the document can be saved again
+        self.assertEqual(WebVTT.load_binary(path.encode(u'utf-8')).file, path)
+
+    def test_timings_after_close(self):
+        os.makedirs(OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'sample.vttb')
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        vtt.save_binary(path)
+
+        with binary.load(path) as document:
+            starts, ends = document.starts, document.ends
+        self.assertListEqual(list(starts[:3]), [c.start_ms for c in vtt.captions[:3]])
+        self.assertListEqual(list(ends), [c.end_ms for c in vtt.captions])
+
+    def test_save_to_sink(self):
+        sink = MemorySink()
+        webvtt.read(self._get_file(u'sample.vtt')).save_binary(sink)
+        self.assertEqual(len(WebVTT.load_binary(sink.files[u'sample.vttb']).captions), 16)
+
+    def test_document_access(self):
+        vtt = webvtt.read(self._get_file(u'using_identifiers.vtt'))
+        with binary.load(vtt.to_binary()) as document:
+            self.assertEqual(len(document), len(vtt.captions))
+            self.assertListEqual(list(document.starts), [c.start_ms for c in vtt.captions])
+            self.assertListEqual(list(document.ends), [c.end_ms for c in vtt.captions])
+            self.assertEqual(document.text(1), vtt.captions[1].raw_text)
+            self.assertEqual(document.identifier(1), vtt.captions[1].identifier)
+            self.assertIsNone(document.settings(1))
+            self.assertEqual(unicode(document.caption(2)), unicode(vtt.captions[2]))
+
+            table = document.to_table()
+            self.assertListEqual(list(table.starts), [c.start_ms for c in vtt.captions])
+            self.assertListEqual(table.identifiers, [c.identifier for c in vtt.captions])
+
+    def test_shared_strings(self):
+        captions = [Caption(i * 1000, i * 1000 + 500, [u'Same text']) for i in xrange(100)]
+        for caption in captions:
+            caption.raw_settings = u'align:left'
+        data = WebVTT(captions=captions).to_binary()
+        self.assertLess(data.count(b'Same text'), 2)
+        self.assertEqual(data.count(b'align:left'), 1)
+
+    def test_strings_with_null_characters(self):
+        vtt = WebVTT(captions=[Caption(0, 1000, [u'a\0b']), Caption(1000, 2000, [u'\xe9t\xe9'])])
+        loaded = WebVTT.load_binary(vtt.to_binary())
+        self.assertListEqual(_rows(loaded), _rows(vtt))
+
+    def test_empty_document(self):
+        loaded = WebVTT.load_binary(WebVTT().to_binary())
+        self.assertListEqual(loaded.captions, [])
+
+    def test_invalid_data(self):
+        data = webvtt.read(self._get_file(u'sample.vtt')).to_binary()
+        self.assertRaises(MalformedFileError, WebVTT.load_binary, b'WEBVTT\0')
+        self.assertRaises(MalformedFileError, WebVTT.load_binary, b'XXXX' + data[4:])
+        self.assertRaises(MalformedFileError, WebVTT.load_binary, data[:100])
+        self.assertRaises(
+            MalformedFileError,
+            WebVTT.load_binary,
+            data[:4] + struct.pack(u'<H', 99) + data[6:]
+        )
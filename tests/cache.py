@@ -0,0 +1,132 @@
+from __future__ import with_statement
+from __future__ import absolute_import
+import io
+import os
+from shutil import rmtree, copy
+
+import webvtt
+from webvtt import cache
+from webvtt.errors import MalformedFileError
+
+from .generic import GenericParserTestCase
+
+BASE_DIR = os.path.dirname(__file__)
+OUTPUT_DIR = os.path.join(BASE_DIR, u'output')
+
+
+class CacheTestCase(GenericParserTestCase):
+
+    def setUp(self):
+        cache.enable()
+
+    def tearDown(self):
+        cache.disable()
+        if os.path.exists(OUTPUT_DIR):
+            rmtree(OUTPUT_DIR)
+
+    def test_read_from_cache(self):
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        cached = webvtt.read(self._get_file(u'sample.vtt'))
+
+        self.assertEqual(cache.stats(), cache.CacheStats(hits=1, misses=1, entries=1, bytes=os.path.getsize(
+            self._get_file(u'sample.vtt'))))
+        self.assertListEqual([unicode(c) for c in cached.captions], [unicode(c) for c in vtt.captions])
+        self.assertIsNot(cached.captions[0], vtt.captions[0])
+        self.assertEqual(cached.file, self._get_file(u'sample.vtt'))
+
+    def test_cached_captions_are_copies(self):
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        vtt.captions[0].lines.append(u'Changed')
+        vtt.captions[1].start = u'00:01:00.000'
+
+        cached = webvtt.read(self._get_file(u'sample.vtt'))
+        cached.captions[2].text = u'Changed'
+
+        cached = webvtt.read(self._get_file(u'sample.vtt'))
+        self.assertListEqual(cached.captions[0].lines, [u'Caption text #1'])
+        self.assertEqual(cached.captions[1].start, u'00:00:07.000')
+        self.assertEqual(cached.captions[2].text, u'Caption text #3')
+
+    def test_styles_and_regions(self):
+        vtt = webvtt.read(self._get_file(u'regions.vtt'))
+        cached = webvtt.read(self._get_file(u'regions.vtt'))
+
+        self.assertEqual(cache.stats().hits, 1)
+        self.assertListEqual([s.lines for s in cached.styles], [s.lines for s in vtt.styles])
+        self.assertListEqual([r.text for r in cached.regions], [r.text for r in vtt.regions])
+        self.assertEqual(cached.captions[0].raw_settings, u'region:fred align:left')
+        self.assertIs(cached.region(cached.captions[0]), cached.regions[0])
+
+    def test_formats_cached_separately(self):
+        webvtt.from_srt(self._get_file(u'sample.srt'))
+        webvtt.from_sbv(self._get_file(u'sample.sbv'))
+        vtt = webvtt.from_srt(self._get_file(u'sample.srt'))
+
+        self.assertEqual(cache.stats().hits, 1)
+        self.assertEqual(cache.stats().entries, 2)
+        self.assertIsNone(vtt.styles)
+
+    def test_modified_file_is_parsed_again(self):
+        os.makedirs(OUTPUT_DIR)
+        copy(self._get_file(u'one_caption.vtt'), OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'one_caption.vtt')
+
+        webvtt.read(path)
+        with io.open(path, u'a', encoding=u'utf-8') as f:
+            f.write(u'\n\n00:00:10.000 --> 00:00:11.000\nNew caption\n')
+        vtt = webvtt.read(path)
+
+        self.assertEqual(cache.stats().hits, 0)
+        self.assertEqual(vtt.captions[-1].text, u'New caption')
+
+    def test_content_keyed_by_hash(self):
+        with io.open(self._get_file(u'sample.vtt'), u'rb') as f:
+            content = f.read()
+
+        webvtt.read(content)
+        webvtt.read(bytearray(content))
+        webvtt.read(content.decode(u'utf-8'))
+        self.assertEqual(cache.stats().hits, 2)
+
+    def test_file_objects_not_cached(self):
+        for _ in xrange(2):
+            with io.open(self._get_file(u'sample.vtt'), u'rb') as f:
+                webvtt.read(f)
+        self.assertEqual(cache.stats(), cache.CacheStats(0, 0, 0, 0))
+
+    def test_errors_not_cached(self):
+        self.assertRaises(MalformedFileError, webvtt.read, self._get_file(u'invalid.vtt'))
+        self.assertEqual(cache.stats().entries, 0)
+
+    def test_lru_eviction(self):
+        cache.enable(max_entries=2)
+        webvtt.read(self._get_file(u'sample.vtt'))
+        webvtt.read(self._get_file(u'one_caption.vtt'))
+        webvtt.read(self._get_file(u'sample.vtt'))
+        webvtt.read(self._get_file(u'styles.vtt'))  # evicts one_caption.vtt
+
+        webvtt.read(self._get_file(u'sample.vtt'))
+        webvtt.read(self._get_file(u'one_caption.vtt'))
+        self.assertEqual(cache.stats().hits, 2)
+        self.assertEqual(cache.stats().misses, 4)
+
+    def test_max_bytes(self):
+        cache.enable(max_bytes=os.path.getsize(self._get_file(u'sample.vtt')))
+        webvtt.read(self._get_file(u'sample.vtt'))
+        self.assertEqual(cache.stats().entries, 1)
+        webvtt.read(self._get_file(u'one_caption.vtt'))
+        self.assertEqual(cache.stats().entries, 1)
+
+        cache.enable(max_bytes=10)
+        self.assertEqual(cache.stats().entries, 0)
+
+    def test_disable_and_clear(self):
+        webvtt.read(self._get_file(u'sample.vtt'))
+        cache.clear()
+        self.assertEqual(cache.stats(), cache.CacheStats(0, 0, 0, 0))
+        self.assertTrue(cache.is_enabled())
+
+        cache.disable()
+        webvtt.read(self._get_file(u'sample.vtt'))
+        self.assertFalse(cache.is_enabled())
+        self.assertEqual(cache.stats(), cache.CacheStats(0, 0, 0, 0))
@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+import random
+
+import webvtt
+from webvtt import Caption, CaptionIndex
+from webvtt.structures import CaptionList
+
+from .generic import GenericParserTestCase
+
+
+class CaptionIndexTestCase(GenericParserTestCase):
+
+    def setUp(self):
+        self.vtt = webvtt.read(self._get_file(u'sample.vtt'))
+
+    def test_at(self):
+        self.assertListEqual(self.vtt.at(7500), [self.vtt.captions[1]])
+        self.assertListEqual(self.vtt.at(7000), [self.vtt.captions[1]])
+        self.assertListEqual(self.vtt.at(6999.5), [self.vtt.captions[0]])
+        self.assertListEqual(self.vtt.at(100), [])
+        self.assertListEqual(self.vtt.at(3600000), [])
+
+    def test_between(self):
+        self.assertListEqual(self.vtt.between(6000, 12000), self.vtt.captions[0:3])
+        self.assertListEqual(self.vtt.between(7000, 11890), [self.vtt.captions[1]])
+        self.assertListEqual(self.vtt.between(0, 500), [])
+
+    def test_overlapping_captions(self):
+        vtt = webvtt.WebVTT(captions=[
+            Caption(0, 60000, u'Long caption'),
+            Caption(5000, 6000, u'Short caption'),
+            Caption(2000, 4000, u'Unsorted caption'),
+        ])
+        self.assertListEqual(
+            [c.text for c in vtt.at(5500)],
+            [u'Long caption', u'Short caption']
+        )
+        self.assertListEqual(
+            [c.text for c in vtt.between(3000, 5001)],
+            [u'Long caption', u'Unsorted caption', u'Short caption']
+        )
+
+    def test_index_invalidated_when_captions_change(self):
+        self.assertListEqual(self.vtt.at(70000), [])
+
+        self.vtt.captions.append(Caption(u'00:01:08.000', u'00:01:12.000', u'New caption'))
+        self.assertEqual(self.vtt.at(70000)[0].text, u'New caption')
+
+        del self.vtt.captions[-1]
+        self.assertListEqual(self.vtt.at(70000), [])
+
+    def test_index_invalidated_when_timing_changes(self):
+        index = self.vtt.index
+        self.vtt.captions[0].end = u'00:00:08.000'
+        self.assertIsNot(self.vtt.index, index)
+        self.assertListEqual(self.vtt.at(7500), self.vtt.captions[0:2])
+
+    def test_index_reused(self):
+        self.assertIs(self.vtt.index, self.vtt.index)
+
+    def test_index_not_rebuilt_by_other_documents(self):
+        index = self.vtt.index
+        Caption(0, 1000, u'x')
+        other = webvtt.read(self._get_file(u'one_caption.vtt'))
+        self.assertIs(self.vtt.index, index)
+
+        # a timing change of a caption from another document does not rebuild the index
+        other.captions[0].start_ms = 100
+        self.assertIs(self.vtt.index, index)
+
+    def test_caption_list_not_copied(self):
+        captions = CaptionList([Caption(0, 1000, u'x')])
+        self.assertIs(webvtt.WebVTT(captions=captions).captions, captions)
+
+    def test_matches_linear_scan(self):
+        generator = random.Random(0)
+        captions = []
+        for _ in range(500):
+            start = generator.randint(0, 100000)
+            captions.append(Caption(start, start + generator.randint(0, 10000)))
+        index = CaptionIndex(captions)
+
+        for _ in range(200):
+            start = generator.randint(0, 110000)
+            end = start + generator.randint(1, 5000)
+            self.assertEqual(
+                set(index.between(start, end)),
+                set(c for c in captions if c.start_ms < end and c.end_ms > start)
+            )
+            self.assertEqual(
+                set(index.at(start)),
+                set(c for c in captions if c.start_ms <= start < c.end_ms)
+            )
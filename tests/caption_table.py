@@ -0,0 +1,83 @@
+from __future__ import absolute_import
+import io
+
+import webvtt
+from webvtt import CaptionTable
+
+from .generic import GenericParserTestCase
+
+
+class CaptionTableTestCase(GenericParserTestCase):
+
+    def setUp(self):
+        self.vtt = webvtt.read(self._get_file(u'using_identifiers.vtt'))
+        self.table = self.vtt.to_table()
+
+    def test_to_table(self):
+        self.assertEqual(len(self.table), 6)
+        self.assertEqual(list(self.table.starts[:2]), [500, 7000])
+        self.assertEqual(list(self.table.ends[:2]), [7000, 11890])
+        self.assertEqual(self.table.texts[0], u'Caption text #1')
+        self.assertEqual(self.table.identifiers[1], u'second caption')
+
+    def test_round_trip(self):
+        out = io.StringIO()
+        webvtt.WebVTT.from_table(self.table).write(out)
+
+        expected = io.StringIO()
+        self.vtt.write(expected)
+
+        self.assertEqual(out.getvalue(), expected.getvalue())
+
+    def test_shift(self):
+        table = self.table.shift(-1000)
+        self.assertEqual(list(table.starts[:2]), [0, 6000])
+        self.assertEqual(list(table.ends[:2]), [6000, 10890])
+        # the original table is not modified
+        self.assertEqual(self.table.starts[0], 500)
+
+    def test_scale(self):
+        table = self.table.scale(23.976 / 25)
+        captions = webvtt.WebVTT.from_table(table).captions
+        self.assertEqual(captions[0].start, u'00:00:00.480')
+        self.assertEqual(captions[0].end, u'00:00:06.713')
+
+    def test_scale_anchor(self):
+        table = self.table.scale(2, anchor=1000)
+        self.assertEqual(list(table.starts[:2]), [0, 13000])
+        self.assertEqual(list(table.ends[:2]), [13000, 22780])
+
+    def test_scale_invalid_factor(self):
+        self.assertRaises(ValueError, self.table.scale, 0)
+        self.assertRaises(ValueError, self.table.scale, -1)
+
+    def test_retime(self):
+        table = self.table.retime([(0, 0), (10000, 11000)])
+        self.assertEqual(list(table.starts[:3]), [550, 7700, 13079])
+        self.assertEqual(self.table.starts[2], 11890)
+
+    def test_clip(self):
+        table = self.table.clip(10000, 20000)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(list(table.starts), [10000, 11890, 16320])
+        self.assertEqual(list(table.ends), [11890, 16320, 20000])
+        self.assertEqual(table.identifiers, [u'second caption', None, u'4'])
+
+    def test_filter(self):
+        table = self.table.filter([end - start > 4000 for start, end in zip(self.table.starts, self.table.ends)])
+        self.assertEqual(table.texts, [u'Caption text #1', u'Caption text #2', u'Caption text #3', u'Caption text #4'])
+
+    def test_columns_length_mismatch(self):
+        self.assertRaises(
+            ValueError,
+            CaptionTable,
+            [0, 1000],
+            [1000],
+            [u'Caption text']
+        )
+
+    def test_round_trip_cue_settings(self):
+        vtt = webvtt.read(self._get_file(u'cue_settings.vtt'))
+        captions = webvtt.WebVTT.from_table(vtt.to_table().shift(1000)).captions
+        self.assertEqual(captions[0].raw_settings, u'align:start position:10%')
+        self.assertIsNone(captions[2].raw_settings)
@@ -0,0 +1,84 @@
+from __future__ import absolute_import
+
+import webvtt
+from webvtt import Caption
+from webvtt import cuetext
+
+from .generic import GenericParserTestCase
+
+
+class CueTextTestCase(GenericParserTestCase):
+
+    def test_tokenize(self):
+        self.assertListEqual(
+            list(cuetext.tokenize(u'<v.loud Roger Bingham>Hi <00:01.500>&amp; bye</v>')),
+            [
+                (cuetext.START_TAG, u'v', (u'loud',), u'Roger Bingham'),
+                (cuetext.TEXT, u'Hi '),
+                (cuetext.TIMESTAMP, 1500),
+                (cuetext.TEXT, u'& bye'),
+                (cuetext.END_TAG, u'v'),
+            ]
+        )
+
+    def test_unescape(self):
+        self.assertEqual(
+            cuetext.unescape(u'&lt;b&gt; &#65;&#x42; &nbsp;&unknown; & done'),
+            u'<b> AB \xa0&unknown; & done'
+        )
+
+    def test_parse_tree(self):
+        tree = cuetext.parse(u'<c.yellow.bg_blue>one <b>two</b></c><i>three')
+        self.assertIsNone(tree.tag)
+        c, i = tree.children
+        self.assertEqual(c.tag, u'c')
+        self.assertTupleEqual(c.classes, (u'yellow', u'bg_blue'))
+        self.assertEqual(c.children[0], u'one ')
+        self.assertEqual(c.children[1].tag, u'b')
+        self.assertEqual(i.tag, u'i')
+        self.assertEqual(tree.text, u'one twothree')
+
+    def test_parse_ruby(self):
+        tree = cuetext.parse(u'<ruby>\u6f22<rt>kan</ruby>!')
+        ruby = tree.children[0]
+        self.assertEqual(ruby.children[1].tag, u'rt')
+        self.assertEqual(tree.children[1], u'!')
+
+    def test_parse_ignores_unknown_and_unmatched_tags(self):
+        tree = cuetext.parse(u'<foo>a</b>b</foo><rt>c')
+        self.assertListEqual(tree.children, [u'a', u'b', u'c'])
+
+    def test_unterminated_tag_is_text(self):
+        self.assertEqual(Caption(text=u'1 < 2').text, u'1 < 2')
+
+    def test_caption_text_decodes_entities(self):
+        self.assertEqual(Caption(text=u'<i>Tom &amp; Jerry</i>').text, u'Tom & Jerry')
+
+    def test_caption_speakers(self):
+        vtt = webvtt.read(self._get_file(u'cue_tags.vtt'))
+        self.assertListEqual(vtt.captions[0].speakers, [])
+
+        caption = Caption(text=u'<v Mary>Hi</v>\n<v.loud John>Hello')
+        self.assertListEqual(caption.speakers, [u'Mary', u'John'])
+        self.assertEqual(caption.text, u'Hi\nHello')
+
+    def test_caption_cache(self):
+        caption = Caption(text=u'<b>bold</b>')
+        tree = caption.tree
+        self.assertIs(caption.tree, tree)
+        self.assertEqual(caption.text, u'bold')
+
+        caption.text = u'<i>italic</i>'
+        self.assertIsNot(caption.tree, tree)
+        self.assertEqual(caption.text, u'italic')
+
+        caption.lines.append(u'<u>more</u>')
+        self.assertEqual(caption.text, u'italic\nmore')
+
+        caption.lines[1] = u'less'
+        self.assertEqual(caption.text, u'italic\nless')
+
+    def test_caption_text_without_tags(self):
+        caption = Caption(text=u'plain text')
+        self.assertEqual(caption.text, u'plain text')
+        self.assertListEqual(caption.tree.children, [u'plain text'])
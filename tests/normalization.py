@@ -0,0 +1,145 @@
+from __future__ import absolute_import
+
+import webvtt
+from webvtt import normalization
+from webvtt.structures import Caption
+
+from .generic import GenericParserTestCase
+
+
+def _timings(captions):
+    return [(c.start_ms, c.end_ms, c.lines) for c in captions]
+
+
+class NormalizationTestCase(GenericParserTestCase):
+
+    def test_merge_duplicates(self):
+        vtt = webvtt.WebVTT(captions=[
+            Caption(0, 2000, [u'Hello']),
+            Caption(2000, 4000, [u'Hello']),
+            Caption(3000, 5000, [u'Hello']),
+            Caption(6000, 7000, [u'Hello']),
+        ])
+        vtt.normalize()
+        self.assertListEqual(
+            _timings(vtt.captions),
+            [(0, 5000, [u'Hello']), (6000, 7000, [u'Hello'])]
+        )
+
+    def test_split_overlaps(self):
+        vtt = webvtt.WebVTT(captions=[
+            Caption(1000, 4000, [u'Second']),
+            Caption(0, 3000, [u'First']),
+            Caption(5000, 6000, [u'Third']),
+        ])
+        vtt.normalize()
+        self.assertListEqual(
+            _timings(vtt.captions),
+            [
+                (0, 1000, [u'First']),
+                (1000, 3000, [u'First', u'Second']),
+                (3000, 4000, [u'Second']),
+                (5000, 6000, [u'Third']),
+            ]
+        )
+
+    def test_drop_zero_length(self):
+        vtt = webvtt.WebVTT(captions=[Caption(1000, 1000, [u'Empty']), Caption(2000, 3000, [u'Caption'])])
+        vtt.normalize()
+        self.assertListEqual(_timings(vtt.captions), [(2000, 3000, [u'Caption'])])
+
+    def test_min_gap(self):
+        vtt = webvtt.WebVTT(captions=[
+            Caption(0, 1990, [u'First']),
+            Caption(2000, 2030, [u'Second']),
+            Caption(2040, 3000, [u'Third']),
+        ])
+        vtt.normalize(min_gap=50)
+        self.assertListEqual(
+            _timings(vtt.captions),
+            [(0, 1950, [u'First']), (2040, 3000, [u'Third'])]
+        )
+
+    def test_without_split(self):
+        captions = [Caption(0, 3000, [u'First']), Caption(1000, 4000, [u'Second'])]
+        self.assertListEqual(_timings(normalization.normalize(captions, split=False)), _timings(captions))
+
+    def test_min_gap_without_split(self):
+        captions = [
+            Caption(0, 3000, [u'First']),
+            Caption(1000, 4000, [u'Second']),
+            Caption(1000, 1500, [u'Third']),
+            Caption(3990, 5000, [u'Fourth']),
+        ]
+        self.assertListEqual(
+            _timings(normalization.normalize(captions, split=False, min_gap=100)),
+            [(0, 900, [u'First']), (1000, 3890, [u'Second']), (3990, 5000, [u'Fourth'])]
+        )
+
+    def test_without_merge(self):
+        captions = [Caption(0, 1000, [u'A']), Caption(1000, 2000, [u'A'])]
+        self.assertListEqual(_timings(normalization.normalize(captions, merge=False, split=False)), _timings(captions))
+        self.assertListEqual(_timings(normalization.normalize(captions, merge=False)), _timings(captions))
+
+    def test_unchanged_captions_kept(self):
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        captions = list(vtt.captions)
+        vtt.normalize()
+        self.assertEqual(len(vtt.captions), len(captions))
+        self.assertTrue(all(a is b for a, b in zip(vtt.captions, captions)))
+
+    def test_identifiers_and_settings(self):
+        first = Caption(0, 3000, [u'First'])
+        first.identifier = u'first'
+        first.raw_settings = u'align:start'
+        second = Caption(5000, 6000, [u'Second'])
+        second.identifier = u'second'
+        captions = normalization.normalize([first, Caption(1000, 2000, [u'Other']), second])
+
+        self.assertListEqual([c.identifier for c in captions], [None, None, None, u'second'])
+        self.assertListEqual([c.raw_settings for c in captions], [u'align:start'] * 3 + [None])
+        # the captions given are not modified
+        self.assertEqual(first.end_ms, 3000)
+
+    def test_collapse_rollup(self):
+        vtt = webvtt.read(self._get_file(u'rollup.vtt'))
+        first, music = vtt.captions[0], vtt.captions[-1]
+        vtt.collapse_rollup()
+        self.assertListEqual(
+            _timings(vtt.captions),
+            [
+                (0, 1000, [u'>> GOOD EVENING,']),
+                (1000, 2000, [u"I'M JANE SMITH."]),
+                (2000, 3500, [u'OUR TOP STORY TONIGHT']),
+                (3500, 5000, [u'IS THE WEATHER.']),
+                (5000, 6000, [u'A STORM IS COMING.']),
+                (8000, 10000, [u'[ MUSIC ]']),
+            ]
+        )
+        # captions kept whole are not copied
+        self.assertIs(vtt.captions[0], first)
+        self.assertIs(vtt.captions[-1], music)
+
+    def test_collapse_rollup_many_new_lines(self):
+        captions = normalization.collapse_rollup([
+            Caption(0, 1000, [u'A', u'B']),
+            Caption(1000, 2000, [u'B', u'C', u'D']),
+            Caption(1000, 2000, [u'D', u'E']),
+        ])
+        self.assertListEqual(_timings(captions), [(0, 1000, [u'A', u'B']), (1000, 2000, [u'C', u'D', u'E'])])
+
+    def test_collapse_rollup_duplicates(self):
+        captions = normalization.collapse_rollup([Caption(0, 1000, [u'A']), Caption(1000, 3000, [u'A'])])
+        self.assertListEqual(_timings(captions), [(0, 3000, [u'A'])])
+
+    def test_collapse_rollup_gap(self):
+        captions = [Caption(10000, 12000, [u'[MUSIC]']), Caption(20000, 22000, [u'[MUSIC]'])]
+        self.assertListEqual(_timings(normalization.collapse_rollup(captions)), _timings(captions))
+
+    def test_collapse_rollup_pop_on(self):
+        captions = normalization.collapse_rollup([
+            Caption(0, 2000, [u'- Yes.']),
+            Caption(2000, 4000, [u'- Yes.', u'- No.']),
+        ])
+        # no line is shown before the caption adding it
+        self.assertListEqual(_timings(captions), [(0, 2000, [u'- Yes.']), (2000, 4000, [u'- No.'])])
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 import webvtt
+from webvtt.parsers import SBVParser
 
 from .generic import GenericParserTestCase
 
@@ -77,3 +78,9 @@ class SBVParserTestCase(GenericParserTestCase):
             vtt.captions[2].lines,
             [u'Caption text #3 (line 1)', u'Caption text #3 (line 2)']
         )
+
+    def test_sbv_feed(self):
+        parser = SBVParser()
+        self.assertListEqual(parser.feed(u'0:00:01.000,0:00:02.000\nFirst\n'), [])
+        self.assertListEqual([c.text for c in parser.feed(u'\n0:00:03.000,0:00:04.000\nSecond')], [u'First'])
+        self.assertListEqual([c.text for c in parser.close()], [u'Second'])
@@ -2,9 +2,10 @@ from __future__ import with_statement
 from __future__ import absolute_import
 import os
 import unittest
-from shutil import rmtree
+from shutil import rmtree, copyfile
 
-from webvtt import WebVTTSegmenter, Caption
+import webvtt
+from webvtt import WebVTTSegmenter, LiveSegmenter, Caption
 from webvtt.errors import InvalidCaptionsError
 from webvtt import WebVTT
 from io import open
@@ -181,3 +182,191 @@ class WebVTTSegmenterTestCase(unittest.TestCase):
             u'total_segments',
             5
         )
+
+    def test_segment_unsorted_captions(self):
+        vtt = WebVTT(captions=[
+            Caption(u'00:00:21.000', u'00:00:22.000', u'Caption text #1'),
+            Caption(u'00:00:01.000', u'00:00:02.000', u'Caption text #2'),
+        ])
+        self.segmenter.segment(vtt, OUTPUT_DIR)
+        self.assertEqual(self.segmenter.total_segments, 3)
+        self.assertListEqual(self.segmenter.segments, [[vtt.captions[1]], [], [vtt.captions[0]]])
+
+    def test_segment_unsorted_file(self):
+        self.segmenter.segment(os.path.join(SUBTITLES_DIR, u'unsorted.vtt'), OUTPUT_DIR)
+        self.assertEqual(self.segmenter.total_segments, 3)
+        self.assertListEqual(
+            [[c.text for c in captions] for captions in self.segmenter.segments],
+            [[u'Caption text #1', u'Caption text #3'], [u'Caption text #3'], [u'Caption text #2']]
+        )
+
+    def test_segment_unsorted_file_written_once(self):
+        written = []
+        sink = webvtt.sinks.CallbackSink(lambda name, data: written.append((name, data)))
+        self.segmenter.segment(os.path.join(SUBTITLES_DIR, u'unsorted.vtt'), sink)
+
+        names = [name for name, _ in written]
+        self.assertListEqual(names, [u'fileSequence0.webvtt', u'fileSequence1.webvtt',
+                                     u'fileSequence2.webvtt', u'prog_index.m3u8'])
+        self.assertIn(b'Caption text #3', dict(written)[u'fileSequence1.webvtt'])
+
+    def test_segments_of_file_parsed_once(self):
+        os.makedirs(OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'captions.vtt')
+        copyfile(os.path.join(SUBTITLES_DIR, u'sample.vtt'), path)
+        self.segmenter.segment(path, OUTPUT_DIR)
+        os.remove(path)
+
+        # the captions parsed while segmenting are kept instead of reading the file again
+        self.assertEqual(len(self.segmenter.segments), self.segmenter.total_segments)
+        self.assertEqual(self.segmenter.segments[0][0].text, u'Caption text #1')
+
+    def test_total_segments_longest_caption(self):
+        vtt = WebVTT(captions=[
+            Caption(u'00:00:01.000', u'00:00:35.000', u'Caption text #1'),
+            Caption(u'00:00:02.000', u'00:00:03.000', u'Caption text #2'),
+        ])
+        self.segmenter.segment(vtt, OUTPUT_DIR)
+        self.assertEqual(self.segmenter.total_segments, 4)
+        self.assertIn(vtt.captions[0], self.segmenter.segments[3])
+
+    def test_caption_ending_on_segment_boundary(self):
+        vtt = WebVTT(captions=[Caption(u'00:00:05.000', u'00:00:20.000', u'Caption text #1')])
+        self.segmenter.segment(vtt, OUTPUT_DIR)
+        self.assertEqual(self.segmenter.total_segments, 2)
+
+    def test_iter_segments_streaming(self):
+        captions = webvtt.iter_captions(os.path.join(SUBTITLES_DIR, u'sample.vtt'))
+        segments = self.segmenter.iter_segments(captions)
+
+        index, segment = next(segments)
+        self.assertEqual(index, 0)
+        self.assertListEqual([c.text for c in segment], [u'Caption text #1', u'Caption text #2'])
+        self.assertEqual(len(list(segments)), 6)
+
+
+    def test_segment_fsync_policies(self):
+        self._parse_captions(u'sample.vtt')
+        for fsync in (u'none', u'file', u'batch'):
+            output = os.path.join(OUTPUT_DIR, fsync)
+            self.segmenter.segment(self.webvtt, output, fsync=fsync, workers=2)
+            self.assertEqual(self.segmenter.total_segments, 7)
+            self.assertEqual(len(os.listdir(output)), 8)
+
+    def test_segment_invalid_fsync_policy(self):
+        self._parse_captions(u'sample.vtt')
+        self.assertRaises(
+            ValueError,
+            self.segmenter.segment,
+            self.webvtt, OUTPUT_DIR, fsync=u'always'
+        )
+        self.assertFalse(os.path.exists(OUTPUT_DIR))
+
+    def test_segment_content_with_settings(self):
+        vtt = WebVTT(captions=[Caption(u'00:00:01.000', u'00:00:02.000', [u'Line 1', u'Line 2'])])
+        vtt.captions[0].raw_settings = u'align:left'
+        self.segmenter.segment(vtt, OUTPUT_DIR, mpegts=0)
+
+        with open(os.path.join(OUTPUT_DIR, u'fileSequence0.webvtt'), u'rb') as f:
+            self.assertEqual(
+                f.read(),
+                b'WEBVTT\nX-TIMESTAMP-MAP=MPEGTS:0,LOCAL:00:00:00.000\n\n'
+                b'00:00:01.000 --> 00:00:02.000 align:left\nLine 1\nLine 2\n'
+            )
+
+
+class LiveSegmenterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.segmenter = LiveSegmenter(OUTPUT_DIR)
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_DIR):
+            rmtree(OUTPUT_DIR)
+
+    def _read_lines(self, filename):
+        with open(os.path.join(OUTPUT_DIR, filename), u'r', encoding=u'utf-8') as f:
+            return [line.rstrip() for line in f.readlines()]
+
+    def test_flush_until_writes_closed_segments(self):
+        self.segmenter.feed(Caption(u'00:00:01.000', u'00:00:12.000', u'Caption text #1'))
+        self.segmenter.flush_until(15000)
+
+        self.assertEqual(self.segmenter.total_segments, 1)
+        self.assertTrue(os.path.exists(os.path.join(OUTPUT_DIR, u'fileSequence0.webvtt')))
+        self.assertFalse(os.path.exists(os.path.join(OUTPUT_DIR, u'fileSequence1.webvtt')))
+
+        self.segmenter.feed(Caption(u'00:00:15.000', u'00:00:16.000', u'Caption text #2'))
+        self.segmenter.flush_until(20000)
+
+        self.assertListEqual(
+            self._read_lines(u'fileSequence1.webvtt'),
+            [
+                u'WEBVTT',
+                u'X-TIMESTAMP-MAP=MPEGTS:900000,LOCAL:00:00:00.000',
+                u'',
+                u'00:00:01.000 --> 00:00:12.000',
+                u'Caption text #1',
+                u'',
+                u'00:00:15.000 --> 00:00:16.000',
+                u'Caption text #2',
+            ]
+        )
+
+    def test_event_playlist(self):
+        self.segmenter.feed(Caption(u'00:00:01.000', u'00:00:02.000', u'Caption text #1'))
+        self.segmenter.flush_until(20000)
+
+        self.assertListEqual(
+            self._read_lines(u'prog_index.m3u8'),
+            [
+                u'#EXTM3U',
+                u'#EXT-X-TARGETDURATION:10',
+                u'#EXT-X-VERSION:3',
+                u'#EXT-X-MEDIA-SEQUENCE:0',
+                u'#EXT-X-PLAYLIST-TYPE:EVENT',
+                u'#EXTINF:10.00000,',
+                u'fileSequence0.webvtt',
+                u'#EXTINF:10.00000,',
+                u'fileSequence1.webvtt',
+            ]
+        )
+
+        self.segmenter.close()
+        self.assertEqual(self._read_lines(u'prog_index.m3u8')[-1], u'#EXT-X-ENDLIST')
+
+    def test_sliding_window_playlist(self):
+        segmenter = LiveSegmenter(OUTPUT_DIR, seconds=2, window=3)
+        for i in xrange(5):
+            segmenter.feed(Caption(i * 2000, i * 2000 + 1000, u'Caption text #{}'.format(i)))
+            segmenter.flush_until((i + 1) * 2000)
+
+        lines = self._read_lines(u'prog_index.m3u8')
+        self.assertIn(u'#EXT-X-MEDIA-SEQUENCE:2', lines)
+        self.assertNotIn(u'#EXT-X-PLAYLIST-TYPE:EVENT', lines)
+        self.assertListEqual(
+            [line for line in lines if not line.startswith(u'#')],
+            [u'fileSequence2.webvtt', u'fileSequence3.webvtt', u'fileSequence4.webvtt']
+        )
+        # no temporary files are left behind
+        self.assertEqual(len(os.listdir(OUTPUT_DIR)), 6)
+
+    def test_late_caption(self):
+        self.segmenter.flush_until(10000)
+        self.segmenter.feed(Caption(u'00:00:08.000', u'00:00:12.000', u'Caption text #1'))
+        self.segmenter.close()
+        self.assertIn(u'Caption text #1', self._read_lines(u'fileSequence1.webvtt'))
+
+        self.assertRaises(
+            InvalidCaptionsError,
+            self.segmenter.feed,
+            Caption(u'00:00:30.000', u'00:00:31.000', u'Caption text #2')
+        )
+
+    def test_caption_in_written_segment(self):
+        self.segmenter.flush_until(10000)
+        self.assertRaises(
+            InvalidCaptionsError,
+            self.segmenter.feed,
+            Caption(u'00:00:01.000', u'00:00:02.000', u'Caption text #1')
+        )
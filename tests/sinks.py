@@ -0,0 +1,128 @@
+from __future__ import with_statement
+from __future__ import absolute_import
+import io
+import os
+import tarfile
+import zipfile
+from shutil import rmtree
+
+import webvtt
+from webvtt import WebVTT, WebVTTSegmenter, LiveSegmenter, Caption
+from webvtt import MemorySink, DirectorySink, ZipSink, TarSink, CallbackSink
+from webvtt.errors import MissingFilenameError
+
+from .generic import GenericParserTestCase
+
+BASE_DIR = os.path.dirname(__file__)
+OUTPUT_DIR = os.path.join(BASE_DIR, u'output')
+
+SEGMENT_FILES = [u'fileSequence{}.webvtt'.format(i) for i in xrange(7)] + [u'prog_index.m3u8']
+
+
+class SinksTestCase(GenericParserTestCase):
+
+    def setUp(self):
+        self.vtt = webvtt.read(self._get_file(u'sample.vtt'))
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_DIR):
+            rmtree(OUTPUT_DIR)
+
+    def _directory_files(self):
+        WebVTTSegmenter().segment(self.vtt, OUTPUT_DIR)
+        files = {}
+        for name in os.listdir(OUTPUT_DIR):
+            with io.open(os.path.join(OUTPUT_DIR, name), u'rb') as f:
+                files[name] = f.read()
+        return files
+
+    def test_segment_to_memory(self):
+        sink = MemorySink()
+        WebVTTSegmenter().segment(self.vtt, sink, workers=2)
+        self.assertListEqual(sorted(sink.files), sorted(SEGMENT_FILES))
+        self.assertDictEqual(sink.files, self._directory_files())
+
+    def test_segment_to_zip(self):
+        buffer = io.BytesIO()
+        with ZipSink(buffer) as sink:
+            WebVTTSegmenter().segment(self.vtt, sink)
+
+        archive = zipfile.ZipFile(io.BytesIO(buffer.getvalue()))
+        self.assertListEqual(sorted(archive.namelist()), sorted(SEGMENT_FILES))
+        self.assertEqual(archive.read(u'fileSequence0.webvtt'), self._directory_files()[u'fileSequence0.webvtt'])
+
+    def test_segment_to_tar(self):
+        os.makedirs(OUTPUT_DIR)
+        path = os.path.join(OUTPUT_DIR, u'segments.tar.gz')
+        with TarSink(path, u'w:gz') as sink:
+            WebVTTSegmenter().segment(self.vtt, sink)
+
+        archive = tarfile.open(path)
+        self.assertListEqual(sorted(archive.getnames()), sorted(SEGMENT_FILES))
+        self.assertIn(b'Caption text #1', archive.extractfile(u'fileSequence0.webvtt').read())
+        archive.close()
+
+    def test_segment_to_callback(self):
+        names = []
+        WebVTTSegmenter().segment(self.vtt, CallbackSink(lambda name, data: names.append(name)))
+        # the manifest is written last
+        self.assertListEqual(sorted(names[:-1]), sorted(SEGMENT_FILES[:-1]))
+        self.assertEqual(names[-1], u'prog_index.m3u8')
+
+    def test_segment_to_sink_with_fsync(self):
+        self.assertRaises(
+            ValueError,
+            WebVTTSegmenter().segment,
+            self.vtt, MemorySink(), fsync=u'file'
+        )
+
+    def test_live_segmenter_to_memory(self):
+        sink = MemorySink()
+        segmenter = LiveSegmenter(sink, seconds=10)
+        segmenter.feed(Caption(u'00:00:01.000', u'00:00:05.000', u'Live'))
+        segmenter.close()
+
+        self.assertListEqual(sorted(sink.files), [u'fileSequence0.webvtt', u'prog_index.m3u8'])
+        self.assertIn(b'#EXT-X-ENDLIST', sink.files[u'prog_index.m3u8'])
+
+    def test_directory_sink(self):
+        sink = DirectorySink(os.path.join(OUTPUT_DIR, u'nested'), fsync=u'batch', atomic=True)
+        sink.write(u'file.txt', b'content')
+        sink.flush()
+
+        with io.open(os.path.join(OUTPUT_DIR, u'nested', u'file.txt'), u'rb') as f:
+            self.assertEqual(f.read(), b'content')
+        self.assertListEqual(os.listdir(os.path.join(OUTPUT_DIR, u'nested')), [u'file.txt'])
+
+    def test_atomic_write_mode(self):
+        segmenter = LiveSegmenter(OUTPUT_DIR, seconds=10)
+        segmenter.feed(Caption(u'00:00:01.000', u'00:00:05.000', u'Live'))
+        segmenter.close()
+        DirectorySink(OUTPUT_DIR).write(u'plain.txt', b'content')
+
+        # the same mode as files written without replacing them atomically, 0644 with umask 022
+        mode = os.stat(os.path.join(OUTPUT_DIR, u'plain.txt')).st_mode & 0o777
+        for name in (u'fileSequence0.webvtt', u'prog_index.m3u8'):
+            self.assertEqual(os.stat(os.path.join(OUTPUT_DIR, name)).st_mode & 0o777, mode)
+
+        # replacing a file keeps its mode
+        os.chmod(os.path.join(OUTPUT_DIR, u'plain.txt'), 0o640)
+        DirectorySink(OUTPUT_DIR, atomic=True).write(u'plain.txt', b'new content')
+        self.assertEqual(os.stat(os.path.join(OUTPUT_DIR, u'plain.txt')).st_mode & 0o777, 0o640)
+
+    def test_directory_sink_invalid_fsync(self):
+        self.assertRaises(ValueError, DirectorySink, OUTPUT_DIR, fsync=u'always')
+
+    def test_save_to_sink(self):
+        sink = MemorySink()
+        self.vtt.save(sink)
+        self.vtt.save_as_srt(sink)
+
+        self.assertListEqual(sorted(sink.files), [u'sample.srt', u'sample.vtt'])
+        self.assertEqual(len(webvtt.read(sink.files[u'sample.vtt']).captions), 16)
+        self.assertEqual(len(webvtt.from_srt(sink.files[u'sample.srt']).captions), 16)
+        self.assertEqual(self.vtt.file, self._get_file(u'sample.vtt'))
+
+    def test_save_to_sink_without_filename(self):
+        vtt = WebVTT(captions=self.vtt.captions)
+        self.assertRaises(MissingFilenameError, vtt.save, MemorySink())
@@ -1,5 +1,8 @@
 from __future__ import absolute_import
+import io
+
 import webvtt
+from webvtt.parsers import SRTParser
 
 from .generic import GenericParserTestCase
 
@@ -51,6 +54,17 @@ class SRTParserTestCase(GenericParserTestCase):
             self._get_file(u'invalid_timeframe.srt')
         )
 
+    def test_srt_collect_errors(self):
+        vtt = webvtt.from_srt(self._get_file(u'invalid_timeframe.srt'), errors=u'collect')
+        self.assertEqual(len(vtt.captions), 4)
+        self.assertEqual(vtt.captions[1].text, u'Caption text #3')
+        self.assertListEqual([(d.line, d.kind) for d in vtt.diagnostics], [(6, u'invalid_timing')])
+
+    def test_srt_collect_missing_timing(self):
+        vtt = webvtt.from_srt(self._get_file(u'missing_timeframe.srt'), errors=u'collect')
+        self.assertEqual(len(vtt.diagnostics), 1)
+        self.assertEqual(vtt.diagnostics[0].kind, u'missing_timing')
+
     def test_srt_timestamps_format(self):
         vtt = webvtt.from_srt(self._get_file(u'sample.srt'))
         self.assertEqual(vtt.captions[2].start, u'00:00:11.890')
@@ -64,3 +78,22 @@ class SRTParserTestCase(GenericParserTestCase):
         self.assertEqual(vtt.captions[0].end, u'00:00:07.000')
         self.assertEqual(vtt.captions[0].lines[0], u'Caption text #1')
         self.assertEqual(len(vtt.captions[0].lines), 1)
+
+    def test_srt_parse_from_file_object(self):
+        with io.open(self._get_file(u'sample.srt'), u'rb') as f:
+            vtt = webvtt.from_srt(f)
+        self.assertEqual(len(vtt.captions), 5)
+        self.assertEqual(vtt.captions[2].start, u'00:00:11.890')
+
+    def test_srt_feed(self):
+        with io.open(self._get_file(u'sample.srt'), u'rb') as f:
+            data = f.read()
+
+        parser = SRTParser()
+        captions = []
+        for offset in xrange(0, len(data), 5):
+            captions.extend(parser.feed(data[offset:offset + 5]))
+        captions.extend(parser.close())
+
+        vtt = webvtt.from_srt(self._get_file(u'sample.srt'))
+        self.assertListEqual([unicode(c) for c in captions], [unicode(c) for c in vtt.captions])
@@ -0,0 +1,66 @@
+from __future__ import division
+from __future__ import absolute_import
+
+import webvtt
+from webvtt import timing
+
+from .generic import GenericParserTestCase
+
+
+class TimingTestCase(GenericParserTestCase):
+
+    def setUp(self):
+        self.vtt = webvtt.read(self._get_file(u'sample.vtt'))
+
+    def test_shift(self):
+        self.vtt.shift(1500)
+        self.assertEqual(self.vtt.captions[0].start, u'00:00:02.000')
+        self.assertEqual(self.vtt.captions[0].end, u'00:00:08.500')
+
+    def test_shift_never_below_zero(self):
+        self.vtt.shift(-1000)
+        self.assertEqual(self.vtt.captions[0].start_ms, 0)
+        self.assertEqual(self.vtt.captions[0].end_ms, 6000)
+
+    def test_scale(self):
+        self.vtt.scale(23.976 / 25)
+        self.assertEqual(self.vtt.captions[0].start, u'00:00:00.480')
+        self.assertEqual(self.vtt.captions[0].end, u'00:00:06.713')
+
+    def test_scale_anchor(self):
+        self.vtt.scale(2, anchor=7000)
+        self.assertEqual(self.vtt.captions[0].start_ms, 0)
+        self.assertEqual(self.vtt.captions[1].start_ms, 7000)
+        self.assertEqual(self.vtt.captions[1].end_ms, 16780)
+
+    def test_scale_invalid_ratio(self):
+        self.assertRaises(ValueError, self.vtt.scale, 0)
+
+    def test_retime(self):
+        # drift of one second every ten seconds after the first ten seconds
+        self.vtt.retime({0: 0, 10000: 10000, 20000: 21000})
+        self.assertEqual(self.vtt.captions[0].start_ms, 500)
+        self.assertEqual(self.vtt.captions[2].start_ms, 12079)
+        self.assertEqual(self.vtt.captions[4].start_ms, 22738)
+        # the last segment is extended after the last point
+        self.assertEqual(self.vtt.captions[-1].end_ms, 69730)
+
+    def test_retime_single_point(self):
+        self.vtt.retime([(1000, 3000)])
+        self.assertEqual(self.vtt.captions[0].start_ms, 2500)
+
+    def test_retime_invalid_mapping(self):
+        self.assertRaises(ValueError, self.vtt.retime, {})
+        self.assertRaises(ValueError, self.vtt.retime, [(0, 0), (0, 1000)])
+
+    def test_index_rebuilt(self):
+        self.assertEqual(len(self.vtt.at(600)), 1)
+        self.vtt.shift(1000)
+        self.assertEqual(self.vtt.at(600), [])
+
+    def test_streaming_filter(self):
+        captions = timing.shift(webvtt.iter_captions(self._get_file(u'sample.vtt')), 1500)
+        self.assertEqual(next(captions).start, u'00:00:02.000')
+
+        captions = list(timing.scale(timing.retime(self.vtt.captions, {0: 0, 1000: 1000}), 2))
+        self.assertEqual(captions[0].start_ms, 1000)
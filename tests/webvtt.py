@@ -2,10 +2,12 @@ from __future__ import with_statement
 from __future__ import absolute_import
 import os
 import io
+import pickle
 from shutil import rmtree, copy
 
 import webvtt
-from webvtt.structures import Caption, Style
+from webvtt import writers
+from webvtt.structures import Caption, CueSettings, Style
 from .generic import GenericParserTestCase
 from io import open
 
@@ -54,6 +56,65 @@ class WebVTTTestCase(GenericParserTestCase):
 
         self.assertListEqual(lines, expected_lines)
 
+    def test_to_string(self):
+        vtt = webvtt.WebVTT(captions=[
+            Caption(u'00:00:00.500', u'00:00:07.000', [u'Caption text #1']),
+            Caption(u'100:59:58.001', u'101:00:00.000', [u'Line 1', u'Line 2']),
+            Caption(u'101:00:01.000', u'101:00:02.000'),
+        ])
+        vtt.captions[1].identifier = u'second'
+        vtt.captions[1].raw_settings = u'align:left'
+
+        self.assertEqual(
+            vtt.to_string(),
+            u'WEBVTT\n'
+            u'\n00:00:00.500 --> 00:00:07.000\nCaption text #1\n'
+            u'\nsecond\n100:59:58.001 --> 101:00:00.000 align:left\nLine 1\nLine 2\n'
+            u'\n101:00:01.000 --> 101:00:02.000\n'
+        )
+        self.assertEqual(
+            vtt.to_string(u'srt'),
+            u'1\n00:00:00,500 --> 00:00:07,000\nCaption text #1\n\n'
+            u'2\n100:59:58,001 --> 101:00:00,000\nLine 1\nLine 2\n\n'
+            u'3\n101:00:01,000 --> 101:00:02,000\n\n'
+        )
+        self.assertEqual(vtt.to_bytes(), vtt.to_string().encode(u'utf-8'))
+        self.assertRaises(ValueError, vtt.to_string, u'sbv')
+
+    def test_write_in_chunks(self):
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+        out = io.StringIO()
+        chunk_parts = writers.CHUNK_PARTS
+        writers.CHUNK_PARTS = 3
+        try:
+            vtt.write(out)
+            vtt.write(out, format=u'srt')
+        finally:
+            writers.CHUNK_PARTS = chunk_parts
+        self.assertEqual(out.getvalue(), vtt.to_string() + vtt.to_string(u'srt'))
+
+    def test_load_detects_format(self):
+        self.assertEqual(len(webvtt.load(self._get_file(u'sample.vtt')).captions), 16)
+        self.assertEqual(len(webvtt.load(self._get_file(u'captions_with_bom.vtt')).captions), 4)
+        self.assertEqual(webvtt.load(self._get_file(u'sample.srt')).captions[2].start, u'00:00:11.890')
+        self.assertEqual(len(webvtt.load(self._get_file(u'two_captions.sbv')).captions), 2)
+        self.assertEqual(len(webvtt.load(u'1\n00:00:01,000 --> 00:00:02,000\nCaption\n').captions), 1)
+
+    def test_load_file_object(self):
+        class Unseekable(object):
+            def __init__(self, data):
+                self.read = io.BytesIO(data).read
+
+        with open(self._get_file(u'sample.srt'), u'rb') as f:
+            data = f.read()
+            f.seek(0)
+            self.assertEqual(len(webvtt.load(f).captions), 5)
+        self.assertEqual(len(webvtt.load(Unseekable(data)).captions), 5)
+
+    def test_load_unknown_format(self):
+        self.assertRaises(webvtt.errors.MalformedFileError, webvtt.load, self._get_file(u'empty.vtt'))
+        self.assertRaises(webvtt.errors.MalformedFileError, webvtt.load, u'Caption\ntext\n')
+
     def test_save_captions(self):
         os.makedirs(OUTPUT_DIR)
         copy(self._get_file(u'one_caption.vtt'), OUTPUT_DIR)
@@ -274,6 +335,38 @@ class WebVTTTestCase(GenericParserTestCase):
             u'::cue(b) {color: peachpuff;}'
         )
 
+    def test_style_text_is_cached(self):
+        style = Style()
+        style.lines = [u'::cue(b) {', u'  color: peachpuff;', u'}']
+        self.assertIs(style.text, style.text)
+        self.assertIs(style.rules, style.rules)
+
+        style.lines.append(u'::cue(i) { color: red; }')
+        self.assertEqual(style.text, u'::cue(b) {color: peachpuff;}::cue(i) { color: red; }')
+        self.assertListEqual(list(style.rules), [u'::cue(b)', u'::cue(i)'])
+
+    def test_save_regions_and_styles(self):
+        os.makedirs(OUTPUT_DIR)
+        copy(self._get_file(u'regions.vtt'), OUTPUT_DIR)
+
+        vtt = webvtt.read(os.path.join(OUTPUT_DIR, u'regions.vtt'))
+        vtt.save(os.path.join(OUTPUT_DIR, u'new_regions.vtt'))
+
+        new_vtt = webvtt.read(os.path.join(OUTPUT_DIR, u'new_regions.vtt'))
+        self.assertListEqual(
+            [region.text for region in new_vtt.regions],
+            [region.text for region in vtt.regions]
+        )
+        self.assertListEqual(
+            [style.lines for style in new_vtt.styles],
+            [style.lines for style in vtt.styles]
+        )
+        self.assertEqual(new_vtt.captions[0].raw_settings, u'region:fred align:left')
+        self.assertEqual(
+            new_vtt.regions[0].text,
+            u'id:fred\nwidth:40%\nlines:3\nregionanchor:0%,100%\nviewportanchor:10%,90%'
+        )
+
     def test_save_identifiers(self):
         os.makedirs(OUTPUT_DIR)
         copy(self._get_file(u'using_identifiers.vtt'), OUTPUT_DIR)
@@ -355,3 +448,106 @@ class WebVTTTestCase(GenericParserTestCase):
         ]
 
         self.assertListEqual(lines, expected_lines)
+
+    def test_caption_timing_in_milliseconds(self):
+        c = Caption(u'01:02:03.400', u'01:02:05.999')
+        self.assertEqual(c.start_ms, 3723400)
+        self.assertEqual(c.end_ms, 3725999)
+
+        c.start_ms = 1500
+        c.end_ms = 3599999
+        self.assertEqual(c.start, u'00:00:01.500')
+        self.assertEqual(c.end, u'00:59:59.999')
+        self.assertEqual(c.start_in_seconds, 1.5)
+
+    def test_create_caption_from_milliseconds(self):
+        c = Caption(500, 7000, u'Caption text')
+        self.assertEqual(c.start, u'00:00:00.500')
+        self.assertEqual(c.end, u'00:00:07.000')
+
+    def test_caption_timestamp_cache_updated(self):
+        c = Caption(u'00:00:00.500', u'00:00:07.000')
+        self.assertEqual(c.start, u'00:00:00.500')
+        c.start = u'00:00:02.000'
+        self.assertEqual(c.start, u'00:00:02.000')
+        self.assertEqual(c.start_ms, 2000)
+
+    def test_save_as_srt_milliseconds_precision(self):
+        out = io.StringIO()
+        vtt = webvtt.WebVTT(captions=[Caption(u'00:00:00.999', u'00:00:59.999', u'Caption text')])
+        vtt.write(out, format=u'srt')
+
+        self.assertEqual(
+            out.getvalue().splitlines()[1],
+            u'00:00:00,999 --> 00:00:59,999'
+        )
+
+    def test_pickle(self):
+        vtt = webvtt.read(self._get_file(u'regions.vtt'))
+        vtt.captions[0].tree
+        copy = pickle.loads(pickle.dumps(vtt))
+
+        self.assertListEqual(
+            [(c.start, c.end, c.lines, c.identifier, c.raw_settings) for c in copy.captions],
+            [(c.start, c.end, c.lines, c.identifier, c.raw_settings) for c in vtt.captions]
+        )
+        self.assertEqual(copy.captions[0].settings.region, vtt.captions[0].settings.region)
+        self.assertEqual(copy.captions[0].tree.text, vtt.captions[0].tree.text)
+        self.assertListEqual([s.text for s in copy.styles], [s.text for s in vtt.styles])
+        self.assertListEqual([r.text for r in copy.regions], [r.text for r in vtt.regions])
+        copy.captions.append(Caption(0, 1000, u'New'))
+        self.assertEqual(len(copy.captions), len(vtt.captions) + 1)
+
+    def test_caption_uses_slots(self):
+        c = Caption(u'00:00:00.500', u'00:00:07.000', u'Caption text')
+        self.assertFalse(hasattr(c, u'__dict__'))
+        self.assertFalse(hasattr(Style(), u'__dict__'))
+
+        c.identifier = u'first caption'
+        self.assertEqual(c.identifier, u'first caption')
+
+    def test_cue_settings(self):
+        c = Caption(u'00:00:00.500', u'00:00:07.000', u'Caption text')
+        self.assertEqual(len(c.settings), 0)
+        self.assertIsNone(c.settings.align)
+
+        c.raw_settings = u'align:start position:10% foo:bar'
+        self.assertEqual(c.settings.align, u'start')
+        self.assertEqual(c.settings.position, u'10%')
+        self.assertEqual(c.settings.get(u'foo'), u'bar')
+        self.assertIsNone(c.settings.vertical)
+
+    def test_cue_settings_shared(self):
+        vtt = webvtt.WebVTT(captions=[Caption(0, 1000), Caption(1000, 2000)])
+        for c in vtt.captions:
+            c.raw_settings = u'line:0 align:end'
+        self.assertIs(vtt.captions[0].settings, vtt.captions[1].settings)
+
+    def test_update_cue_settings(self):
+        c = Caption(u'00:00:00.500', u'00:00:07.000', u'Caption text')
+        c.raw_settings = u'align:start  line:0'
+        c.settings = c.settings.replace(align=None, size=u'50%')
+
+        self.assertEqual(c.raw_settings, u'line:0 size:50%')
+        self.assertEqual(c.settings, CueSettings(line=0, size=u'50%'))
+
+        c.settings = None
+        self.assertIsNone(c.raw_settings)
+
+    def test_cue_settings_unknown_name(self):
+        self.assertRaises(
+            TypeError,
+            CueSettings,
+            alignment=u'start'
+        )
+
+    def test_write_cue_settings(self):
+        with io.open(self._get_file(u'cue_settings.vtt'), encoding=u'utf-8') as f:
+            original = f.read()
+
+        out = io.StringIO()
+        vtt = webvtt.read(self._get_file(u'cue_settings.vtt'))
+        vtt.captions[0].settings.align  # parsing settings does not modify them
+        vtt.write(out)
+
+        self.assertEqual(out.getvalue().strip(), original.replace(u'  line', u' line').strip())
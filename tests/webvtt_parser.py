@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import absolute_import
+import io
+import mmap
+
 from .generic import GenericParserTestCase
 
 import webvtt
+from webvtt import sources
 from webvtt.parsers import WebVTTParser
 from webvtt.structures import Caption
 from webvtt.errors import MalformedFileError, MalformedCaptionError
@@ -143,6 +147,61 @@ class WebVTTParserTestCase(GenericParserTestCase):
             u'::cue {background-image: linear-gradient(to bottom, dimgray, lightgray);color: papayawhip;}'
         )
 
+    def test_parse_regions(self):
+        vtt = webvtt.read(self._get_file(u'regions.vtt'))
+        self.assertEqual(len(vtt.captions), 3)
+        self.assertEqual(len(vtt.regions), 2)
+
+        fred, bill = vtt.regions
+        self.assertEqual(fred.id, u'fred')
+        self.assertEqual(fred.width, 40)
+        self.assertEqual(fred.lines, 3)
+        self.assertTupleEqual(fred.region_anchor, (0, 100))
+        self.assertTupleEqual(fred.viewport_anchor, (10, 90))
+        self.assertIsNone(fred.scroll)
+        self.assertEqual(bill.scroll, u'up')
+
+        self.assertIs(vtt.region(vtt.captions[0]), fred)
+        self.assertIs(vtt.region(vtt.captions[1]), bill)
+        self.assertIsNone(vtt.region(vtt.captions[2]))
+
+    def test_parse_region_ignores_invalid_settings(self):
+        vtt = webvtt.read(
+            u'WEBVTT\n\nREGION\nid:r width:140% lines:x scroll:down foo:bar\n\n'
+            u'00:00.000 --> 00:01.000\nText\n'
+        )
+        region = vtt.regions[0]
+        self.assertEqual(region.id, u'r')
+        self.assertEqual(region.width, 100)
+        self.assertEqual(region.lines, 3)
+        self.assertIsNone(region.scroll)
+
+    def test_region_after_cue(self):
+        self.assertRaises(
+            MalformedFileError,
+            webvtt.read,
+            u'WEBVTT\n\n00:00.000 --> 00:01.000\nText\n\nREGION\nid:r\n'
+        )
+
+    def test_parse_stylesheet(self):
+        vtt = webvtt.read(self._get_file(u'regions.vtt'))
+        self.assertDictEqual(
+            vtt.styles[0].rules,
+            {
+                u'::cue(v[voice="Fred"])': {u'color': u'cyan'},
+                u'::cue(.loud)': {u'font-weight': u'bold'},
+            }
+        )
+        stylesheet = vtt.stylesheet
+        self.assertDictEqual(
+            stylesheet[u'::cue(.loud)'],
+            {u'font-weight': u'bold', u'color': u'red'}
+        )
+        self.assertIs(vtt.stylesheet, stylesheet)
+
+        vtt.styles[1].text = u'::cue(.loud) { color: blue }'
+        self.assertEqual(vtt.stylesheet[u'::cue(.loud)'][u'color'], u'blue')
+
     def test_clean_cue_tags(self):
         vtt = webvtt.read(self._get_file(u'cue_tags.vtt'))
         self.assertEqual(
@@ -157,3 +216,203 @@ class WebVTTParserTestCase(GenericParserTestCase):
     def test_parse_captions_with_bom(self):
         vtt = webvtt.read(self._get_file(u'captions_with_bom.vtt'))
         self.assertEqual(len(vtt.captions), 4)
+
+    def test_iter_captions(self):
+        captions = webvtt.iter_captions(self._get_file(u'sample.vtt'))
+        self.assertNotIsInstance(captions, list)
+
+        captions = list(captions)
+        self.assertEqual(len(captions), 16)
+        self.assertEqual(captions[2].start, u'00:00:11.890')
+        self.assertEqual(captions[2].end, u'00:00:16.320')
+
+    def test_iter_captions_from_file_object(self):
+        with io.open(self._get_file(u'using_identifiers.vtt'), encoding=u'utf-8') as f:
+            captions = list(webvtt.iter_captions(f))
+
+        self.assertEqual(len(captions), 6)
+        self.assertEqual(captions[1].identifier, u'second caption')
+
+    def test_iter_captions_yields_before_error(self):
+        captions = webvtt.iter_captions(self._get_file(u'missing_timeframe.vtt'))
+        self.assertEqual(next(captions).text, u'Caption text #1')
+
+        with self.assertRaises(MalformedCaptionError) as cm:
+            next(captions)
+        self.assertEqual(unicode(cm.exception), u'Standalone cue identifier in line 6.')
+
+    def test_iter_captions_same_errors_as_read(self):
+        for filename in (u'invalid_timeframe.vtt', u'invalid_timeframe_in_cue_text.vtt', u'missing_timeframe.vtt'):
+            with self.assertRaises(MalformedCaptionError) as read_error:
+                webvtt.read(self._get_file(filename))
+            with self.assertRaises(MalformedCaptionError) as iter_error:
+                list(webvtt.iter_captions(self._get_file(filename)))
+            self.assertEqual(unicode(read_error.exception), unicode(iter_error.exception))
+
+    def test_iter_captions_empty_file(self):
+        self.assertRaises(
+            MalformedFileError,
+            list,
+            webvtt.iter_captions(self._get_file(u'empty.vtt'))
+        )
+
+    def test_feed(self):
+        with io.open(self._get_file(u'regions.vtt'), u'rb') as f:
+            data = f.read()
+
+        parser = WebVTTParser()
+        captions = []
+        for offset in xrange(0, len(data), 7):
+            captions.extend(parser.feed(data[offset:offset + 7]))
+        captions.extend(parser.close())
+
+        vtt = webvtt.read(self._get_file(u'regions.vtt'))
+        self.assertListEqual([unicode(c) for c in captions], [unicode(c) for c in vtt.captions])
+        self.assertEqual(len(parser.regions), 2)
+        self.assertEqual(len(parser.styles), 2)
+
+    def test_feed_returns_completed_captions(self):
+        parser = WebVTTParser()
+        self.assertListEqual(parser.feed(u'WEBVTT\n\n00:00.000 --> 00:01.000\nFirst'), [])
+        captions = parser.feed(u'\n\n00:01.000 --> 00:02.000\n')
+        self.assertListEqual([c.text for c in captions], [u'First'])
+        self.assertListEqual([c.text for c in parser.feed(u'Second')], [])
+        self.assertListEqual([c.text for c in parser.close()], [u'Second'])
+
+    def test_feed_line_ending_split_in_chunks(self):
+        parser = WebVTTParser()
+        captions = []
+        chunks = [
+            u'WEBVTT\r\n\r\n00:00:01.000 --> 00:00:02.000\r\nA\r', u'\n',
+            u'\n00:00:03.000 --> 00:00:04.000\r', u'', u'\nB'
+        ]
+        for chunk in chunks:
+            captions.extend(parser.feed(chunk))
+        captions.extend(parser.close())
+        self.assertListEqual([c.lines for c in captions], [[u'A'], [u'B']])
+
+    def test_feed_same_errors_as_read(self):
+        for filename in (u'invalid_timeframe.vtt', u'missing_timeframe.vtt', u'empty.vtt', u'invalid.vtt'):
+            with io.open(self._get_file(filename), u'rb') as f:
+                data = f.read()
+            try:
+                webvtt.read(self._get_file(filename))
+            except (MalformedFileError, MalformedCaptionError), e:
+                read_error = e
+            parser = WebVTTParser()
+            with self.assertRaises(type(read_error)) as feed_error:
+                parser.feed(data)
+                parser.close()
+            self.assertEqual(unicode(read_error), unicode(feed_error.exception))
+
+    def test_read_from_text(self):
+        with io.open(self._get_file(u'sample.vtt'), encoding=u'utf-8') as f:
+            content = f.read()
+
+        vtt = webvtt.read(content)
+        self.assertEqual(len(vtt.captions), 16)
+        self.assertEqual(vtt.file, u'')
+
+    def test_read_from_bytes_with_bom(self):
+        with io.open(self._get_file(u'captions_with_bom.vtt'), u'rb') as f:
+            content = f.read()
+
+        vtt = webvtt.read(content)
+        self.assertEqual(len(vtt.captions), 4)
+
+    def test_read_from_binary_file_object(self):
+        with io.open(self._get_file(u'captions_with_bom.vtt'), u'rb') as f:
+            vtt = webvtt.read(f)
+        self.assertEqual(len(vtt.captions), 4)
+        self.assertEqual(vtt.file, self._get_file(u'captions_with_bom.vtt'))
+
+    def test_read_from_mmap(self):
+        with io.open(self._get_file(u'sample.vtt'), u'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            vtt = webvtt.read(buffer)
+            buffer.close()
+        self.assertEqual(len(vtt.captions), 16)
+
+    def test_read_large_file_memory_mapped(self):
+        vtt = webvtt.read(self._get_file(u'sample.vtt'))
+
+        threshold, chunk_size = sources.MMAP_THRESHOLD, sources.CHUNK_SIZE
+        sources.MMAP_THRESHOLD, sources.CHUNK_SIZE = 0, 7
+        try:
+            mapped = webvtt.read(self._get_file(u'sample.vtt'))
+        finally:
+            sources.MMAP_THRESHOLD, sources.CHUNK_SIZE = threshold, chunk_size
+
+        self.assertListEqual(
+            [(c.start, c.end, c.lines) for c in mapped.captions],
+            [(c.start, c.end, c.lines) for c in vtt.captions]
+        )
+
+    def test_read_line_endings(self):
+        vtt = webvtt.read(b'WEBVTT\r\n\r\n00:00.500 --> 00:07.000\r\nCaption\r\ntext\r\r00:07.000 --> 00:09.000\rCaption #2')
+        self.assertEqual(len(vtt.captions), 2)
+        self.assertListEqual(vtt.captions[0].lines, [u'Caption', u'text'])
+        self.assertListEqual(vtt.captions[1].lines, [u'Caption #2'])
+
+    def test_read_line_ending_split_in_chunks(self):
+        chunk_size = sources.CHUNK_SIZE
+        sources.CHUNK_SIZE = 1
+        try:
+            vtt = webvtt.read(bytearray(b'WEBVTT\r\n\r\n00:00.500 --> 00:07.000\r\nCaption text\r\n'))
+        finally:
+            sources.CHUNK_SIZE = chunk_size
+        self.assertListEqual(vtt.captions[0].lines, [u'Caption text'])
+
+    def test_parse_cue_settings(self):
+        vtt = webvtt.read(self._get_file(u'cue_settings.vtt'))
+        self.assertEqual(vtt.captions[0].raw_settings, u'align:start position:10%')
+        self.assertEqual(vtt.captions[0].end, u'00:00:07.000')
+        self.assertEqual(vtt.captions[1].raw_settings, u'line:0 vertical:rl')
+        self.assertIsNone(vtt.captions[2].raw_settings)
+
+    def test_parse_timeframe_line(self):
+        self.assertTupleEqual(
+            WebVTTParser()._parse_timeframe_line(u'01:02:03.456 --> 02:03.004 size:50%'),
+            (3723456, 123004, u'size:50%')
+        )
+
+    def test_read_collect_errors(self):
+        vtt = webvtt.read(self._get_file(u'invalid_timeframe.vtt'), errors=u'collect')
+        self.assertEqual(len(vtt.captions), 6)
+        self.assertEqual(vtt.captions[1].text, u'Caption text #3')
+        self.assertEqual(len(vtt.diagnostics), 1)
+        self.assertEqual(vtt.diagnostics[0].line, 6)
+        self.assertEqual(vtt.diagnostics[0].kind, u'invalid_timing')
+        self.assertIn(u'in line 6', vtt.diagnostics[0].message)
+
+    def test_read_collect_missing_timing(self):
+        vtt = webvtt.read(self._get_file(u'missing_timeframe.vtt'), errors=u'collect')
+        self.assertEqual(len(vtt.captions), 6)
+        self.assertListEqual(
+            [(d.line, d.kind) for d in vtt.diagnostics],
+            [(6, u'standalone_identifier')]
+        )
+
+    def test_read_collect_repairs_style_after_cue(self):
+        vtt = webvtt.read(
+            u'WEBVTT\n\n00:01.000 --> 00:02.000\nCaption\n\nSTYLE\n::cue { color: red }\n\n'
+            u'00:02.000 --> 00:03.000\n00:03.000 --> 00:04.000\nBroken\n\n00:03.000 --> 00:04.000\nLast\n',
+            errors=u'collect'
+        )
+        self.assertListEqual([c.text for c in vtt.captions], [u'Caption', u'Last'])
+        self.assertEqual(len(vtt.styles), 1)
+        self.assertListEqual(
+            [(d.line, d.kind) for d in vtt.diagnostics],
+            [(6, u'style_after_cue'), (10, u'invalid_timing')]
+        )
+
+    def test_read_collect_errors_capped(self):
+        parser = WebVTTParser(errors=u'collect', max_diagnostics=2)
+        parser.read(u'WEBVTT\n\n' + u'Broken\n\n' * 5 + u'00:01.000 --> 00:02.000\nCaption\n')
+        self.assertEqual(len(parser.captions), 1)
+        self.assertEqual(len(parser.diagnostics), 2)
+        self.assertEqual(parser.error_count, 5)
+
+    def test_read_strict_errors_default(self):
+        self.assertListEqual(webvtt.read(self._get_file(u'sample.vtt')).diagnostics, [])
+        self.assertRaises(ValueError, WebVTTParser, errors=u'ignore')
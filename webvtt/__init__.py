@@ -4,12 +4,19 @@ __version__ = u'0.4.2'
 from .webvtt import *
 from .segmenter import *
 from .structures import *
+from .table import *
+from .index import *
+from .sinks import *
 from .errors import *
 
-__all__ = webvtt.__all__ + segmenter.__all__ + structures.__all__ + errors.__all__
+__all__ = (webvtt.__all__ + segmenter.__all__ + structures.__all__ + table.__all__ + index.__all__ +
+           sinks.__all__ + errors.__all__)
 
 read = WebVTT.read
 from_srt = WebVTT.from_srt
 from_sbv = WebVTT.from_sbv
+load = WebVTT.load
+iter_captions = WebVTT.iter_captions
+aread = WebVTT.aread
 list_formats = WebVTT.list_formats
 segment = WebVTTSegmenter().segment
@@ -0,0 +1,64 @@
+u"""
+Runs blocking reads and writes of captions in a bounded pool of threads.
+
+The functions return a multiprocessing AsyncResult so the calling thread, for example
+the one running an event loop, is not blocked. The result can be waited with get()
+or received with a callback.
+"""
+
+from __future__ import absolute_import
+import threading
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+__all__ = []
+
+MAX_WORKERS = 4  # threads of the shared pool, read when the pool is created
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(MAX_WORKERS)
+        return _pool
+
+
+def submit(func, args=(), kwargs=None, callback=None):
+    u"""Runs the function in the shared pool and returns an AsyncResult."""
+    return _get_pool().apply_async(func, args, kwargs or {}, callback)
+
+
+def shutdown():
+    u"""Waits for the pending tasks and stops the shared pool. A new one is created when needed."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+
+def run_bounded(func, items, workers):
+    u"""
+    Calls the function with each item using a pool of workers threads, reading the items
+    as the tasks complete so at most twice the number of workers are pending at any time.
+    The first exception raised by a task is raised once the pending tasks are completed.
+    """
+    pool = ThreadPool(workers)
+    pending = deque()
+    try:
+        for item in items:
+            if len(pending) >= workers * 2:
+                pending.popleft().get()
+            pending.append(pool.apply_async(func, (item,)))
+        while pending:
+            pending.popleft().get()
+    finally:
+        for result in pending:
+            result.wait()
+        pool.close()
+        pool.join()
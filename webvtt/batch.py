@@ -0,0 +1,166 @@
+from __future__ import division
+from __future__ import absolute_import
+import os
+import glob
+import time
+import multiprocessing
+
+from .webvtt import WebVTT
+from .errors import MalformedFileError, MalformedCaptionError
+
+__all__ = [u'convert_files', u'BatchResult']
+
+READERS = {
+    u'.vtt': WebVTT.read,
+    u'.srt': WebVTT.from_srt,
+    u'.sbv': WebVTT.from_sbv,
+}
+
+OUTPUT_FORMATS = (u'vtt', u'srt')
+
+
+class BatchResult(object):
+    u"""Summary of a batch conversion."""
+
+    def __init__(self):
+        self.converted = []
+        self.failures = []
+        self.total_captions = 0
+        self.total_bytes = 0
+        self.elapsed = 0
+
+    def __repr__(self):
+        return u'<%(cls)s converted=%(converted)s failures=%(failures)s>' % {
+            u'cls': self.__class__.__name__,
+            u'converted': len(self.converted),
+            u'failures': len(self.failures)
+        }
+
+    @property
+    def total_files(self):
+        return len(self.converted) + len(self.failures)
+
+    def _rate(self, value):
+        return value / self.elapsed if self.elapsed else 0
+
+    @property
+    def files_per_second(self):
+        return self._rate(self.total_files)
+
+    @property
+    def captions_per_second(self):
+        return self._rate(self.total_captions)
+
+    @property
+    def megabytes_per_second(self):
+        return self._rate(self.total_bytes / (1024 * 1024))
+
+
+def expand_paths(patterns):
+    u"""Expands the glob patterns into a sorted list of unique file paths."""
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        paths.update(matches if matches else [pattern])
+    return sorted(paths)
+
+
+def output_path(path, output=None, format=u'vtt'):
+    u"""Returns the path of the file a caption file is converted to."""
+    output = output or os.path.dirname(os.path.abspath(path))
+    return os.path.join(output, os.path.splitext(os.path.basename(path))[0] + u'.' + format)
+
+
+def convert_file(path, output=None, format=u'vtt', detect=False):
+    u"""
+    Converts a caption file to the given format and returns the number of captions.
+    The output is saved next to the source file unless an output directory is provided.
+    With detect the format is detected from the content instead of the file extension.
+    Raises IOError instead of overwriting the source file with the output.
+    """
+    output = output or os.path.dirname(os.path.abspath(path))
+    target = output_path(path, output, format)
+    if os.path.exists(target) and os.path.samefile(target, path):
+        raise IOError(u'The output would overwrite the source file, choose another output directory.')
+
+    if detect:
+        vtt = WebVTT.load(path)
+    else:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in READERS:
+            raise MalformedFileError(u'Unsupported file format: {}'.format(extension))
+        vtt = READERS[extension](path)
+    if format == u'srt':
+        vtt.save_as_srt(output)
+    else:
+        vtt.save(output)
+    return len(vtt.captions)
+
+
+def _convert_job(job):
+    path, output, format, detect = job
+    try:
+        size = os.path.getsize(path)
+        return path, convert_file(path, output, format, detect), size, None
+    except (MalformedFileError, MalformedCaptionError, IOError, OSError, UnicodeDecodeError), e:
+        return path, 0, 0, u'{}: {}'.format(e.__class__.__name__, e)
+
+
+def convert_files(paths, output=None, format=u'vtt', workers=None, callback=None, detect=False):
+    u"""
+    Converts caption files in parallel using a pool of worker processes.
+    Files that fail to convert are reported in the result without stopping the batch.
+    The callback, if provided, is called with the path and error (or None) of every file
+    as soon as it is processed. With detect the format of every file is detected from
+    its content instead of its extension. A file converted to the same output as a previous
+    one, like files with the same name in different formats, is reported as a failure
+    instead of overwriting it.
+    """
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(u'Unsupported output format: {}'.format(format))
+    if output and not os.path.exists(output):
+        os.makedirs(output)
+
+    workers = workers or multiprocessing.cpu_count()
+    result = BatchResult()
+    start = time.time()
+
+    # the workers would write the same output concurrently, only the first file is converted
+    jobs = []
+    targets = {}
+    for path in paths:
+        target = os.path.normcase(os.path.abspath(output_path(path, output, format)))
+        if target in targets:
+            error = u'IOError: The output would overwrite the output of {}.'.format(targets[target])
+            result.failures.append((path, error))
+            if callback is not None:
+                callback(path, error)
+        else:
+            targets[target] = path
+            jobs.append((path, output, format, detect))
+
+    if workers == 1:
+        pool = None
+        outcomes = (_convert_job(job) for job in jobs)
+    else:
+        pool = multiprocessing.Pool(workers)
+        chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+        outcomes = pool.imap_unordered(_convert_job, jobs, chunksize)
+
+    try:
+        for path, captions, size, error in outcomes:
+            if error is None:
+                result.converted.append(path)
+                result.total_captions += captions
+                result.total_bytes += size
+            else:
+                result.failures.append((path, error))
+            if callback is not None:
+                callback(path, error)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    result.elapsed = time.time() - start
+    return result
@@ -0,0 +1,314 @@
+u"""
+Compact binary format of parsed caption documents.
+
+Loading a binary file avoids parsing the text again. The layout, little-endian and with
+every section aligned to 8 bytes, is:
+
+    header      magic, version and the number of captions, strings, styles and regions
+    starts      int64 per caption, milliseconds
+    ends        int64 per caption, milliseconds
+    texts       uint32 per caption, index of the cue text (lines joined by \\n) in the string table
+    identifiers uint32 per caption, index in the string table or NO_STRING
+    settings    uint32 per caption, index in the string table or NO_STRING
+    styles      uint32 per style, index of the style lines joined by \\n
+    regions     uint32 per region, index of the region settings joined by \\n
+    offsets     uint32 per string plus one, offsets of the strings in the string data
+    strings     UTF-8 data of the distinct strings, each one followed by a null character
+
+Files are memory mapped when loaded so timings are read directly from the file and
+strings are only decoded when accessed.
+"""
+
+from __future__ import with_statement
+from __future__ import absolute_import
+import os
+import sys
+import mmap
+import struct
+from array import array
+from itertools import izip
+from io import open
+
+from .errors import MalformedFileError
+from .structures import Caption, Style, Region
+from .table import CaptionTable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = []
+
+MAGIC = b'WVTB'
+VERSION = 1
+NO_STRING = 0xFFFFFFFF
+
+HEADER = struct.Struct('<4sHHQQQQ')  # magic, version, reserved, captions, strings, styles, regions
+
+
+def _typecode(codes, size):
+    for code in codes:
+        try:
+            if array(code).itemsize == size:
+                return code
+        except ValueError:
+            # 'q' and 'Q' are not available before Python 3.3
+            continue
+    raise ImportError(u'No array type of {} bytes available.'.format(size))
+
+
+INT64 = _typecode('ql', 8)
+UINT32 = _typecode('IL', 4)
+
+
+def _pack(typecode, values):
+    data = array(typecode, values)
+    if sys.byteorder == u'big':
+        data.byteswap()
+    return data.tostring()
+
+
+def _unpack(typecode, buffer, offset, count):
+    data = array(typecode)
+    data.fromstring(buffer[offset:offset + count * data.itemsize])
+    if sys.byteorder == u'big':
+        data.byteswap()
+    return data
+
+
+def _padding(size):
+    return b'\0' * (-size % 8)
+
+
+def dumps(captions, styles=None, regions=None):
+    u"""Returns the binary representation of the captions, styles and regions."""
+    strings = []
+    references = {}
+
+    def reference(value):
+        if value is None:
+            return NO_STRING
+        index = references.get(value)
+        if index is None:
+            index = references[value] = len(strings)
+            strings.append(value.encode(u'utf-8') + b'\0')
+        return index
+
+    starts = array(INT64)
+    ends = array(INT64)
+    texts = array(UINT32)
+    identifiers = array(UINT32)
+    settings = array(UINT32)
+    for caption in captions:
+        starts.append(caption.start_ms)
+        ends.append(caption.end_ms)
+        texts.append(reference(caption.raw_text))
+        identifiers.append(reference(caption.identifier))
+        settings.append(reference(caption.raw_settings))
+
+    style_references = [reference(u'\n'.join(style.lines)) for style in styles or ()]
+    region_references = [reference(region.text) for region in regions or ()]
+
+    offsets = [0]
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    if offsets[-1] > NO_STRING:
+        raise ValueError(u'The captions are too large for the binary format.')
+
+    sections = [
+        HEADER.pack(MAGIC, VERSION, 0, len(starts), len(strings), len(style_references), len(region_references)),
+        _pack(INT64, starts),
+        _pack(INT64, ends),
+        _pack(UINT32, texts),
+        _pack(UINT32, identifiers),
+        _pack(UINT32, settings),
+        _pack(UINT32, style_references),
+        _pack(UINT32, region_references),
+        _pack(UINT32, offsets),
+        b''.join(strings),
+    ]
+    return b''.join(section + _padding(len(section)) for section in sections)
+
+
+class BinaryDocument(object):
+    u"""
+    Captions loaded from the binary format, given as a path or the data in bytes.
+
+    Timings are arrays of milliseconds (NumPy arrays reading the file without copies when
+    NumPy is installed) and texts, identifiers and settings are decoded when accessed.
+    Close the document, or use it as a context manager, to release the file.
+    """
+
+    def __init__(self, source):
+        self._file = None
+        # binary data always contains null bytes so it is never taken for a path
+        if isinstance(source, basestring) and b'\0' not in source:
+            with open(source, u'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    raise MalformedFileError(u'The file is empty.')
+                self._file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = self._file
+        else:
+            buffer = source
+        self._buffer = buffer
+        self._decoded = {}
+
+        try:
+            self._read_sections()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_sections(self):
+        buffer = self._buffer
+        if len(buffer) < HEADER.size:
+            raise MalformedFileError(u'The file is not a binary captions file.')
+        magic, version, _, total, total_strings, total_styles, total_regions = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise MalformedFileError(u'The file is not a binary captions file.')
+        if version != VERSION:
+            raise MalformedFileError(u'Unsupported binary captions version {}.'.format(version))
+
+        offset = HEADER.size
+        self.starts, offset = self._timings(offset, total)
+        self.ends, offset = self._timings(offset, total)
+        self._texts, offset = self._section(UINT32, offset, total)
+        self._identifiers, offset = self._section(UINT32, offset, total)
+        self._settings, offset = self._section(UINT32, offset, total)
+        self._styles, offset = self._section(UINT32, offset, total_styles)
+        self._regions, offset = self._section(UINT32, offset, total_regions)
+        self._offsets, offset = self._section(UINT32, offset, total_strings + 1)
+        self._strings_offset = offset
+        self._check_size(offset + self._offsets[-1])
+
+    def _timings(self, offset, count):
+        if numpy is not None:
+            self._check_size(offset + count * 8)
+            timings = numpy.frombuffer(self._buffer, dtype='<i8', count=count, offset=offset)
+            return timings, offset + count * 8
+        return self._section(INT64, offset, count)
+
+    def _section(self, typecode, offset, count):
+        size = count * array(typecode).itemsize
+        self._check_size(offset + size)
+        return _unpack(typecode, self._buffer, offset, count), offset + size + (-size % 8)
+
+    def _check_size(self, size):
+        if size > len(self._buffer):
+            raise MalformedFileError(u'The binary captions file is truncated.')
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __repr__(self):
+        return u'<%(cls)s captions=%(captions)s>' % {u'cls': self.__class__.__name__, u'captions': len(self)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        u"""
+        Releases the memory mapped file. The timings can still be used after closing: with
+        NumPy they are views of the file, which stays mapped until they are released too.
+        """
+        if self._file is not None:
+            if numpy is None:
+                self._file.close()
+            # unmapping the file under the NumPy views would crash when they are used,
+            # the views keep a reference to it and the file is unmapped after the last one
+            self._file = None
+
+    def _string(self, index):
+        if index == NO_STRING:
+            return None
+        value = self._decoded.get(index)
+        if value is None:
+            start = self._strings_offset + self._offsets[index]
+            end = self._strings_offset + self._offsets[index + 1] - 1
+            value = self._decoded[index] = self._buffer[start:end].decode(u'utf-8')
+        return value
+
+    def _strings(self):
+        u"""Returns the list of all the strings decoding the string data at once."""
+        total = len(self._offsets) - 1
+        if not total:
+            return []
+        data = self._buffer[self._strings_offset:self._strings_offset + self._offsets[-1]]
+        strings = data.decode(u'utf-8').split(u'\0')
+        if len(strings) != total + 1:
+            # some strings contain null characters
+            return [self._string(index) for index in xrange(total)]
+        return strings
+
+    def text(self, index):
+        u"""Returns the text of a caption with its cue tags."""
+        return self._string(self._texts[index])
+
+    def identifier(self, index):
+        u"""Returns the identifier of a caption or None."""
+        return self._string(self._identifiers[index])
+
+    def settings(self, index):
+        u"""Returns the raw settings of a caption or None."""
+        return self._string(self._settings[index])
+
+    def caption(self, index):
+        u"""Returns a new caption with the data of the caption in the given position."""
+        text = self.text(index)
+        caption = Caption(int(self.starts[index]), int(self.ends[index]), text.split(u'\n') if text else [])
+        caption.identifier = self.identifier(index)
+        caption.raw_settings = self.settings(index)
+        return caption
+
+    @property
+    def captions(self):
+        u"""Returns a list of new captions."""
+        strings = self._strings()
+        strings.append(None)  # NO_STRING is -1 once converted to a signed index
+        captions = []
+        append = captions.append
+        rows = izip(self.starts, self.ends, self._texts, self._identifiers, self._settings)
+        for start, end, text, identifier, settings in rows:
+            text = strings[text if text != NO_STRING else -1]
+            append(Caption._from_ms(
+                int(start),
+                int(end),
+                text.split(u'\n') if text else [],
+                strings[identifier if identifier != NO_STRING else -1],
+                strings[settings if settings != NO_STRING else -1]
+            ))
+        return captions
+
+    @property
+    def styles(self):
+        u"""Returns a list of new styles."""
+        styles = []
+        for index in self._styles:
+            style = Style()
+            style.lines = self._string(index).split(u'\n')
+            styles.append(style)
+        return styles
+
+    @property
+    def regions(self):
+        u"""Returns a list of new regions."""
+        return [Region.parse(self._string(index).split(u'\n')) for index in self._regions]
+
+    def to_table(self):
+        u"""Returns the captions as a CaptionTable."""
+        return CaptionTable(
+            self.starts,
+            self.ends,
+            [self.text(index) for index in xrange(len(self))],
+            [self.identifier(index) for index in xrange(len(self))],
+            [self.settings(index) for index in xrange(len(self))]
+        )
+
+
+def load(source):
+    u"""Returns the BinaryDocument of a path or data in bytes."""
+    return BinaryDocument(source)
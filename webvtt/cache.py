@@ -0,0 +1,197 @@
+u"""
+Optional cache of parsed caption files shared by the whole process.
+
+When enabled, reading the same source again returns new objects built from the cached
+result instead of parsing it again. Paths are identified by their size and modification
+time and contents by their SHA-1 hash. The cache keeps immutable snapshots of the
+captions, so changing the captions returned never affects the ones cached.
+
+    import webvtt
+
+    webvtt.cache.enable(max_entries=100, max_bytes=50 * 1024 * 1024)
+    vtt = webvtt.read('captions.vtt')  # parsed
+    vtt = webvtt.read('captions.vtt')  # copied from the cache
+    webvtt.cache.stats()
+"""
+
+from __future__ import absolute_import
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from .sources import is_path
+from .parsers import ERRORS_STRICT
+from .structures import Caption, Style, Region
+
+__all__ = []
+
+MAX_ENTRIES = 128
+MAX_BYTES = 64 * 1024 * 1024
+
+CacheStats = namedtuple(u'CacheStats', [u'hits', u'misses', u'entries', u'bytes'])
+
+_REGION_ATTRIBUTES = Region.__slots__
+
+_lock = threading.Lock()
+_cache = None  # the LRU cache when enabled
+
+
+class _LRUCache(object):
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key: (size, snapshot) from the least to the most recently used
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, size, snapshot):
+        if size > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[0]
+        self.entries[key] = size, snapshot
+        self.bytes += size
+        self.evict()
+
+    def evict(self):
+        u"""Discards the least recently used entries exceeding the limits."""
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (evicted_size, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+
+def enable(max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+    u"""
+    Enables the cache or changes its limits: the maximum number of files cached and
+    the maximum total size in bytes of their sources.
+    """
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = _LRUCache(max_entries, max_bytes)
+        else:
+            _cache.max_entries = max_entries
+            _cache.max_bytes = max_bytes
+            _cache.evict()
+
+
+def disable():
+    u"""Disables the cache and discards its entries."""
+    global _cache
+    with _lock:
+        _cache = None
+
+
+def is_enabled():
+    u"""Returns True if the cache is enabled."""
+    return _cache is not None
+
+
+def clear():
+    u"""Discards the entries of the cache and resets its counters."""
+    with _lock:
+        if _cache is not None:
+            _cache.__init__(_cache.max_entries, _cache.max_bytes)
+
+
+def stats():
+    u"""Returns the hits, misses, number of entries and total size in bytes of the cache."""
+    with _lock:
+        if _cache is None:
+            return CacheStats(0, 0, 0, 0)
+        return CacheStats(_cache.hits, _cache.misses, len(_cache.entries), _cache.bytes)
+
+
+def _key(parser_class, source, errors):
+    u"""Returns the key and size of a source or None if the source cannot be cached."""
+    if is_path(source):
+        try:
+            st = os.stat(source)
+        except OSError:
+            # let the parser report the error
+            return None, 0
+        return (parser_class, errors, u'path', os.path.abspath(source), st.st_size, st.st_mtime), st.st_size
+
+    if isinstance(source, unicode):
+        source = source.encode(u'utf-8')
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return (parser_class, errors, u'content', hashlib.sha1(source).digest()), len(source)
+
+    # file objects can only be read once
+    return None, 0
+
+
+def _snapshot(parser):
+    captions = tuple(
+        (c.start_ms, c.end_ms, c.identifier, c.raw_settings, tuple(c.lines)) for c in parser.captions
+    )
+    styles = getattr(parser, u'styles', None)
+    if styles is not None:
+        styles = tuple(tuple(style.lines) for style in styles)
+    regions = getattr(parser, u'regions', None)
+    if regions is not None:
+        regions = tuple(tuple(getattr(region, name) for name in _REGION_ATTRIBUTES) for region in regions)
+    return captions, styles, regions, tuple(parser.diagnostics)
+
+
+def _restore(snapshot):
+    captions, styles, regions, diagnostics = snapshot
+
+    restored_captions = []
+    for start, end, identifier, raw_settings, lines in captions:
+        restored_captions.append(Caption._from_ms(start, end, list(lines), identifier, raw_settings))
+
+    restored_styles = None
+    if styles is not None:
+        restored_styles = []
+        for lines in styles:
+            style = Style()
+            style.lines = list(lines)
+            restored_styles.append(style)
+
+    restored_regions = None
+    if regions is not None:
+        restored_regions = [Region(**dict(zip(_REGION_ATTRIBUTES, values))) for values in regions]
+
+    return restored_captions, restored_styles, restored_regions, list(diagnostics)
+
+
+def parse(parser_class, source, errors=ERRORS_STRICT):
+    u"""
+    Returns the captions, styles, regions and diagnostics of the source parsed with the parser
+    class and errors mode, from the cache when enabled. Styles and regions are None for formats
+    without them.
+    """
+    cache = _cache
+    key = None
+    if cache is not None:
+        key, size = _key(parser_class, source, errors)
+        if key is not None:
+            with _lock:
+                snapshot = cache.get(key)
+            if snapshot is not None:
+                return _restore(snapshot)
+
+    parser = parser_class(errors=errors).read(source)
+    if key is not None:
+        # the snapshot does not share any mutable object with the parsed captions
+        snapshot = _snapshot(parser)
+        with _lock:
+            cache.put(key, size, snapshot)
+
+    return (parser.captions, getattr(parser, u'styles', None), getattr(parser, u'regions', None),
+            parser.diagnostics)
@@ -1,6 +1,7 @@
 u"""
 Usage:
   webvtt segment <file> [--target-duration=SECONDS] [--mpegts=OFFSET] [--output=<dir>]
+  webvtt convert (<files>... | --files-from=<list>) [--to=FORMAT] [--output=<dir>] [--workers=N] [--detect]
   webvtt -h | --help
   webvtt --version
 
@@ -9,16 +10,28 @@ Options:
   --version                  Show version.
   --target-duration=SECONDS  Target duration of each segment in seconds [default: 10].
   --mpegts=OFFSET            Presentation timestamp value [default: 900000].
-  --output=<dir>             Output to directory [default: ./].
+  --output=<dir>             Output to directory (segment defaults to the current directory
+                             and convert to the directory of each file, never overwriting
+                             the files converted).
+  --to=FORMAT                Output format of the converted files: vtt or srt [default: vtt].
+  --files-from=<list>        Read the files to convert from a file with one path per line.
+  --workers=N                Number of worker processes (defaults to the number of CPUs).
+  --detect                   Detect the format of the files from their content instead of
+                             their extension.
 
 Examples:
   webvtt segment captions.vtt --output destination/directory
+  webvtt convert "captions/*.srt" --to=vtt --workers=8
+  webvtt convert "incoming/*" --detect
 """
 
+from __future__ import print_function
 from __future__ import absolute_import
+from io import open
 from docopt import docopt
 
 from . import WebVTTSegmenter, __version__
+from .batch import convert_files, expand_paths
 
 
 def main():
@@ -27,10 +40,19 @@ def main():
     if options[u'segment']:
         segment(
             options[u'<file>'],
-            options[u'--output'],
+            options[u'--output'] or u'',
             options[u'--target-duration'],
             options[u'--mpegts'],
         )
+    elif options[u'convert']:
+        convert(
+            options[u'<files>'],
+            options[u'--files-from'],
+            options[u'--output'],
+            options[u'--to'],
+            options[u'--workers'],
+            options[u'--detect'],
+        )
 
 
 def segment(f, output, target_duration, mpegts):
@@ -45,4 +67,35 @@ def segment(f, output, target_duration, mpegts):
     except ValueError:
         exit(u'Error: Invalid MPEGTS value.')
 
-    WebVTTSegmenter().segment(f, output, target_duration, mpegts)
\ No newline at end of file
+    WebVTTSegmenter().segment(f, output, target_duration, mpegts)
+
+
+def convert(files, files_from, output, output_format, workers, detect=False):
+    u"""Convert command."""
+    if output_format not in (u'vtt', u'srt'):
+        exit(u'Error: Invalid output format.')
+
+    try:
+        workers = int(workers) if workers else None
+    except ValueError:
+        exit(u'Error: Invalid number of workers.')
+
+    if files_from:
+        with open(files_from, encoding=u'utf-8') as f:
+            paths = [line.strip() for line in f if line.strip()]
+    else:
+        paths = expand_paths(files)
+
+    def report(path, error):
+        if error is not None:
+            print(u'FAILED {}: {}'.format(path, error))
+
+    result = convert_files(paths, output, output_format, workers, callback=report, detect=detect)
+
+    print(u'{} files converted, {} failed in {:.2f}s'.format(
+        len(result.converted), len(result.failures), result.elapsed))
+    print(u'{:.1f} files/s, {:.1f} cues/s, {:.2f} MB/s'.format(
+        result.files_per_second, result.captions_per_second, result.megabytes_per_second))
+
+    if result.failures:
+        exit(1)
@@ -0,0 +1,182 @@
+u"""
+Tokenizer and node tree for the text of WebVTT cues.
+
+The cue text is split into text, start tag, end tag and timestamp tokens. Tags can have
+classes (<c.yellow.bg_blue>) and an annotation (<v Speaker>, <lang en>), and HTML character
+references are decoded in the text.
+"""
+
+from __future__ import absolute_import
+import re
+from htmlentitydefs import name2codepoint
+
+__all__ = [u'Node', u'Timestamp', u'tokenize', u'parse']
+
+TAG_PATTERN = re.compile(u'<([^>]*)>')
+TIMESTAMP_PATTERN = re.compile(u'(?:(\\d+):)?(\\d{2}):(\\d{2})\\.(\\d{3})$')
+REFERENCE_PATTERN = re.compile(u'&(#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);')
+
+TAGS = frozenset([u'c', u'i', u'b', u'u', u'ruby', u'rt', u'v', u'lang'])
+
+TEXT = u'text'
+START_TAG = u'start'
+END_TAG = u'end'
+TIMESTAMP = u'timestamp'
+
+
+def _unescape_reference(match):
+    reference = match.group(1)
+    try:
+        if reference[:2] in (u'#x', u'#X'):
+            return unichr(int(reference[2:], 16))
+        if reference[0] == u'#':
+            return unichr(int(reference[1:]))
+        return unichr(name2codepoint[reference])
+    except (KeyError, ValueError, OverflowError):
+        return match.group(0)
+
+
+def unescape(text):
+    u"""Decodes the HTML character references of a text."""
+    if u'&' not in text:
+        return text
+    return REFERENCE_PATTERN.sub(_unescape_reference, text)
+
+
+def tokenize(text):
+    u"""
+    Yields the tokens of a cue text as tuples:
+
+        (TEXT, text)
+        (START_TAG, name, classes, annotation)
+        (END_TAG, name)
+        (TIMESTAMP, milliseconds)
+    """
+    position = 0
+    for match in TAG_PATTERN.finditer(text):
+        if match.start() > position:
+            yield TEXT, unescape(text[position:match.start()])
+        position = match.end()
+
+        content = match.group(1)
+        if content[:1] == u'/':
+            yield END_TAG, content[1:].strip()
+            continue
+
+        timestamp = TIMESTAMP_PATTERN.match(content)
+        if timestamp:
+            hours, minutes, seconds, milliseconds = timestamp.groups()
+            yield TIMESTAMP, ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(milliseconds)
+            continue
+
+        parts = content.split(None, 1)
+        classes = parts[0].split(u'.') if parts else [u'']
+        annotation = unescape(parts[1].strip()) if len(parts) > 1 else None
+        yield START_TAG, classes[0], tuple(c for c in classes[1:] if c), annotation
+
+    if position < len(text):
+        yield TEXT, unescape(text[position:])
+
+
+class Timestamp(object):
+    u"""Timestamp inside the cue text, in milliseconds."""
+
+    __slots__ = ('ms',)
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    # protocols 0 and 1 of pickle in Python 2 need the state of classes with __slots__
+    def __getstate__(self):
+        return self.ms
+
+    def __setstate__(self, state):
+        self.ms = state
+
+    def __repr__(self):
+        return u'<%(cls)s ms=%(ms)s>' % {u'cls': self.__class__.__name__, u'ms': self.ms}
+
+
+class Node(object):
+    u"""
+    Element of the cue text (class, italic, bold, underline, ruby, ruby text, voice or language).
+    Its children are strings of text, timestamps and other nodes.
+    The root node of a cue has no tag.
+    """
+
+    __slots__ = ('tag', 'classes', 'annotation', 'children')
+
+    def __init__(self, tag=None, classes=(), annotation=None):
+        self.tag = tag
+        self.classes = classes
+        self.annotation = annotation
+        self.children = []
+
+    def __getstate__(self):
+        return self.tag, self.classes, self.annotation, self.children
+
+    def __setstate__(self, state):
+        self.tag, self.classes, self.annotation, self.children = state
+
+    def __repr__(self):
+        return u'<%(cls)s tag=%(tag)s children=%(children)s>' % {
+            u'cls': self.__class__.__name__,
+            u'tag': self.tag,
+            u'children': len(self.children)
+        }
+
+    def iter(self, tag=None):
+        u"""Yields this node and its descendant nodes, optionally only the ones with a tag."""
+        if tag is None or self.tag == tag:
+            yield self
+        for child in self.children:
+            if isinstance(child, Node):
+                for node in child.iter(tag):
+                    yield node
+
+    @property
+    def text(self):
+        u"""Returns the plain text of the node."""
+        return u''.join(self._iter_text())
+
+    def _iter_text(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                for text in child._iter_text():
+                    yield text
+            elif not isinstance(child, Timestamp):
+                yield child
+
+
+def parse(text):
+    u"""Returns the node tree of a cue text."""
+    root = Node()
+    stack = [root]
+
+    for token in tokenize(text):
+        kind = token[0]
+        if kind == TEXT:
+            stack[-1].children.append(token[1])
+        elif kind == TIMESTAMP:
+            stack[-1].children.append(Timestamp(token[1]))
+        elif kind == START_TAG:
+            _, tag, classes, annotation = token
+            if tag not in TAGS:
+                continue
+            if tag == u'rt' and stack[-1].tag != u'ruby':
+                continue
+            node = Node(tag, classes, annotation)
+            stack[-1].children.append(node)
+            stack.append(node)
+        else:
+            tag = token[1]
+            if tag == u'ruby' and stack[-1].tag == u'rt':
+                # closing a ruby also closes its open ruby text
+                stack.pop()
+            # only a tag that is open can be closed and closing <v> and <lang> is optional
+            for index in xrange(len(stack) - 1, 0, -1):
+                if stack[index].tag == tag:
+                    del stack[index:]
+                    break
+
+    return root
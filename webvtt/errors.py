@@ -1,5 +1,8 @@
 
-__all__ = [u'MalformedFileError', u'MalformedCaptionError', u'InvalidCaptionsError', u'MissingFilenameError']
+from collections import namedtuple
+
+__all__ = [u'MalformedFileError', u'MalformedCaptionError', u'InvalidCaptionsError', u'MissingFilenameError',
+           u'Diagnostic']
 
 
 class MalformedFileError(Exception):
@@ -16,3 +19,7 @@ class InvalidCaptionsError(Exception):
 
 class MissingFilenameError(Exception):
     u"""Error raised when saving a file without filename."""
+
+
+# problem skipped or repaired when parsing captions with errors='collect'
+Diagnostic = namedtuple(u'Diagnostic', [u'line', u'kind', u'message'])
@@ -0,0 +1,82 @@
+from __future__ import absolute_import
+from math import floor
+from operator import attrgetter
+from itertools import izip
+
+from .structures import Caption
+
+__all__ = [u'CaptionIndex']
+
+
+class CaptionIndex(object):
+    u"""
+    Index answering which captions are visible at a given time or during a time range.
+
+    The captions are sorted by start time and arranged as an implicit balanced tree where
+    every node keeps the maximum end time of its subtree, so the subtrees that cannot
+    contain matches are skipped. Queries take logarithmic time plus the number of matches.
+    Times are expressed in milliseconds and a caption is visible from its start (inclusive)
+    until its end (exclusive).
+    """
+
+    def __init__(self, captions):
+        self.captions = sorted(captions, key=attrgetter(u'start_ms'))
+        self.starts = [c.start_ms for c in self.captions]
+        self.ends = [c.end_ms for c in self.captions]
+        self.max_ends = list(self.ends)
+        self._build(0, len(self.captions))
+
+        self.captions_version = getattr(captions, u'version', None)
+        self.timing_version = Caption.timing_version
+
+    def __len__(self):
+        return len(self.captions)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        max_end = max(self.ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        self.max_ends[mid] = max_end
+        return max_end
+
+    def _search(self, lo, hi, start, end, result):
+        # collects the captions starting before end and ending after start, in order of start time
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self.max_ends[mid] <= start:
+            return
+        self._search(lo, mid, start, end, result)
+        if self.starts[mid] < end:
+            if self.ends[mid] > start:
+                result.append(self.captions[mid])
+            self._search(mid + 1, hi, start, end, result)
+
+    def is_valid_for(self, captions):
+        u"""Returns True if the captions did not change since the index was built."""
+        if self.captions_version is None or self.captions_version != getattr(captions, u'version', None):
+            return False
+
+        if self.timing_version != Caption.timing_version:
+            # the timing of some caption changed, maybe of another document: compare the timings
+            # of these captions with the ones indexed, which is cheaper than rebuilding the index
+            for caption, start, end in izip(self.captions, self.starts, self.ends):
+                if caption.start_ms != start or caption.end_ms != end:
+                    return False
+            self.timing_version = Caption.timing_version
+        return True
+
+    def at(self, ms):
+        u"""Returns the captions visible at the given time."""
+        result = []
+        # timings are integer milliseconds so this includes the captions starting at ms
+        ms = int(floor(ms))
+        self._search(0, len(self.captions), ms, ms + 1, result)
+        return result
+
+    def between(self, start, end):
+        u"""Returns the captions visible at any time from start until end (exclusive)."""
+        result = []
+        self._search(0, len(self.captions), start, end, result)
+        return result
@@ -0,0 +1,232 @@
+u"""
+Normalization of the cues of a document: merging duplicated cues, splitting overlapping
+cues into non-overlapping intervals, dropping empty intervals and enforcing a minimum gap.
+
+All the steps work on the captions sorted by time and run in O(n log n). Overlapping captions
+are split sweeping over the boundaries of each group of overlapping captions.
+
+Roll-up captions, where every cue repeats the last lines of the previous one, can also be
+collapsed into pop-on captions showing every line once.
+"""
+
+from __future__ import absolute_import
+import heapq
+from bisect import insort
+from itertools import izip, islice
+
+from .structures import Caption
+
+__all__ = []
+
+
+HASH_BASE = 1000003
+HASH_MODULUS = (1 << 61) - 1
+ROLLUP_MAX_GAP = 100  # milliseconds between captions of a roll-up sequence
+
+# the steps work on rows of [start, end, text, source caption, lines or None for the lines of the source]
+START, END, TEXT, SOURCE, LINES = xrange(5)
+
+
+def _rows(captions):
+    return [[c.start_ms, c.end_ms, c.raw_text, c, None] for c in captions]
+
+
+def _captions(rows):
+    captions = []
+    for start, end, _, source, lines in rows:
+        if lines is None and start == source.start_ms and end == source.end_ms:
+            captions.append(source)
+        else:
+            # only the captions kept whole keep their identifier
+            captions.append(Caption._from_ms(
+                start,
+                end,
+                list(source.lines if lines is None else lines),
+                source.identifier if lines is None else None,
+                source.raw_settings
+            ))
+    return captions
+
+
+def merge_duplicates(rows):
+    u"""
+    Merges the rows of captions with identical text that overlap or touch.
+    The rows must be sorted by start.
+    """
+    result = []
+    last_by_text = {}
+    for row in rows:
+        last = last_by_text.get(row[TEXT])
+        if last is not None and row[START] <= last[END]:
+            if row[END] > last[END]:
+                last[END] = row[END]
+            continue
+        last_by_text[row[TEXT]] = row
+        result.append(row)
+    return result
+
+
+def _split_group(rows, result):
+    # sweep over the boundaries of a group of overlapping rows
+    boundaries = sorted(set(row[START] for row in rows) | set(row[END] for row in rows))
+    ending = []  # heap of (end, order) of the visible rows
+    visible = []  # orders of the visible rows, sorted
+    count = len(rows)
+    order = 0
+
+    for start, end in izip(boundaries, islice(boundaries, 1, None)):
+        while order < count and rows[order][START] <= start:
+            heapq.heappush(ending, (rows[order][END], order))
+            insort(visible, order)
+            order += 1
+        while ending and ending[0][0] <= start:
+            visible.remove(heapq.heappop(ending)[1])
+
+        first = rows[visible[0]]
+        if len(visible) == 1:
+            if start == first[START] and end == first[END]:
+                result.append(first)
+            else:
+                # a part of the caption does not keep its identifier
+                lines = first[SOURCE].lines if first[LINES] is None else first[LINES]
+                result.append([start, end, first[TEXT], first[SOURCE], lines])
+        else:
+            lines = []
+            for index in visible:
+                row = rows[index]
+                lines.extend(row[SOURCE].lines if row[LINES] is None else row[LINES])
+            result.append([start, end, u'\n'.join(lines), first[SOURCE], lines])
+
+
+def split_overlaps(rows):
+    u"""
+    Splits overlapping rows into non-overlapping rows with the lines of all the captions
+    visible in each interval, in order of start. The rows must be sorted by start.
+    """
+    result = []
+    group = []
+    group_end = None
+    for row in rows:
+        if group and row[START] >= group_end:
+            # rows that do not overlap any other are kept as they are
+            if len(group) == 1:
+                result.append(group[0])
+            else:
+                _split_group(group, result)
+            group = []
+        if not group or row[END] > group_end:
+            group_end = row[END]
+        group.append(row)
+
+    if len(group) == 1:
+        result.append(group[0])
+    elif group:
+        _split_group(group, result)
+    return result
+
+
+def enforce_gap(rows, min_gap, merge=True):
+    u"""
+    Ends every row at least min_gap milliseconds before the next one starts, trimming the rows
+    that overlap it too, and drops the rows left without duration. When merge is true, consecutive
+    rows with identical text and no gap between them are merged. The rows must be sorted by start.
+    """
+    result = []
+    previous = None
+    for row in rows:
+        if previous is not None:
+            if merge and previous[END] == row[START] and previous[TEXT] == row[TEXT]:
+                previous[END] = row[END]
+                continue
+            # the rows before previous already end min_gap before it starts
+            if min_gap and row[START] < previous[END] + min_gap:
+                end = row[START] - min_gap
+                if end > previous[START]:
+                    previous[END] = end
+                else:
+                    result.pop()
+        result.append(row)
+        previous = row
+    return result
+
+
+def normalize(captions, merge=True, split=True, min_gap=0):
+    u"""
+    Returns the captions sorted by time without zero-length captions, merging the duplicated
+    ones when merge is true, splitting the overlapping ones when split is true and leaving
+    at least min_gap milliseconds between consecutive captions. The captions given are not
+    modified; the ones that do not change are returned as they are.
+    """
+    rows = _rows(c for c in captions if c.end_ms > c.start_ms)
+    rows.sort(key=lambda row: (row[START], row[END]))
+    if merge:
+        rows = merge_duplicates(rows)
+    if split:
+        rows = split_overlaps(rows)
+    return _captions(enforce_gap(rows, min_gap, merge))
+
+
+def _line_hashes(lines):
+    return [hash(line) % HASH_MODULUS for line in lines]
+
+
+def _overlap(previous, previous_hashes, lines, hashes):
+    u"""Returns the number of the last lines of previous that are the first lines of lines."""
+    # rolling hashes of the suffixes of previous and the prefixes of lines, longer on every step
+    overlap = 0
+    prefix = suffix = 0
+    power = 1
+    count = len(previous)
+    for length in xrange(1, min(count, len(lines)) + 1):
+        prefix = (prefix * HASH_BASE + hashes[length - 1]) % HASH_MODULUS
+        suffix = (previous_hashes[count - length] * power + suffix) % HASH_MODULUS
+        power = power * HASH_BASE % HASH_MODULUS
+        if prefix == suffix and previous[count - length:] == lines[:length]:
+            overlap = length
+    return overlap
+
+
+def collapse_rollup(captions, max_gap=ROLLUP_MAX_GAP):
+    u"""
+    Returns the captions with the roll-up sequences collapsed into pop-on captions showing
+    every line once. A caption continues a roll-up sequence when its first lines are the last
+    lines of the previous caption and it starts at most max_gap milliseconds after the previous
+    one ends. Each pop-on caption has the lines added by a caption, starts with it and ends
+    when the next pop-on caption of the sequence starts, so no line is shown before it is in
+    the original captions. Other captions are returned as they are.
+    """
+    result = []
+    block = None  # [start, lines, first caption] of the pop-on caption being built
+    previous = previous_hashes = None
+
+    def close(end):
+        start, lines, first = block
+        if start == first.start_ms and end == first.end_ms and lines == first.lines:
+            result.append(first)
+        else:
+            result.append(Caption._from_ms(start, end, lines, None, first.raw_settings))
+
+    for caption in captions:
+        lines = caption.lines
+        hashes = _line_hashes(lines)
+        overlap = 0
+        if previous is not None and caption.start_ms <= previous.end_ms + max_gap:
+            overlap = _overlap(previous.lines, previous_hashes, lines, hashes)
+
+        if not overlap:
+            if block is not None:
+                close(previous.end_ms)
+            block = [caption.start_ms, list(lines), caption]
+        elif len(lines) > overlap:
+            if block[0] < caption.start_ms:
+                close(caption.start_ms)
+                block = [caption.start_ms, list(lines[overlap:]), caption]
+            else:
+                # added at the same time, so the lines are not shown before their caption
+                block[1].extend(lines[overlap:])
+
+        previous, previous_hashes = caption, hashes
+
+    if block is not None:
+        close(previous.end_ms)
+    return result
@@ -1,15 +1,27 @@
 from __future__ import with_statement
 from __future__ import absolute_import
 import re
-import os
-import codecs
 
-from .errors import MalformedFileError, MalformedCaptionError
-from .structures import Block, Style, Caption
-from io import open
-from itertools import ifilter
+from .errors import MalformedFileError, MalformedCaptionError, Diagnostic
+from .structures import Block, Style, Region, Caption
+from .sources import iter_lines, LineDecoder, NEWLINE_PATTERN, BOM
+from itertools import chain, islice
 from itertools import imap
 
+ERRORS_STRICT = u'strict'  # raise on the first malformed caption
+ERRORS_COLLECT = u'collect'  # skip or repair malformed captions and collect diagnostics
+MAX_DIAGNOSTICS = 100  # diagnostics kept when collecting errors
+
+
+def _timings(match):
+    u"""Returns the start and end in milliseconds from a match of a timeframe line pattern."""
+    hours, minutes, seconds, milliseconds, end_hours, end_minutes, end_seconds, end_milliseconds = match.groups()[:8]
+    return (
+        ((int(hours) if hours else 0) * 3600 + int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds),
+        ((int(end_hours) if end_hours else 0) * 3600 + int(end_minutes) * 60 + int(end_seconds)) * 1000 +
+        int(end_milliseconds)
+    )
+
 
 class TextBasedParser(object):
     u"""
@@ -17,50 +29,105 @@ class TextBasedParser(object):
     This is a generic class, do not use directly.
     """
 
-    TIMEFRAME_LINE_PATTERN = u''
+    TIMEFRAME_LINE_PATTERN = None  # compiled pattern capturing hours, minutes, seconds and ms of both timestamps
     PARSER_OPTIONS = {}
+    HEADER_LINES = 2  # number of lines needed to validate the format
+
+    def __init__(self, parse_options=None, errors=ERRORS_STRICT, max_diagnostics=MAX_DIAGNOSTICS):
+        if errors not in (ERRORS_STRICT, ERRORS_COLLECT):
+            raise ValueError(u'Unknown errors mode: {}'.format(errors))
 
-    def __init__(self, parse_options=None):
         self.captions = []
         self.parse_options = parse_options or {}
+        self.errors = errors
+        self.max_diagnostics = max_diagnostics
+        self.diagnostics = []
+        self.error_count = 0  # including the errors beyond max_diagnostics
+        self._line_decoder = None
+        self._head = None
 
     def read(self, file):
         u"""Reads the captions file."""
-        content = self._read_content(file)
-        self._validate(content)
-        self._parse(content)
+        self.captions = list(self.iter_captions(file))
 
         return self
 
-    def _read_content(self, file):
-
-        first_bytes = min(32, os.path.getsize(file))
-        with open(file, u'rb') as f:
-            raw = f.read(first_bytes)
+    def iter_captions(self, file):
+        u"""
+        Reads the captions file line by line and yields the captions as they are parsed.
+        The file can be a path, the content as text or bytes, a memory mapped file or
+        an opened file object.
+        """
+        lines = self._iter_lines(file)
 
-        if raw.startswith(codecs.BOM_UTF8):
-            encoding = u'utf-8-sig'
-        else:
-            encoding = u'utf-8'
+        head = list(islice(lines, self.HEADER_LINES))
+        if not head:
+            raise MalformedFileError(u'The file is empty.')
+        self._validate(head)
 
-        with open(file, encoding=encoding) as f:
-            lines = [line.rstrip(u'\n') for line in f.readlines()]
+        for caption in self._iter_parse(chain(head, lines)):
+            yield caption
 
-        if not lines:
+    def feed(self, data):
+        u"""
+        Parses a chunk of the captions file as text or bytes and returns the list of captions
+        completed by it. This allows parsing captions as they are received, for example from
+        a socket, without blocking. Call close once all the data has been fed.
+        """
+        if self._line_decoder is None:
+            self._line_decoder = LineDecoder()
+            self._head = []
+        return self._feed_lines(self._line_decoder.feed(data))
+
+    def close(self):
+        u"""Parses the remaining data fed and returns the list of the last captions."""
+        if self._line_decoder is None:
             raise MalformedFileError(u'The file is empty.')
 
-        return lines
+        captions = self._feed_lines(self._line_decoder.close())
+        head = self._head
+        self._line_decoder = self._head = None
+        if head is not None:
+            if not head:
+                raise MalformedFileError(u'The file is empty.')
+            # the file is shorter than the header
+            captions.extend(self._parse_head(head))
+
+        caption = self._finish()
+        if caption is not None:
+            captions.append(caption)
+        return captions
+
+    def _feed_lines(self, lines):
+        if self._head is not None:
+            self._head.extend(lines)
+            if len(self._head) < self.HEADER_LINES:
+                return []
+            lines, self._head = self._head, None
+            return self._parse_head(lines)
+
+        parse_line = self._parse_line
+        return [caption for caption in imap(parse_line, lines) if caption is not None]
+
+    def _parse_head(self, lines):
+        self._validate(lines[:self.HEADER_LINES])
+        self._start()
+        parse_line = self._parse_line
+        return [caption for caption in imap(parse_line, lines) if caption is not None]
+
+    def _iter_lines(self, file):
+        return iter_lines(file)
 
     def _parse_timeframe_line(self, line):
-        u"""Parse timeframe line and return start and end timestamps."""
+        u"""Parse timeframe line and return start and end in milliseconds."""
         tf = self._validate_timeframe_line(line)
         if not tf:
             raise MalformedCaptionError(u'Invalid time format')
 
-        return tf.group(1), tf.group(2)
+        return _timings(tf)
 
     def _validate_timeframe_line(self, line):
-        return re.match(self.TIMEFRAME_LINE_PATTERN, line)
+        return self.TIMEFRAME_LINE_PATTERN.match(line)
 
     def _is_timeframe_line(self, line):
         u"""
@@ -83,39 +150,82 @@ class TextBasedParser(object):
         """
         return False
 
-    def _parse(self, lines):
-        self.captions = []
-        c = None
-
-        for index, line in enumerate(lines):
-            if self._is_timeframe_line(line):
-                try:
-                    start, end = self._parse_timeframe_line(line)
-                except MalformedCaptionError, e:
-                    raise MalformedCaptionError(u'{} in line {}'.format(e, index + 1))
-                c = Caption(start, end)
-            elif self._should_skip_line(line, index, c):  # allow child classes to skip lines based on the content
-                continue
-            elif line:
-                if c is None:
-                    raise MalformedCaptionError(
-                        u'Caption missing timeframe in line {}.'.format(index + 1))
-                else:
-                    c.add_line(line)
-            else:
-                if c is None:
-                    continue
-                if not c.lines:
-                    if self.PARSER_OPTIONS.get(u'ignore_empty_captions', False):
-                        c = None
-                        continue
-                    raise MalformedCaptionError(u'Caption missing text in line {}.'.format(index + 1))
+    def _iter_parse(self, lines):
+        self._start()
+        parse_line = self._parse_line
 
-                self.captions.append(c)
-                c = None
+        for line in lines:
+            caption = parse_line(line)
+            if caption is not None:
+                yield caption
 
+        caption = self._finish()
+        if caption is not None:
+            yield caption
+
+    def _start(self):
+        u"""Resets the state of the parser before the first line."""
+        self._caption = None
+        self._line_number = 0
+        self._skipping = False
+        self.diagnostics = []
+        self.error_count = 0
+
+    def _error(self, error_class, kind, line_number, message):
+        u"""
+        Raises the error in strict mode. Otherwise records a diagnostic and returns
+        so the caller can skip or repair the malformed content.
+        """
+        if self.errors == ERRORS_STRICT:
+            raise error_class(message)
+
+        self.error_count += 1
+        if len(self.diagnostics) < self.max_diagnostics:
+            self.diagnostics.append(Diagnostic(line_number, kind, message))
+
+    def _parse_line(self, line):
+        u"""Parses the next line and returns the caption it completes or None."""
+        c = self._caption
+        index = self._line_number
+        self._line_number = index + 1
+
+        if self._is_timeframe_line(line):
+            try:
+                start, end = self._parse_timeframe_line(line)
+            except MalformedCaptionError, e:
+                self._error(MalformedCaptionError, u'invalid_timing', index + 1, u'{} in line {}'.format(e, index + 1))
+                # skip the caption
+                self._caption = None
+                self._skipping = True
+            else:
+                self._caption = Caption(start, end)
+        elif self._should_skip_line(line, index, c):  # allow child classes to skip lines based on the content
+            pass
+        elif line:
+            if c is not None:
+                c.add_line(line)
+            elif not self._skipping:
+                self._error(MalformedCaptionError, u'missing_timing', index + 1,
+                            u'Caption missing timeframe in line {}.'.format(index + 1))
+                # skip the rest of the lines without timeframe
+                self._skipping = True
+        else:
+            self._skipping = False
+            if c is not None:
+                self._caption = None
+                if c.lines:
+                    return c
+                if not self.PARSER_OPTIONS.get(u'ignore_empty_captions', False):
+                    self._error(MalformedCaptionError, u'missing_text', index + 1,
+                                u'Caption missing text in line {}.'.format(index + 1))
+        return None
+
+    def _finish(self):
+        u"""Returns the caption pending after the last line or None."""
+        c, self._caption = self._caption, None
         if c is not None and c.lines:
-            self.captions.append(c)
+            return c
+        return None
 
 
 class SRTParser(TextBasedParser):
@@ -123,7 +233,7 @@ class SRTParser(TextBasedParser):
     SRT parser.
     """
 
-    TIMEFRAME_LINE_PATTERN = re.compile(u'\s*(\d+:\d{2}:\d{2},\d{3})\s*-->\s*(\d+:\d{2}:\d{2},\d{3})')
+    TIMEFRAME_LINE_PATTERN = re.compile(u'\s*(\d+):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2}),(\d{3})')
 
     PARSER_OPTIONS = {
         u'ignore_empty_captions': True
@@ -145,32 +255,30 @@ class WebVTTParser(TextBasedParser):
     WebVTT parser.
     """
 
-    TIMEFRAME_LINE_PATTERN = re.compile(u'\s*((?:\d+:)?\d{2}:\d{2}.\d{3})\s*-->\s*((?:\d+:)?\d{2}:\d{2}.\d{3})')
+    TIMEFRAME_LINE_PATTERN = re.compile(
+        u'\s*(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})[ \t]*(.*)')
     COMMENT_PATTERN = re.compile(u'NOTE(?:\s.+|$)')
     STYLE_PATTERN = re.compile(u'STYLE[ \t]*$')
+    REGION_PATTERN = re.compile(u'REGION[ \t]*$')
 
-    def __init__(self):
-        super(WebVTTParser, self).__init__()
+    def __init__(self, parse_options=None, errors=ERRORS_STRICT, max_diagnostics=MAX_DIAGNOSTICS):
+        super(WebVTTParser, self).__init__(parse_options, errors, max_diagnostics)
         self.styles = []
+        self.regions = []
+        self._settings = {}  # identical cue settings share the same string
 
-    def _compute_blocks(self, lines):
-        blocks = []
-
-        for index, line in enumerate(lines, start=1):
-            if line:
-                if not blocks:
-                    blocks.append(Block(index))
-                if not blocks[-1].lines:
-                    blocks[-1].line_number = index
-                blocks[-1].lines.append(line)
-            else:
-                blocks.append(Block(index))
+    def _parse_timeframe_line(self, line):
+        u"""Parse timeframe line and return start and end in milliseconds and the cue settings."""
+        tf = self._validate_timeframe_line(line)
+        if not tf:
+            raise MalformedCaptionError(u'Invalid time format')
 
-        # filter out empty blocks and skip signature
-        self.blocks = list(ifilter(lambda x: x.lines, blocks))[1:]
+        start, end = _timings(tf)
+        return start, end, tf.group(9).rstrip() or None
 
     def _parse_cue_block(self, block):
-        caption = Caption()
+        identifier = None
+        lines = []
         cue_timings = None
 
         for line_number, line in enumerate(block.lines):
@@ -179,45 +287,85 @@ class WebVTTParser(TextBasedParser):
                     try:
                         cue_timings = self._parse_timeframe_line(line)
                     except MalformedCaptionError, e:
-                        raise MalformedCaptionError(
-                            u'{} in line {}'.format(e, block.line_number + line_number))
+                        self._error(MalformedCaptionError, u'invalid_timing', block.line_number + line_number,
+                                    u'{} in line {}'.format(e, block.line_number + line_number))
+                        return None
                 else:
-                    raise MalformedCaptionError(
-                        u'--> found in line {}'.format(block.line_number + line_number))
+                    self._error(MalformedCaptionError, u'invalid_timing', block.line_number + line_number,
+                                u'--> found in line {}'.format(block.line_number + line_number))
+                    return None
             elif line_number == 0:
-                caption.identifier = line
+                identifier = line
             else:
-                caption.add_line(line)
+                lines.append(line)
 
-        caption.start = cue_timings[0]
-        caption.end = cue_timings[1]
+        start, end, settings = cue_timings
+        caption = Caption(start, end, lines)
+        caption.identifier = identifier
+        if settings is not None:
+            caption.raw_settings = self._settings.setdefault(settings, settings)
         return caption
 
-    def _parse(self, lines):
-        self.captions = []
-        self._compute_blocks(lines)
-
-        for block in self.blocks:
-            if self._is_cue_block(block):
-                caption = self._parse_cue_block(block)
-                self.captions.append(caption)
-            elif self._is_comment_block(block):
-                continue
-            elif self._is_style_block(block):
-                if self.captions:
-                    raise MalformedFileError(
-                        u'Style block defined after the first cue in line {}.'
-                        .format(block.line_number))
-                style = Style()
-                style.lines = block.lines[1:]
-                self.styles.append(style)
+    def _start(self):
+        super(WebVTTParser, self)._start()
+        self.styles = []
+        self.regions = []
+        self._has_captions = False
+        self._in_signature = True
+        self._block = None
+
+    def _parse_line(self, line):
+        # lines are grouped in blocks of consecutive non empty lines
+        self._line_number += 1
+        if line:
+            if self._block is None:
+                self._block = Block(self._line_number)
+            self._block.lines.append(line)
+            return None
+
+        block, self._block = self._block, None
+        if block is None:
+            return None
+        return self._parse_block(block)
+
+    def _finish(self):
+        block, self._block = self._block, None
+        if block is None:
+            return None
+        return self._parse_block(block)
+
+    def _parse_block(self, block):
+        u"""Parses a block and returns the caption if it is a cue block or None."""
+        if self._in_signature:
+            # skip the signature block
+            self._in_signature = False
+        elif self._is_cue_block(block):
+            self._has_captions = True
+            return self._parse_cue_block(block)
+        elif self._is_comment_block(block):
+            pass
+        elif self._is_style_block(block):
+            if self._has_captions:
+                # when collecting errors the style is kept
+                self._error(MalformedFileError, u'style_after_cue', block.line_number,
+                            u'Style block defined after the first cue in line {}.'.format(block.line_number))
+            style = Style()
+            style.lines = block.lines[1:]
+            self.styles.append(style)
+        elif self._is_region_block(block):
+            if self._has_captions:
+                # when collecting errors the region is kept
+                self._error(MalformedFileError, u'region_after_cue', block.line_number,
+                            u'Region block defined after the first cue in line {}.'.format(block.line_number))
+            self.regions.append(Region.parse(block.lines[1:]))
+        else:
+            if len(block.lines) == 1:
+                self._error(MalformedCaptionError, u'standalone_identifier', block.line_number,
+                            u'Standalone cue identifier in line {}.'.format(block.line_number))
             else:
-                if len(block.lines) == 1:
-                    raise MalformedCaptionError(
-                        u'Standalone cue identifier in line {}.'.format(block.line_number))
-                else:
-                    raise MalformedCaptionError(
-                        u'Missing timing cue in line {}.'.format(block.line_number+1))
+                self._error(MalformedCaptionError, u'missing_timing', block.line_number + 1,
+                            u'Missing timing cue in line {}.'.format(block.line_number+1))
+        return None
 
     def _validate(self, lines):
         if not re.match(u'WEBVTT', lines[0]):
@@ -239,13 +387,17 @@ class WebVTTParser(TextBasedParser):
         u"""Returns True if it is a style block"""
         return re.match(self.STYLE_PATTERN, block.lines[0])
 
+    def _is_region_block(self, block):
+        u"""Returns True if it is a region block"""
+        return re.match(self.REGION_PATTERN, block.lines[0])
+
 
 class SBVParser(TextBasedParser):
     u"""
     YouTube SBV parser.
     """
 
-    TIMEFRAME_LINE_PATTERN = re.compile(u'\s*(\d+:\d{2}:\d{2}.\d{3}),(\d+:\d{2}:\d{2}.\d{3})')
+    TIMEFRAME_LINE_PATTERN = re.compile(u'\s*(\d+):(\d{2}):(\d{2})[.,](\d{3}),(\d+):(\d{2}):(\d{2})[.,](\d{3})')
 
     def _validate(self, lines):
         if not self._validate_timeframe_line(lines[0]):
@@ -253,3 +405,21 @@ class SBVParser(TextBasedParser):
 
     def _is_timeframe_line(self, line):
         return self._validate_timeframe_line(line)
+
+
+def detect_format(text):
+    u"""
+    Returns the format of the captions starting with the text: vtt, srt, sbv
+    or None if it is not recognized.
+    """
+    if text.startswith(BOM):
+        text = text[1:]
+    if text.startswith(u'WEBVTT'):
+        return u'vtt'
+
+    lines = NEWLINE_PATTERN.split(text, 2)
+    if len(lines) > 1 and lines[0].strip().isdigit() and SRTParser.TIMEFRAME_LINE_PATTERN.match(lines[1]):
+        return u'srt'
+    if SBVParser.TIMEFRAME_LINE_PATTERN.match(lines[0]):
+        return u'sbv'
+    return None
@@ -1,18 +1,89 @@
 from __future__ import with_statement
 from __future__ import division
 from __future__ import absolute_import
-import os
-from math import ceil, floor
+from itertools import islice, izip
+from operator import attrgetter
 
 from .errors import InvalidCaptionsError
 from .webvtt import WebVTT
 from .structures import Caption
-from io import open
+from . import background
+from .sinks import Sink, DirectorySink, FSYNC_NONE, FSYNC_POLICIES
 
 MPEGTS = 900000
 SECONDS = 10  # default number of seconds per segment
 
-__all__ = [u'WebVTTSegmenter']
+__all__ = [u'WebVTTSegmenter', u'LiveSegmenter']
+
+
+def _render_segment(captions, mpegts):
+    u"""Returns the content of a segment file."""
+    parts = [u'WEBVTT\nX-TIMESTAMP-MAP=MPEGTS:', unicode(mpegts), u',LOCAL:00:00:00.000\n']
+    append = parts.append
+
+    for caption in captions:
+        append(u'\n')
+        append(caption.start)
+        append(u' --> ')
+        append(caption.end)
+        if caption.raw_settings:
+            append(u' ')
+            append(caption.raw_settings)
+        append(u'\n')
+        for line in caption.lines:
+            append(line)
+            append(u'\n')
+
+    return u''.join(parts)
+
+
+class SegmentSweep(object):
+    u"""
+    Assigns captions to consecutive segments of a fixed duration.
+    Only the captions that are still visible in the segments not yet emitted are kept,
+    and every segment is emitted as soon as no more captions can be added to it.
+    """
+
+    def __init__(self, segment_ms):
+        self.segment_ms = segment_ms
+        self.next_index = 0  # index of the next segment to be emitted
+        self.total_segments = 0
+        self._active = []
+
+    def span(self, caption):
+        u"""Returns the index of the first and last segments where the caption is visible."""
+        first = caption.start_ms // self.segment_ms
+        last = max(first, (caption.end_ms - 1) // self.segment_ms)
+        return first, last
+
+    def add(self, caption, late=False):
+        u"""
+        Adds a caption to the segments not emitted yet. When late is True a caption starting
+        in a segment already emitted is added to the remaining segments where it is visible.
+        """
+        first, last = self.span(caption)
+        if late and last >= self.next_index:
+            first = max(first, self.next_index)
+        if first < self.next_index:
+            raise InvalidCaptionsError(
+                u'Caption starting at {} belongs to a segment already emitted.'.format(caption.start))
+        self._active.append((first, last, caption))
+        self.total_segments = max(self.total_segments, last + 1)
+
+    def flush(self, until_index=None):
+        u"""
+        Yields the index and captions of each segment up to until_index (exclusive) or
+        up to the last segment with captions if not provided.
+        """
+        if until_index is None:
+            until_index = self.total_segments
+
+        while self.next_index < until_index:
+            index = self.next_index
+            segment = [caption for first, _, caption in self._active if first <= index]
+            self._active = [item for item in self._active if item[1] > index]
+            self.next_index += 1
+            yield index, segment
 
 
 class WebVTTSegmenter(object):
@@ -21,10 +92,11 @@ class WebVTTSegmenter(object):
     """
     def __init__(self):
         self._total_segments = 0
-        self._output_folder = u''
+        self._sink = None
         self._seconds = 0
         self._mpegts = 0
-        self._segments = []
+        self._source = []
+        self._segments = None
 
     def _validate_webvtt(self, webvtt):
         # Validates that the captions is a list and all the captions are instances of Caption.
@@ -35,69 +107,106 @@ class WebVTTSegmenter(object):
                 return False
         return True
 
-    def _slice_segments(self, captions):
-        self._segments = [[] for _ in xrange(self.total_segments)]
+    def iter_segments(self, captions, seconds=SECONDS):
+        u"""
+        Yields the index and captions of each segment in order as soon as it is complete.
+        Lists of captions are sorted by start time when needed. Other iterables of captions,
+        for example the ones returned by webvtt.iter_captions, are segmented as they are read
+        and each caption must not start before the previous segment boundary.
+        """
+        if isinstance(captions, list) and not self._is_sorted(captions):
+            captions = sorted(captions, key=attrgetter(u'start_ms'))
+
+        sweep = SegmentSweep(int(seconds * 1000))
+        for caption in captions:
+            # segments before the one where this caption starts are complete
+            for segment in sweep.flush(sweep.span(caption)[0]):
+                yield segment
+            sweep.add(caption)
+
+        for segment in sweep.flush():
+            yield segment
 
-        for c in captions:
-            segment_index_start = int(floor(c.start_in_seconds / self.seconds))
-            self.segments[segment_index_start].append(c)
+    def _is_sorted(self, captions):
+        return all(a.start_ms <= b.start_ms for a, b in izip(captions, islice(captions, 1, None)))
 
-            # Also include a caption in other segments based on the end time.
-            segment_index_end = int(floor(c.end_in_seconds / self.seconds))
-            if segment_index_end > segment_index_start:
-                for i in xrange(segment_index_start + 1, segment_index_end + 1):
-                    self.segments[i].append(c)
+    def _write_segments(self, segments, workers=1):
+        self._total_segments = 0
+
+        if workers > 1:
+            background.run_bounded(self._write_segment_file, self._count_segments(segments), workers)
+        else:
+            for segment in self._count_segments(segments):
+                self._write_segment_file(segment)
 
-    def _write_segments(self):
-        for index in xrange(self.total_segments):
-            segment_file = os.path.join(self._output_folder, u'fileSequence{}.webvtt'.format(index))
+        # the segments are durable before the manifest lists them
+        self._sink.flush()
 
-            with open(segment_file, u'w', encoding=u'utf-8') as f:
-                f.write(u'WEBVTT\n')
-                f.write(u'X-TIMESTAMP-MAP=MPEGTS:{},LOCAL:00:00:00.000\n'.format(self._mpegts))
+    def _count_segments(self, segments):
+        for index, captions in segments:
+            yield index, captions
+            self._total_segments = index + 1
 
-                for caption in self.segments[index]:
-                    f.write(u'\n{} --> {}\n'.format(caption.start, caption.end))
-                    f.writelines([u'{}\n'.format(l) for l in caption.lines])
+    def _write_segment_file(self, segment):
+        index, captions = segment
+        self._sink.write(
+            u'fileSequence{}.webvtt'.format(index),
+            _render_segment(captions, self._mpegts).encode(u'utf-8')
+        )
 
     def _write_manifest(self):
-        manifest_file = os.path.join(self._output_folder, u'prog_index.m3u8')
-        with open(manifest_file, u'w', encoding=u'utf-8') as f:
-            f.write(u'#EXTM3U\n')
-            f.write(u'#EXT-X-TARGETDURATION:{}\n'.format(self.seconds))
-            f.write(u'#EXT-X-VERSION:3\n')
-            f.write(u'#EXT-X-PLAYLIST-TYPE:VOD\n')
+        lines = [
+            u'#EXTM3U',
+            u'#EXT-X-TARGETDURATION:{}'.format(self.seconds),
+            u'#EXT-X-VERSION:3',
+            u'#EXT-X-PLAYLIST-TYPE:VOD',
+        ]
 
-            for i in xrange(self.total_segments):
-                f.write(u'#EXTINF:30.00000\n')
-                f.write(u'fileSequence{}.webvtt\n'.format(i))
+        for i in xrange(self.total_segments):
+            lines.append(u'#EXTINF:30.00000')
+            lines.append(u'fileSequence{}.webvtt'.format(i))
 
-            f.write(u'#EXT-X-ENDLIST\n')
+        lines.append(u'#EXT-X-ENDLIST')
+        self._sink.write(u'prog_index.m3u8', (u'\n'.join(lines) + u'\n').encode(u'utf-8'))
+
+    def segment(self, webvtt, output=u'', seconds=SECONDS, mpegts=MPEGTS, workers=1, fsync=FSYNC_NONE):
+        u"""
+        Segments the captions based on a number of seconds.
+
+        The output is a directory or a Sink receiving the segment files and the manifest.
+        With more than one worker the segment files are written concurrently by that number of threads.
+        The fsync policy determines when the segment files written to a directory are flushed to disk:
+        never (none), after writing each file (file) or all together before writing the manifest (batch).
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(u'Unknown fsync policy: {}'.format(fsync))
+        if isinstance(output, Sink) and fsync != FSYNC_NONE:
+            raise ValueError(u'The fsync policy only applies to output directories.')
 
-    def segment(self, webvtt, output=u'', seconds=SECONDS, mpegts=MPEGTS):
-        u"""Segments the captions based on a number of seconds."""
         if isinstance(webvtt, unicode):
-            # if a string is supplied we parse the file
-            captions = WebVTT().read(webvtt).captions
+            # if a string is supplied we parse the file once, its captions may not be sorted
+            # and they are kept for the segments property
+            source = WebVTT.read(webvtt).captions
         elif not self._validate_webvtt(webvtt):
             raise InvalidCaptionsError(u'The captions provided are invalid')
         else:
             # we expect to have a webvtt object
-            captions = webvtt.captions
+            source = webvtt.captions
 
-        self._total_segments = 0 if not captions else int(ceil(captions[-1].end_in_seconds / seconds))
-        self._output_folder = output
+        self._source = source
+        self._segments = None
         self._seconds = seconds
         self._mpegts = mpegts
+        self._sink = output if isinstance(output, Sink) else DirectorySink(output, fsync)
 
-        output_folder = os.path.join(os.getcwdu(), output)
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        self._slice_segments(captions)
-        self._write_segments()
+        self._write_segments(self.iter_segments(source, seconds), workers)
         self._write_manifest()
 
+    def asegment(self, webvtt, output=u'', seconds=SECONDS, mpegts=MPEGTS, workers=1, fsync=FSYNC_NONE,
+                 callback=None):
+        u"""Segments the captions in a background thread and returns an AsyncResult."""
+        return background.submit(self.segment, (webvtt, output, seconds, mpegts, workers, fsync), callback=callback)
+
     @property
     def seconds(self):
         u"""Returns the number of seconds used for segmenting captions."""
@@ -110,5 +219,94 @@ class WebVTTSegmenter(object):
 
     @property
     def segments(self):
-        u"""Return the list of segments."""
+        u"""Return the list of segments. It is computed on first access."""
+        if self._segments is None:
+            self._segments = [
+                captions for _, captions in self.iter_segments(self._source, self.seconds)
+            ]
         return self._segments
+
+
+class LiveSegmenter(object):
+    u"""
+    Segments the captions of a live stream for HTTP Live Streaming (HLS).
+
+    Captions are fed as they arrive and the segments are written when flushing up to
+    a time that closes them. Each flush only writes the new segments and rewrites the
+    playlist, replacing the files atomically so readers never see partial files.
+
+    Without a window the playlist is an EVENT playlist listing every segment. With a
+    window only the last segments are listed in a sliding window LIVE playlist.
+    """
+
+    def __init__(self, output=u'', seconds=SECONDS, mpegts=MPEGTS, window=None):
+        # the output is a directory or a Sink receiving the segment files and the playlist
+        self._sink = output if isinstance(output, Sink) else DirectorySink(output, atomic=True)
+        self._seconds = seconds
+        self._mpegts = mpegts
+        self._window = window
+        self._sweep = SegmentSweep(int(seconds * 1000))
+        self._ended = False
+
+    def feed(self, caption):
+        u"""
+        Adds a caption to the segments not written yet.
+        A caption already visible in a written segment is only included in the following ones.
+        """
+        if self._ended:
+            raise InvalidCaptionsError(u'The stream has already ended.')
+        if not isinstance(caption, Caption):
+            raise InvalidCaptionsError(u'The caption provided is invalid')
+        self._sweep.add(caption, late=True)
+
+    def flush_until(self, ms):
+        u"""Writes the segments ending before the given time in milliseconds."""
+        self._flush(self._sweep.flush(int(ms // self._sweep.segment_ms)))
+
+    def close(self):
+        u"""Writes the remaining segments and ends the playlist."""
+        self._ended = True
+        self._flush(self._sweep.flush())
+
+    def _flush(self, segments):
+        written = False
+        for index, captions in segments:
+            self._sink.write(
+                u'fileSequence{}.webvtt'.format(index),
+                _render_segment(captions, self._mpegts).encode(u'utf-8')
+            )
+            written = True
+
+        if written or self._ended:
+            self._sink.write(u'prog_index.m3u8', self._render_playlist().encode(u'utf-8'))
+
+    def _render_playlist(self):
+        total = self.total_segments
+        first = 0 if self._window is None else max(0, total - self._window)
+
+        lines = [
+            u'#EXTM3U',
+            u'#EXT-X-TARGETDURATION:{}'.format(self.seconds),
+            u'#EXT-X-VERSION:3',
+            u'#EXT-X-MEDIA-SEQUENCE:{}'.format(first),
+        ]
+        if self._window is None:
+            lines.append(u'#EXT-X-PLAYLIST-TYPE:EVENT')
+
+        for i in xrange(first, total):
+            lines.append(u'#EXTINF:{:.5f},'.format(self.seconds))
+            lines.append(u'fileSequence{}.webvtt'.format(i))
+
+        if self._ended:
+            lines.append(u'#EXT-X-ENDLIST')
+        return u'\n'.join(lines) + u'\n'
+
+    @property
+    def seconds(self):
+        u"""Returns the number of seconds used for segmenting captions."""
+        return self._seconds
+
+    @property
+    def total_segments(self):
+        u"""Returns the number of segments written."""
+        return self._sweep.next_index
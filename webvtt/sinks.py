@@ -0,0 +1,229 @@
+u"""
+Destinations of the files written by the segmenters and the save methods.
+
+A sink receives each file as a name and its content encoded as UTF-8 bytes, so files
+can be written to a directory, kept in memory, added to an archive or handed to a
+callback, for example to upload them, without touching the filesystem.
+"""
+
+from __future__ import with_statement
+from __future__ import absolute_import
+import os
+import io
+import errno
+import time
+import tarfile
+import threading
+import zipfile
+
+__all__ = [u'Sink', u'DirectorySink', u'MemorySink', u'ZipSink', u'TarSink', u'CallbackSink']
+
+FSYNC_NONE = u'none'  # leave flushing the files to the operating system
+FSYNC_FILE = u'file'  # flush every file to disk as soon as it is written
+FSYNC_BATCH = u'batch'  # flush all the files written to disk when the sink is flushed
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_FILE, FSYNC_BATCH)
+
+_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | getattr(os, u'O_BINARY', 0)
+_TEMP_ATTEMPTS = 100
+
+
+def _write_fd(fd, data, fsync=False):
+    u"""Writes the data to a file descriptor and closes it."""
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_bytes(path, data, fsync=False):
+    u"""Writes the data with as few system calls as possible, usually a single one."""
+    _write_fd(os.open(path, _OPEN_FLAGS | os.O_TRUNC, 0o666), data, fsync)
+
+
+def _create_temp(directory):
+    u"""Creates a new temporary file with the mode of a new file and returns its descriptor and path."""
+    for _ in xrange(_TEMP_ATTEMPTS):
+        path = os.path.join(directory, u'.tmp-' + os.urandom(6).encode(u'hex'))
+        try:
+            # unlike mkstemp the kernel applies the umask, as to the files written directly
+            return os.open(path, _OPEN_FLAGS | os.O_EXCL, 0o666), path
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+    raise IOError(errno.EEXIST, u'No usable temporary file name found.')
+
+
+def _atomic_write(path, data, fsync=False):
+    u"""Writes a file through a temporary file that replaces the target when complete."""
+    fd, temp_path = _create_temp(os.path.dirname(path) or u'.')
+    try:
+        _write_fd(fd, data, fsync)
+        # a replaced file keeps its mode
+        try:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+        if os.name == u'nt' and os.path.exists(path):
+            # rename does not replace existing files on Windows
+            os.remove(path)
+        os.rename(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY | getattr(os, u'O_BINARY', 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(path):
+    # directories cannot be opened on Windows, where the entries are durable with the files
+    if os.name != u'nt':
+        _fsync_path(path or u'.')
+
+
+class Sink(object):
+    u"""
+    Base class of the sinks. Subclasses implement write and may implement flush and close.
+    Sinks can be used as context managers to close them.
+    """
+
+    def write(self, name, data):
+        u"""Writes a file with the given name and content in bytes."""
+        raise NotImplementedError
+
+    def flush(self):
+        u"""Makes the files written durable. Called once all the segment files are written."""
+
+    def close(self):
+        u"""Releases the resources of the sink."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DirectorySink(Sink):
+    u"""
+    Writes the files in a local directory, created if it does not exist.
+
+    The fsync policy determines when the files are flushed to disk: never (none), after
+    writing each file (file) or all together when the sink is flushed (batch). Atomic writes
+    replace the files through temporary files so readers never see partial files.
+    """
+
+    def __init__(self, path=u'', fsync=FSYNC_NONE, atomic=False):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(u'Unknown fsync policy: {}'.format(fsync))
+
+        self.path = path
+        self.fsync = fsync
+        self.atomic = atomic
+        self._written = set()
+        self._lock = threading.Lock()
+
+        directory = os.path.join(os.getcwdu(), path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def __repr__(self):
+        return u'<%(cls)s path=%(path)s>' % {u'cls': self.__class__.__name__, u'path': self.path}
+
+    def write(self, name, data):
+        path = os.path.join(self.path, name)
+        if self.atomic:
+            _atomic_write(path, data, fsync=self.fsync == FSYNC_FILE)
+        else:
+            _write_bytes(path, data, fsync=self.fsync == FSYNC_FILE)
+
+        if self.fsync == FSYNC_BATCH:
+            with self._lock:
+                self._written.add(path)
+
+    def flush(self):
+        if self.fsync == FSYNC_NONE:
+            return
+        with self._lock:
+            written, self._written = self._written, set()
+        for path in sorted(written):
+            _fsync_path(path)
+        # make the new directory entries durable too
+        _fsync_directory(self.path)
+
+
+class MemorySink(Sink):
+    u"""Keeps the files in the files dictionary of name to content in bytes."""
+
+    def __init__(self):
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def write(self, name, data):
+        with self._lock:
+            self.files[name] = bytes(data)
+
+
+class ZipSink(Sink):
+    u"""Adds the files to a zip archive, given as a path or a file object. Close the sink to complete the archive."""
+
+    def __init__(self, file, compression=zipfile.ZIP_DEFLATED):
+        self._archive = zipfile.ZipFile(file, u'w', compression)
+        self._lock = threading.Lock()
+
+    def write(self, name, data):
+        with self._lock:
+            self._archive.writestr(name, data)
+
+    def close(self):
+        self._archive.close()
+
+
+class TarSink(Sink):
+    u"""
+    Adds the files to a tar archive, given as a path or a file object.
+    The mode sets the compression, for example w:gz. Close the sink to complete the archive.
+    """
+
+    def __init__(self, file, mode=u'w'):
+        if isinstance(file, basestring):
+            self._archive = tarfile.open(file, mode)
+        else:
+            self._archive = tarfile.open(fileobj=file, mode=mode)
+        self._lock = threading.Lock()
+
+    def write(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = time.time()
+        with self._lock:
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self._archive.close()
+
+
+class CallbackSink(Sink):
+    u"""
+    Calls the callback with the name and content in bytes of each file.
+    Calls are serialized even when files are written by several threads.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def write(self, name, data):
+        with self._lock:
+            self.callback(name, data)
@@ -0,0 +1,203 @@
+u"""
+Reading of caption sources.
+
+A source can be a path to a file, the content itself as text or bytes (any string
+with a line break is considered content), a bytearray, a memoryview, an mmap object
+or a file object opened in text or binary mode.
+"""
+
+from __future__ import with_statement
+from __future__ import absolute_import
+import os
+import re
+import mmap
+import codecs
+from io import open
+
+__all__ = []
+
+CHUNK_SIZE = 64 * 1024
+MMAP_THRESHOLD = 4 * 1024 * 1024  # files from this size are memory mapped
+PEEK_SIZE = 512  # bytes read to detect the format of a source
+
+NEWLINE_PATTERN = re.compile(u'\r\n|\r|\n')
+BOM = u'\ufeff'
+
+
+def is_path(source):
+    u"""Returns True if the source is the path of a file."""
+    if isinstance(source, unicode):
+        return u'\n' not in source and u'\r' not in source
+    if isinstance(source, bytes):
+        return b'\n' not in source and b'\r' not in source
+    return False
+
+
+def _slices(buffer):
+    for offset in xrange(0, len(buffer), CHUNK_SIZE):
+        chunk = buffer[offset:offset + CHUNK_SIZE]
+        yield chunk.tobytes() if isinstance(chunk, memoryview) else bytes(chunk)
+
+
+def _reads(f):
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _decode(chunks):
+    # the BOM is removed by the utf-8-sig decoder if present
+    decoder = codecs.getincrementaldecoder(u'utf-8-sig')()
+    for chunk in chunks:
+        if isinstance(chunk, unicode):
+            yield chunk
+        else:
+            yield decoder.decode(chunk)
+    yield decoder.decode(b'', True)
+
+
+def _iter_file(path):
+    # getsize raises OSError for missing files
+    size = os.path.getsize(path)
+    with open(path, u'rb') as f:
+        if size < MMAP_THRESHOLD:
+            yield f.read()
+            return
+
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for chunk in _slices(buffer):
+                yield chunk
+        finally:
+            buffer.close()
+
+
+def iter_text(source):
+    u"""Yields the decoded text of the source in chunks."""
+    if isinstance(source, (unicode, bytes)):
+        chunks = _iter_file(source) if is_path(source) else [source]
+    elif isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        chunks = _slices(source)
+    elif hasattr(source, u'read'):
+        chunks = _reads(source)
+    else:
+        raise TypeError(u'Unsupported caption source: {}'.format(type(source)))
+
+    return _decode(chunks)
+
+
+class _PrefixedFile(object):
+    u"""File object returning the data already read from a file that cannot seek before the rest."""
+
+    def __init__(self, prefix, f):
+        self._prefix = prefix
+        self._file = f
+
+    def read(self, size=-1):
+        prefix = self._prefix
+        if not prefix:
+            return self._file.read(size)
+        if 0 <= size < len(prefix):
+            self._prefix = prefix[size:]
+            return prefix[:size]
+        self._prefix = prefix[:0]
+        rest = self._file.read(size - len(prefix) if size >= 0 else -1)
+        return prefix + rest
+
+
+def peek(source, size=PEEK_SIZE):
+    u"""
+    Returns the decoded text at the start of the source, reading at most size bytes,
+    and the source to read the captions from. File objects are rewound when possible
+    or wrapped so the data read is not lost.
+    """
+    if isinstance(source, (unicode, bytes)):
+        if is_path(source):
+            with open(source, u'rb') as f:
+                prefix = f.read(size)
+        else:
+            prefix = source[:size]
+    elif isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        prefix = source[:size]
+        prefix = prefix.tobytes() if isinstance(prefix, memoryview) else bytes(prefix)
+    elif hasattr(source, u'read'):
+        try:
+            position = source.tell()
+        except (AttributeError, IOError, ValueError):
+            position = None
+        prefix = source.read(size)
+        if position is not None:
+            source.seek(position)
+        else:
+            source = _PrefixedFile(prefix, source)
+    else:
+        raise TypeError(u'Unsupported caption source: {}'.format(type(source)))
+
+    if not isinstance(prefix, unicode):
+        # a character cut at the end of the prefix is left in the decoder
+        prefix = codecs.getincrementaldecoder(u'utf-8-sig')(u'replace').decode(prefix)
+    elif prefix.startswith(BOM):
+        prefix = prefix[1:]
+    return prefix, source
+
+
+class LineDecoder(object):
+    u"""
+    Splits text or bytes received in chunks into lines without line endings,
+    recognizing \\n, \\r\\n and \\r as line endings. Bytes are decoded as UTF-8.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder(u'utf-8-sig')()
+        self._pending = u''
+        self._skip_newline = False
+        self._first = True
+
+    def feed(self, chunk):
+        u"""Returns the lines completed by the chunk."""
+        if not isinstance(chunk, unicode):
+            chunk = self._decoder.decode(chunk)
+
+        if self._first and chunk:
+            self._first = False
+            if chunk.startswith(BOM):
+                chunk = chunk[1:]
+
+        # a \r at the end of the previous chunk and a \n at the start of this one
+        # are a single line ending, empty chunks leave the \r pending
+        if self._skip_newline and chunk:
+            self._skip_newline = False
+            if chunk[0] == u'\n':
+                chunk = chunk[1:]
+        if not chunk:
+            return []
+        self._skip_newline = chunk[-1] == u'\r'
+
+        lines = NEWLINE_PATTERN.split(self._pending + chunk)
+        self._pending = lines.pop()
+        return lines
+
+    def close(self):
+        u"""Returns the remaining lines."""
+        lines = self.feed(self._decoder.decode(b'', True))
+        if self._pending:
+            lines.append(self._pending)
+            self._pending = u''
+        return lines
+
+
+def iter_lines(source):
+    u"""
+    Yields the lines of the source without line endings,
+    recognizing \\n, \\r\\n and \\r as line endings.
+    """
+    decoder = LineDecoder()
+
+    for chunk in iter_text(source):
+        for line in decoder.feed(chunk):
+            yield line
+
+    for line in decoder.close():
+        yield line
@@ -1,32 +1,87 @@
 from __future__ import division
 from __future__ import absolute_import
 import re
+from collections import OrderedDict
 
+from . import cuetext
 from .errors import MalformedCaptionError
 from itertools import imap
 
 TIMESTAMP_PATTERN = re.compile(u'(\d+)?:?(\d{2}):(\d{2})[.,](\d{3})')
+CSS_COMMENT_PATTERN = re.compile(u'/\\*.*?\\*/', re.DOTALL)
+CSS_RULE_PATTERN = re.compile(u'([^{}]+)\\{([^{}]*)\\}')
+PERCENTAGE_PATTERN = re.compile(u'\\d+(?:\\.\\d+)?%$')
 
-__all__ = [u'Caption']
+__all__ = [u'Caption', u'CueSettings', u'Style', u'Region']
 
 
-class Caption(object):
+class _Slotted(object):
+    u"""
+    Base class of the classes with __slots__ making them picklable with every protocol,
+    since in Python 2 the protocols 0 and 1 only pickle the __dict__ of the instances.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, u'__slots__', ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
 
-    CUE_TEXT_TAGS = re.compile(u'<.*?>')
+
+class Caption(_Slotted):
+
+    __slots__ = (
+        '_start_ms', '_end_ms', '_start_timestamp', '_end_timestamp', 'identifier',
+        '_raw_settings', '_settings', '_lines', '_cue_text'
+    )
+
+
+    # incremented whenever the timing of an existing caption changes
+    timing_version = 0
 
     u"""
     Represents a caption.
+
+    The start and end timings are stored as integer milliseconds and can be
+    provided either as timestamps or as milliseconds.
     """
-    def __init__(self, start=u'00:00:00.000', end=u'00:00:00.000', text=None):
-        self.start = start
-        self.end = end
+    def __init__(self, start=0, end=0, text=None):
+        # assigned without the setters so creating captions does not invalidate any index
+        self._start_ms = int(start) if isinstance(start, (int, long)) else self._parse_timestamp(start)
+        self._end_ms = int(end) if isinstance(end, (int, long)) else self._parse_timestamp(end)
+        self._start_timestamp = self._end_timestamp = None
         self.identifier = None
+        self._raw_settings = None
+        self._settings = None
 
         # If lines is a string convert to a list
         if text and isinstance(text, unicode):
             text = text.splitlines()
 
         self._lines = text or []
+        self._cue_text = None
+
+    @classmethod
+    def _from_ms(cls, start_ms, end_ms, lines, identifier=None, raw_settings=None):
+        # builds a caption from values known to be valid, used when restoring captions in bulk
+        caption = cls.__new__(cls)
+        caption._start_ms = start_ms
+        caption._end_ms = end_ms
+        caption._start_timestamp = caption._end_timestamp = None
+        caption.identifier = identifier
+        caption._raw_settings = raw_settings
+        caption._settings = None
+        caption._lines = lines
+        caption._cue_text = None
+        return caption
 
     def __repr__(self):
         return u'<%(cls)s start=%(start)s end=%(end)s text=%(text)s>' % {
@@ -46,49 +101,113 @@ class Caption(object):
     def add_line(self, line):
         self.lines.append(line)
 
-    def _to_seconds(self, hours, minutes, seconds, milliseconds):
-        return hours * 3600 + minutes * 60 + seconds + milliseconds / 1000
-
     def _parse_timestamp(self, timestamp):
         res = re.match(TIMESTAMP_PATTERN, timestamp)
         if not res:
             raise MalformedCaptionError(u'Invalid timestamp: {}'.format(timestamp))
 
-        values = list(imap(lambda x: int(x) if x else 0, res.groups()))
-        return self._to_seconds(*values)
-
-    def _to_timestamp(self, total_seconds):
-        hours = int(total_seconds / 3600)
-        minutes = int(total_seconds / 60 - hours * 60)
-        seconds = total_seconds - hours * 3600 - minutes * 60
-        return u'{:02d}:{:02d}:{:06.3f}'.format(hours, minutes, seconds)
-
-    def _clean_cue_tags(self, text):
-        return re.sub(self.CUE_TEXT_TAGS, u'', text)
+        hours, minutes, seconds, milliseconds = res.groups()
+        return (int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds)
+
+    def _to_timestamp(self, total_milliseconds):
+        hours, milliseconds = divmod(total_milliseconds, 3600000)
+        minutes, milliseconds = divmod(milliseconds, 60000)
+        seconds, milliseconds = divmod(milliseconds, 1000)
+        return u'{:02d}:{:02d}:{:02d}.{:03d}'.format(hours, minutes, seconds, milliseconds)
+
+    def _parsed_cue_text(self, with_tree):
+        # The lines list can be mutated in place so the cache holds a snapshot of the lines
+        # it was computed from and it is discarded as soon as the lines differ.
+        cached = self._cue_text
+        lines = tuple(self._lines)
+        if cached is None or cached[0] != lines or (with_tree and cached[1] is None):
+            raw_text = u'\n'.join(lines)
+            if with_tree or u'<' in raw_text or u'&' in raw_text:
+                tree = cuetext.parse(raw_text)
+                cached = lines, tree, tree.text
+            else:
+                cached = lines, None, raw_text
+            self._cue_text = cached
+        return cached
 
     @property
     def start_in_seconds(self):
-        return self._start
+        return self._start_ms / 1000
 
     @property
     def end_in_seconds(self):
-        return self._end
+        return self._end_ms / 1000
+
+    @property
+    def start_ms(self):
+        u"""Returns the start time in milliseconds."""
+        return self._start_ms
+
+    @start_ms.setter
+    def start_ms(self, value):
+        self._start_ms = int(value)
+        self._start_timestamp = None
+        Caption.timing_version += 1
+
+    @property
+    def end_ms(self):
+        u"""Returns the end time in milliseconds."""
+        return self._end_ms
+
+    @end_ms.setter
+    def end_ms(self, value):
+        self._end_ms = int(value)
+        self._end_timestamp = None
+        Caption.timing_version += 1
 
     @property
     def start(self):
-        return self._to_timestamp(self._start)
+        if self._start_timestamp is None:
+            self._start_timestamp = self._to_timestamp(self._start_ms)
+        return self._start_timestamp
 
     @start.setter
     def start(self, value):
-        self._start = self._parse_timestamp(value)
+        self.start_ms = self._parse_timestamp(value)
 
     @property
     def end(self):
-        return self._to_timestamp(self._end)
+        if self._end_timestamp is None:
+            self._end_timestamp = self._to_timestamp(self._end_ms)
+        return self._end_timestamp
 
     @end.setter
     def end(self, value):
-        self._end = self._parse_timestamp(value)
+        self.end_ms = self._parse_timestamp(value)
+
+    @property
+    def raw_settings(self):
+        u"""Returns the cue settings as found after the timings or None"""
+        return self._raw_settings
+
+    @raw_settings.setter
+    def raw_settings(self, value):
+        self._raw_settings = value or None
+        self._settings = None
+
+    @property
+    def settings(self):
+        u"""Returns the cue settings, parsed on first access"""
+        if self._settings is None:
+            self._settings = CueSettings.parse(self._raw_settings or u'')
+        return self._settings
+
+    @settings.setter
+    def settings(self, value):
+        if value is None:
+            value = CueSettings()
+        elif isinstance(value, unicode):
+            value = CueSettings.parse(value)
+        elif not isinstance(value, CueSettings):
+            raise TypeError(u'CueSettings or string expected but received {}.'.format(type(value)))
+
+        self._raw_settings = value.raw or None
+        self._settings = value
 
     @property
     def lines(self):
@@ -96,8 +215,18 @@ class Caption(object):
 
     @property
     def text(self):
-        u"""Returns the captions lines as a text (without cue tags)"""
-        return self._clean_cue_tags(self.raw_text)
+        u"""Returns the captions lines as a text (without cue tags and with entities decoded)"""
+        return self._parsed_cue_text(False)[2]
+
+    @property
+    def tree(self):
+        u"""Returns the node tree of the cue text"""
+        return self._parsed_cue_text(True)[1]
+
+    @property
+    def speakers(self):
+        u"""Returns the speakers annotated with voice tags in the cue text"""
+        return [node.annotation for node in self.tree.iter(u'v') if node.annotation]
 
     @property
     def raw_text(self):
@@ -110,15 +239,165 @@ class Caption(object):
             raise AttributeError(u'String value expected but received {}.'.format(type(value)))
 
         self._lines = value.splitlines()
+        self._cue_text = None
+
+
+def _setting(name):
+    return property(lambda self: self.get(name), doc=u'Returns the {} setting or None'.format(name))
+
+
+class CueSettings(_Slotted):
+    u"""
+    Represents the settings of a cue (vertical, line, position, size, align and region).
+
+    Cue settings are immutable so identical settings can be shared by many captions.
+    Use replace to obtain modified settings.
+    """
+
+    __slots__ = ('_raw', '_items')
+
+    NAMES = (u'vertical', u'line', u'position', u'size', u'align', u'region')
+    CACHE_SIZE = 1024
+
+    _cache = {}
+
+    def __init__(self, **settings):
+        self._set_items(self._new_items((), settings))
+
+    def _set_items(self, items):
+        self._items = tuple(items)
+        self._raw = u' '.join(u'{}:{}'.format(name, value) for name, value in self._items)
+
+    def _new_items(self, items, changes):
+        unknown = set(changes) - set(self.NAMES) - set(name for name, _ in items)
+        if unknown:
+            raise TypeError(u'Unknown cue settings: {}'.format(u', '.join(sorted(unknown))))
+
+        new_items = [
+            (name, unicode(changes.get(name, value))) for name, value in items
+            if changes.get(name, value) is not None
+        ]
+        present = set(name for name, _ in items)
+        new_items.extend(
+            (name, unicode(changes[name])) for name in self.NAMES
+            if name not in present and changes.get(name) is not None
+        )
+        return new_items
+
+    @classmethod
+    def parse(cls, raw):
+        u"""Returns the settings for a raw settings string, shared with any previous identical string."""
+        settings = cls._cache.get(raw)
+        if settings is None:
+            settings = cls.__new__(cls)
+            settings._raw = raw
+            settings._items = tuple(
+                tuple(token.partition(u':')[::2]) for token in raw.split()
+            )
+
+            if len(cls._cache) >= cls.CACHE_SIZE:
+                cls._cache.clear()
+            cls._cache[raw] = settings
+        return settings
+
+    def __repr__(self):
+        return u'<%(cls)s %(raw)s>' % {
+            u'cls': self.__class__.__name__,
+            u'raw': self._raw
+        }
+
+    def __str__(self):
+        return self._raw
+
+    def __eq__(self, other):
+        return isinstance(other, CueSettings) and self._items == other._items
+
+    def __ne__(self, other):
+        return not self == other
 
+    def __hash__(self):
+        return hash(self._items)
 
-class GenericBlock(object):
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def raw(self):
+        u"""Returns the settings as written after the cue timings"""
+        return self._raw
+
+    def get(self, name, default=None):
+        for setting, value in self._items:
+            if setting == name:
+                return value
+        return default
+
+    def items(self):
+        return list(self._items)
+
+    def replace(self, **changes):
+        u"""Returns new settings with the given changes. A value of None removes the setting."""
+        settings = CueSettings.__new__(CueSettings)
+        settings._set_items(self._new_items(self._items, changes))
+        return settings
+
+    vertical = _setting(u'vertical')
+    line = _setting(u'line')
+    position = _setting(u'position')
+    size = _setting(u'size')
+    align = _setting(u'align')
+    region = _setting(u'region')
+
+
+def _tracked(method):
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+class CaptionList(_Slotted, list):
+    u"""List of captions that keeps a version number incremented on every change."""
+
+    __slots__ = ('version',)
+
+    def __init__(self, *args, **kwargs):
+        super(CaptionList, self).__init__(*args, **kwargs)
+        self.version = 0
+
+    def __reduce__(self):
+        # the items are given to the constructor since the tracked methods need the version
+        return self.__class__, (list(self),), self.__getstate__()
+
+    __setitem__ = _tracked(list.__setitem__)
+    __delitem__ = _tracked(list.__delitem__)
+    __setslice__ = _tracked(list.__setslice__)
+    __delslice__ = _tracked(list.__delslice__)
+    __iadd__ = _tracked(list.__iadd__)
+    __imul__ = _tracked(list.__imul__)
+    append = _tracked(list.append)
+    extend = _tracked(list.extend)
+    insert = _tracked(list.insert)
+    pop = _tracked(list.pop)
+    remove = _tracked(list.remove)
+    reverse = _tracked(list.reverse)
+    sort = _tracked(list.sort)
+
+
+class GenericBlock(_Slotted):
     u"""Generic class that defines a data structure holding an array of lines"""
+
+    __slots__ = ('lines',)
+
     def __init__(self):
         self.lines = []
 
 
 class Block(GenericBlock):
+
+    __slots__ = ('line_number',)
+
     def __init__(self, line_number):
         super(Block, self).__init__()
         self.line_number = line_number
@@ -126,13 +405,132 @@ class Block(GenericBlock):
 
 class Style(GenericBlock):
 
+    __slots__ = ('_parsed',)
+
+    def __init__(self):
+        super(Style, self).__init__()
+        self._parsed = None
+
+    def _parse(self):
+        # same approach as the cue text of captions: the cache is discarded when the lines differ
+        lines = tuple(self.lines)
+        if self._parsed is None or self._parsed[0] != lines:
+            self._parsed = lines, u''.join(imap(lambda x: x.strip(), lines)), _parse_css(lines)
+        return self._parsed
+
     @property
     def text(self):
         u"""Returns the style lines as a text"""
-        return u''.join(imap(lambda x: x.strip(), self.lines))
+        return self._parse()[1]
 
     @text.setter
     def text(self, value):
         if type(value) != unicode:
             raise TypeError(u'The text value must be a string.')
         self.lines = value.split(u'\n')
+
+    @property
+    def rules(self):
+        u"""Returns the declarations of the style as an ordered map of selector to a map of property to value"""
+        return self._parse()[2]
+
+
+def _parse_css(lines):
+    rules = OrderedDict()
+    css = CSS_COMMENT_PATTERN.sub(u'', u'\n'.join(lines))
+    for match in CSS_RULE_PATTERN.finditer(css):
+        selector = u' '.join(match.group(1).split())
+        declarations = rules.setdefault(selector, OrderedDict())
+        for declaration in match.group(2).split(u';'):
+            name, colon, value = declaration.partition(u':')
+            name, value = name.strip().lower(), value.strip()
+            if colon and name and value:
+                declarations[name] = value
+    return rules
+
+
+def _percentage(value):
+    if not PERCENTAGE_PATTERN.match(value):
+        raise ValueError(value)
+    percentage = float(value[:-1])
+    if percentage > 100:
+        raise ValueError(value)
+    return percentage
+
+
+def _anchor(value):
+    x, comma, y = value.partition(u',')
+    if not comma:
+        raise ValueError(value)
+    return _percentage(x), _percentage(y)
+
+
+def _format_percentage(value):
+    return u'{:g}%'.format(value)
+
+
+class Region(_Slotted):
+    u"""
+    Represents a region defined in a REGION block.
+
+    The width and the anchors are percentages and lines is the number of lines of the region.
+    """
+
+    __slots__ = ('id', 'width', 'lines', 'region_anchor', 'viewport_anchor', 'scroll')
+
+    SETTINGS = (
+        (u'id', 'id', unicode),
+        (u'width', 'width', _percentage),
+        (u'lines', 'lines', int),
+        (u'regionanchor', 'region_anchor', _anchor),
+        (u'viewportanchor', 'viewport_anchor', _anchor),
+        (u'scroll', 'scroll', lambda value: value if value == u'up' else None),
+    )
+
+    def __init__(self, id=u'', width=100.0, lines=3, region_anchor=(0.0, 100.0),
+                 viewport_anchor=(0.0, 100.0), scroll=None):
+        self.id = id
+        self.width = width
+        self.lines = lines
+        self.region_anchor = region_anchor
+        self.viewport_anchor = viewport_anchor
+        self.scroll = scroll
+
+    def __repr__(self):
+        return u'<%(cls)s id="%(id)s" width=%(width)s lines=%(lines)s>' % {
+            u'cls': self.__class__.__name__,
+            u'id': self.id,
+            u'width': self.width,
+            u'lines': self.lines
+        }
+
+    @classmethod
+    def parse(cls, lines):
+        u"""Returns the region defined by the settings lines of a REGION block. Invalid settings are ignored."""
+        region = cls()
+        settings = dict((name, (attribute, convert)) for name, attribute, convert in cls.SETTINGS)
+        for line in lines:
+            for setting in line.split():
+                name, colon, value = setting.partition(u':')
+                if not colon or name not in settings:
+                    continue
+                attribute, convert = settings[name]
+                try:
+                    setattr(region, attribute, convert(value))
+                except ValueError:
+                    continue
+        return region
+
+    @property
+    def text(self):
+        u"""Returns the region settings as a text"""
+        settings = [
+            u'id:{}'.format(self.id),
+            u'width:{}'.format(_format_percentage(self.width)),
+            u'lines:{}'.format(self.lines),
+            u'regionanchor:{},{}'.format(*imap(_format_percentage, self.region_anchor)),
+            u'viewportanchor:{},{}'.format(*imap(_format_percentage, self.viewport_anchor)),
+        ]
+        if self.scroll:
+            settings.append(u'scroll:{}'.format(self.scroll))
+        return u'\n'.join(settings)
@@ -0,0 +1,161 @@
+from __future__ import division
+from __future__ import absolute_import
+from array import array
+from itertools import compress, izip, imap
+
+from .structures import Caption
+from . import timing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = [u'CaptionTable']
+
+try:
+    array('q')
+    TIMING_TYPECODE = 'q'
+except ValueError:
+    # signed 64 bits on most platforms when 'q' is not available
+    TIMING_TYPECODE = 'l'
+
+
+def _timing_column(values):
+    if numpy is not None:
+        if isinstance(values, numpy.ndarray):
+            return values.astype(numpy.int64)
+        return numpy.fromiter(values, dtype=numpy.int64)
+    return array(TIMING_TYPECODE, values)
+
+
+class CaptionTable(object):
+    u"""
+    Columnar representation of captions for bulk timing operations.
+
+    Start and end timings are kept in contiguous arrays of milliseconds (NumPy arrays
+    when NumPy is installed, otherwise arrays from the standard library) next to the
+    columns of cue identifiers, texts and raw cue settings.
+    Operations return a new table and leave the original untouched.
+    """
+
+    def __init__(self, starts=(), ends=(), texts=(), identifiers=None, settings=None):
+        self.starts = _timing_column(starts)
+        self.ends = _timing_column(ends)
+        self.texts = list(texts)
+        self.identifiers = list(identifiers) if identifiers is not None else [None] * len(self.texts)
+        self.settings = list(settings) if settings is not None else [None] * len(self.texts)
+
+        if not (len(self.starts) == len(self.ends) == len(self.texts) ==
+                len(self.identifiers) == len(self.settings)):
+            raise ValueError(u'All the columns must have the same length.')
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __repr__(self):
+        return u'<%(cls)s captions=%(captions)s>' % {
+            u'cls': self.__class__.__name__,
+            u'captions': len(self)
+        }
+
+    @classmethod
+    def from_captions(cls, captions):
+        u"""Builds a table from a list of captions."""
+        return cls(
+            starts=(c.start_ms for c in captions),
+            ends=(c.end_ms for c in captions),
+            texts=[c.raw_text for c in captions],
+            identifiers=[c.identifier for c in captions],
+            settings=[c.raw_settings for c in captions]
+        )
+
+    def to_captions(self):
+        u"""Returns the rows of the table as a list of captions."""
+        captions = []
+        rows = izip(self.starts, self.ends, self.texts, self.identifiers, self.settings)
+        for start, end, text, identifier, settings in rows:
+            caption = Caption(int(start), int(end), text.split(u'\n') if text else [])
+            caption.identifier = identifier
+            caption.raw_settings = settings
+            captions.append(caption)
+        return captions
+
+    def _copy(self, starts, ends, mask=None):
+        if mask is None:
+            return self.__class__(starts, ends, self.texts, self.identifiers, self.settings)
+        return self.__class__(
+            starts,
+            ends,
+            list(compress(self.texts, mask)),
+            list(compress(self.identifiers, mask)),
+            list(compress(self.settings, mask))
+        )
+
+    def shift(self, ms):
+        u"""Shifts all the timings by a number of milliseconds. Timings never go below zero."""
+        if numpy is not None:
+            return self._copy(numpy.maximum(self.starts + ms, 0), numpy.maximum(self.ends + ms, 0))
+        return self._copy(
+            (max(start + ms, 0) for start in self.starts),
+            (max(end + ms, 0) for end in self.ends)
+        )
+
+    def scale(self, factor, anchor=0):
+        u"""
+        Multiplies the distance of all the timings to the anchor by a factor,
+        rounding to the closest millisecond. Timings never go below zero.
+        """
+        # also validates the factor for the NumPy columns
+        func = timing.scaler(factor, anchor)
+        if numpy is not None:
+            return self._copy(
+                numpy.maximum(numpy.floor((self.starts - anchor) * factor + anchor + 0.5), 0),
+                numpy.maximum(numpy.floor((self.ends - anchor) * factor + anchor + 0.5), 0)
+            )
+        return self._copy(imap(func, self.starts), imap(func, self.ends))
+
+    def retime(self, mapping):
+        u"""
+        Retimes all the timings with a piecewise-linear mapping of source to target
+        milliseconds, given as a dict or a sequence of pairs.
+        """
+        if numpy is not None:
+            sources, targets, slopes = (numpy.asarray(values) for values in timing.segments(mapping))
+
+            def retime(column):
+                i = numpy.clip(numpy.searchsorted(sources, column, side=u'right') - 1, 0, len(slopes) - 1)
+                return numpy.maximum(numpy.floor(targets[i] + (column - sources[i]) * slopes[i] + 0.5), 0)
+            return self._copy(retime(self.starts), retime(self.ends))
+
+        func = timing.interpolator(mapping)
+        return self._copy(imap(func, self.starts), imap(func, self.ends))
+
+    def clip(self, start, end):
+        u"""
+        Keeps the captions visible between start and end (in milliseconds),
+        trimming their timings to that window.
+        """
+        if numpy is not None:
+            mask = (self.ends > start) & (self.starts < end)
+            return self._copy(
+                numpy.maximum(self.starts[mask], start),
+                numpy.minimum(self.ends[mask], end),
+                mask
+            )
+
+        mask = [e > start and s < end for s, e in izip(self.starts, self.ends)]
+        return self._copy(
+            (max(s, start) for s in compress(self.starts, mask)),
+            (min(e, end) for e in compress(self.ends, mask)),
+            mask
+        )
+
+    def filter(self, mask):
+        u"""Keeps the captions for which the mask value is true."""
+        if numpy is not None:
+            mask = numpy.asarray(mask, dtype=bool)
+            return self._copy(self.starts[mask], self.ends[mask], mask)
+
+        mask = list(mask)
+        return self._copy(compress(self.starts, mask), compress(self.ends, mask), mask)
@@ -0,0 +1,117 @@
+u"""
+Changes of the timings of captions: shift, scale and piecewise-linear retiming.
+
+The functions update the captions in place working on their timings in milliseconds
+and yield them, so they can be applied to a whole document or as a filter to the
+captions as they are parsed:
+
+    import webvtt
+    from webvtt import timing
+
+    for caption in timing.shift(webvtt.iter_captions('captions.vtt'), 1500):
+        print(caption.start)
+"""
+
+from __future__ import division
+from __future__ import absolute_import
+from bisect import bisect_right
+from math import floor
+
+from .structures import Caption
+
+__all__ = []
+
+
+def shifter(offset):
+    u"""Returns a function shifting a timing by offset milliseconds, never going below zero."""
+    offset = int(offset)
+
+    def shift(ms):
+        ms += offset
+        return ms if ms > 0 else 0
+    return shift
+
+
+def scaler(ratio, anchor=0):
+    u"""
+    Returns a function multiplying the distance of a timing to the anchor by ratio,
+    rounding to the closest millisecond.
+    """
+    if ratio <= 0:
+        raise ValueError(u'The ratio must be positive.')
+
+    def scale(ms):
+        ms = int(floor((ms - anchor) * ratio + anchor + 0.5))
+        return ms if ms > 0 else 0
+    return scale
+
+
+def segments(mapping):
+    u"""
+    Returns the sorted source and target timings of a mapping given as a dict or a sequence
+    of pairs and the slopes of the segments between them. A single point has slope 1.
+    """
+    points = sorted(mapping.items() if isinstance(mapping, dict) else mapping)
+    if not points:
+        raise ValueError(u'The mapping needs at least one point.')
+
+    sources = [source for source, _ in points]
+    targets = [target for _, target in points]
+    if any(a == b for a, b in zip(sources, sources[1:])):
+        raise ValueError(u'The source timings of the mapping must be unique.')
+    slopes = [
+        (targets[i + 1] - targets[i]) / (sources[i + 1] - sources[i]) for i in xrange(len(points) - 1)
+    ] or [1]
+    return sources, targets, slopes
+
+
+def interpolator(mapping):
+    u"""
+    Returns a piecewise-linear function from a mapping of source to target timings in
+    milliseconds, given as a dict or a sequence of pairs. Timings before the first or after
+    the last point follow the first or last segment. A single point is a shift.
+    """
+    sources, targets, slopes = segments(mapping)
+    last = len(slopes) - 1
+
+    def retime(ms):
+        # segment containing ms, extending the first and last segments
+        i = min(max(bisect_right(sources, ms) - 1, 0), last)
+        ms = int(floor(targets[i] + (ms - sources[i]) * slopes[i] + 0.5))
+        return ms if ms > 0 else 0
+    return retime
+
+
+def update(captions, func):
+    u"""Sets the timings of all the captions to the result of func on them in one pass."""
+    for caption in captions:
+        caption._start_ms = func(caption._start_ms)
+        caption._end_ms = func(caption._end_ms)
+        caption._start_timestamp = caption._end_timestamp = None
+    # the index of a document is rebuilt after any timing change
+    Caption.timing_version += 1
+
+
+def apply(captions, func):
+    u"""Sets the timings of the captions to the result of func on them as they are yielded."""
+    for caption in captions:
+        caption._start_ms = func(caption._start_ms)
+        caption._end_ms = func(caption._end_ms)
+        caption._start_timestamp = caption._end_timestamp = None
+        Caption.timing_version += 1
+        yield caption
+
+
+def shift(captions, offset):
+    u"""Shifts the timings of the captions by offset milliseconds."""
+    return apply(captions, shifter(offset))
+
+
+def scale(captions, ratio, anchor=0):
+    u"""Scales the timings of the captions by ratio around the anchor in milliseconds."""
+    return apply(captions, scaler(ratio, anchor))
+
+
+def retime(captions, mapping):
+    u"""Retimes the captions with a piecewise-linear mapping of source to target milliseconds."""
+    return apply(captions, interpolator(mapping))
@@ -1,14 +1,40 @@
 from __future__ import with_statement
 from __future__ import absolute_import
 import os
+from collections import OrderedDict
+from itertools import izip
 
-from .parsers import WebVTTParser, SRTParser, SBVParser
+from .parsers import WebVTTParser, SRTParser, SBVParser, ERRORS_STRICT, detect_format
 from .writers import WebVTTWriter, SRTWriter
-from .errors import MissingFilenameError
+from .table import CaptionTable
+from .index import CaptionIndex
+from .structures import CaptionList
+from .errors import MissingFilenameError, MalformedFileError
+from .sources import is_path, peek
+from . import background
+from . import cache
+from . import binary
+from . import timing
+from . import normalization
+from .sinks import Sink
 from io import open
 
 __all__ = [u'WebVTT']
 
+PARSERS = {
+    u'vtt': WebVTTParser,
+    u'srt': SRTParser,
+    u'sbv': SBVParser,
+}
+
+
+def _source_name(file):
+    # the name of the file is only known when reading from a path or a named file object
+    if is_path(file):
+        return file
+    name = getattr(file, u'name', None)
+    return name if isinstance(name, basestring) else u''
+
 
 class WebVTT(object):
     u"""
@@ -23,12 +49,21 @@ class WebVTT(object):
         WebVTT().from_srt('captions.srt')
 
     A list of all supported formats is available calling list_formats().
+
+    A list of captions given to the constructor is copied, so changes to the document must be
+    made through the captions property.
     """
 
-    def __init__(self, file=u'', captions=None, styles=None):
+    def __init__(self, file=u'', captions=None, styles=None, regions=None, diagnostics=None):
         self.file = file
-        self._captions = captions or []
+        # the captions are copied to a list that tracks its changes unless they already are one
+        self._captions = captions if isinstance(captions, CaptionList) else CaptionList(captions or [])
         self._styles = styles
+        self._regions = regions
+        self._diagnostics = diagnostics or []
+        self._index = None
+        self._stylesheet = None
+        self._regions_by_id = None
 
     def __len__(self):
         return len(self._captions)
@@ -46,22 +81,82 @@ class WebVTT(object):
         return u'\n'.join([unicode(c) for c in self._captions])
 
     @classmethod
-    def from_srt(cls, file):
-        u"""Reads captions from a file in SubRip format."""
-        parser = SRTParser().read(file)
-        return cls(file=file, captions=parser.captions)
+    def from_srt(cls, file, errors=ERRORS_STRICT):
+        u"""Reads captions from a file in SubRip format, accepting the same sources as read()."""
+        return cls._parse(SRTParser, file, errors)
+
+    @classmethod
+    def from_sbv(cls, file, errors=ERRORS_STRICT):
+        u"""Reads captions from a file in YouTube SBV format, accepting the same sources as read()."""
+        return cls._parse(SBVParser, file, errors)
+
+    @classmethod
+    def read(cls, file, errors=ERRORS_STRICT):
+        u"""
+        Reads a WebVTT captions file.
+        The file can be a path, the content as text or bytes, a memory mapped file or an opened file.
+
+        With errors='collect' malformed captions are skipped or repaired instead of raising
+        an error and the problems found are available in the diagnostics property.
+        """
+        return cls._parse(WebVTTParser, file, errors)
+
+    @classmethod
+    def load(cls, file, errors=ERRORS_STRICT):
+        u"""
+        Reads a captions file in any of the supported formats, accepting the same sources
+        as read(). The format is detected from the first bytes so the file is parsed once.
+        """
+        prefix, file = peek(file)
+        if not prefix:
+            raise MalformedFileError(u'The file is empty.')
+        format = detect_format(prefix)
+        if format is None:
+            raise MalformedFileError(u'The file does not have a valid format')
+        return cls._parse(PARSERS[format], file, errors)
+
+    @classmethod
+    def _parse(cls, parser_class, file, errors=ERRORS_STRICT):
+        # the parse cache returns new captions when enabled
+        captions, styles, regions, diagnostics = cache.parse(parser_class, file, errors)
+        return cls(file=_source_name(file), captions=captions, styles=styles, regions=regions,
+                   diagnostics=diagnostics)
+
+    @classmethod
+    def load_binary(cls, file):
+        u"""
+        Loads captions saved with save_binary, from a path or the data in bytes.
+        Loading the binary format is faster than parsing the captions again.
+        """
+        with binary.load(file) as document:
+            return cls(
+                # binary data always contains null bytes, like in BinaryDocument
+                file=file if isinstance(file, basestring) and b'\0' not in file else u'',
+                captions=document.captions,
+                styles=document.styles,
+                regions=document.regions
+            )
 
     @classmethod
-    def from_sbv(cls, file):
-        u"""Reads captions from a file in YouTube SBV format."""
-        parser = SBVParser().read(file)
-        return cls(file=file, captions=parser.captions)
+    def aread(cls, file, callback=None):
+        u"""
+        Reads a WebVTT captions file in a background thread and returns an AsyncResult
+        whose get() returns the WebVTT object. The callback is called with it when done.
+        """
+        return background.submit(cls.read, (file,), callback=callback)
 
     @classmethod
-    def read(cls, file):
-        u"""Reads a WebVTT captions file."""
-        parser = WebVTTParser().read(file)
-        return cls(file=file, captions=parser.captions, styles=parser.styles)
+    def from_table(cls, table):
+        u"""Creates a WebVTT document from a caption table."""
+        return cls(captions=table.to_captions())
+
+    @staticmethod
+    def iter_captions(file):
+        u"""
+        Reads a WebVTT captions file and yields the captions one by one as they are parsed,
+        without loading the whole file in memory. Accepts the same sources as read().
+        """
+        return WebVTTParser().iter_captions(file)
 
     def _get_output_file(self, output, extension=u'vtt'):
         if not output:
@@ -87,30 +182,149 @@ class WebVTT(object):
     def save(self, output=u''):
         u"""Save the document.
         If no output is provided the file will be saved in the same location. Otherwise output
-        can determine a target directory or file.
+        can determine a target directory or file, or be a Sink receiving the file with the
+        name of the document.
         """
+        if isinstance(output, Sink):
+            self._save_to_sink(output)
+            return
+
         self.file = self._get_output_file(output)
         with open(self.file, u'w', encoding=u'utf-8') as f:
             self.write(f)
 
     def save_as_srt(self, output=u''):
+        if isinstance(output, Sink):
+            self._save_to_sink(output, format=u'srt')
+            return
+
         self.file = self._get_output_file(output, extension=u'srt')
         with open(self.file, u'w', encoding=u'utf-8') as f:
             self.write(f, format=u'srt')
 
+    def _save_to_sink(self, sink, format=u'vtt'):
+        if not self.file:
+            raise MissingFilenameError
+        name = u'{}.{}'.format(os.path.splitext(os.path.basename(self.file))[0], format)
+
+        sink.write(name, self.to_bytes(format))
+
+    def save_binary(self, output):
+        u"""
+        Saves the captions, styles and regions in a compact binary format that can be loaded
+        with load_binary. The output is a path or a Sink receiving the file with the name of
+        the document and the extension vttb.
+        """
+        data = self.to_binary()
+        if isinstance(output, Sink):
+            if not self.file:
+                raise MissingFilenameError
+            output.write(u'{}.vttb'.format(os.path.splitext(os.path.basename(self.file))[0]), data)
+            return
+
+        with open(output, u'wb') as f:
+            f.write(data)
+
+    def to_binary(self):
+        u"""Returns the captions, styles and regions in the binary format as bytes."""
+        return binary.dumps(self._captions, self._styles, self._regions)
+
+    def asave(self, output=u'', callback=None):
+        u"""Saves the document in a background thread and returns an AsyncResult."""
+        return background.submit(self.save, (output,), callback=callback)
+
+    def asave_as_srt(self, output=u'', callback=None):
+        u"""Saves the document in SRT format in a background thread and returns an AsyncResult."""
+        return background.submit(self.save_as_srt, (output,), callback=callback)
+
     def write(self, f, format=u'vtt'):
         if format == u'vtt':
-            WebVTTWriter().write(self._captions, f)
+            WebVTTWriter().write(self._captions, f, styles=self._styles, regions=self._regions)
         elif format == u'srt':
             SRTWriter().write(self._captions, f)
 #        elif output_format == OutputFormat.SBV:
 #            SBVWriter().write(self._captions, f)
 
+    def to_string(self, format=u'vtt'):
+        u"""Returns the document as text in WebVTT (vtt) or SubRip (srt) format."""
+        if format == u'vtt':
+            chunks = WebVTTWriter().iter_chunks(self._captions, styles=self._styles, regions=self._regions)
+        elif format == u'srt':
+            chunks = SRTWriter().iter_chunks(self._captions)
+        else:
+            raise ValueError(u'Unsupported format: {}'.format(format))
+        return u''.join(chunks)
+
+    def to_bytes(self, format=u'vtt', encoding=u'utf-8'):
+        u"""Returns the document encoded in WebVTT (vtt) or SubRip (srt) format."""
+        return self.to_string(format).encode(encoding)
+
+    def shift(self, offset):
+        u"""Shifts the timings of all the captions by offset milliseconds, never going below zero."""
+        timing.update(self._captions, timing.shifter(offset))
+
+    def scale(self, ratio, anchor=0):
+        u"""
+        Scales the timings of all the captions by ratio around the anchor in milliseconds,
+        for example to convert between frame rates.
+        """
+        timing.update(self._captions, timing.scaler(ratio, anchor))
+
+    def retime(self, mapping):
+        u"""
+        Retimes all the captions with a piecewise-linear function given as a mapping
+        of source to target timings in milliseconds, for example to correct drift:
+
+            vtt.retime({0: 0, 600000: 601500, 1200000: 1202000})
+        """
+        timing.update(self._captions, timing.interpolator(mapping))
+
+    def normalize(self, merge=True, split=True, min_gap=0):
+        u"""
+        Sorts the captions by time and drops the zero-length ones. Captions with identical text
+        that overlap or touch are merged, overlapping captions are split into non-overlapping
+        captions with the text of all of them and captions end at least min_gap milliseconds
+        before the next one starts, which also trims overlapping captions when they are not split.
+        Merging and splitting can be disabled.
+        """
+        self._captions[:] = normalization.normalize(self._captions, merge, split, min_gap)
+
+    def collapse_rollup(self, max_gap=normalization.ROLLUP_MAX_GAP):
+        u"""
+        Collapses roll-up captions, common in captions converted from CEA-608, where every cue
+        repeats the last lines of the previous one, into pop-on captions that show every line
+        once from the time it appears. Captions more than max_gap milliseconds apart are not
+        part of the same roll-up sequence.
+        """
+        self._captions[:] = normalization.collapse_rollup(self._captions, max_gap)
+
+    def to_table(self):
+        u"""Returns the captions as a columnar CaptionTable for bulk timing operations."""
+        return CaptionTable.from_captions(self._captions)
+
     @staticmethod
     def list_formats():
         u"""Provides a list of supported formats that this class can read from."""
         return (u'WebVTT (.vtt)', u'SubRip (.srt)', u'YouTube SBV (.sbv)')
 
+    @property
+    def index(self):
+        u"""
+        Returns an index of the captions by time.
+        It is built on first use and rebuilt after the captions are modified.
+        """
+        if self._index is None or not self._index.is_valid_for(self._captions):
+            self._index = CaptionIndex(self._captions)
+        return self._index
+
+    def at(self, ms):
+        u"""Returns the captions visible at the given time in milliseconds."""
+        return self.index.at(ms)
+
+    def between(self, start, end):
+        u"""Returns the captions visible at any time between start and end in milliseconds."""
+        return self.index.between(start, end)
+
     @property
     def captions(self):
         u"""Returns the list of captions."""
@@ -121,8 +335,44 @@ class WebVTT(object):
         u"""Returns the total length of the captions."""
         if not self._captions:
             return 0
-        return int(self._captions[-1].end_in_seconds) - int(self._captions[0].start_in_seconds)
+        return self._captions[-1].end_ms // 1000 - self._captions[0].start_ms // 1000
 
     @property
     def styles(self):
         return self._styles
+
+    @property
+    def regions(self):
+        return self._regions
+
+    @property
+    def diagnostics(self):
+        u"""Returns the problems found when reading with errors='collect' as (line, kind, message)."""
+        return self._diagnostics
+
+    @property
+    def stylesheet(self):
+        u"""
+        Returns the declarations of all the style blocks as an ordered map of selector to a map
+        of property to value. Later declarations override earlier ones like in CSS.
+        """
+        # every style returns the same rules object while its lines do not change
+        rules = tuple(style.rules for style in self._styles or ())
+        if self._stylesheet is None or len(self._stylesheet[0]) != len(rules) or \
+                any(a is not b for a, b in izip(self._stylesheet[0], rules)):
+            stylesheet = OrderedDict()
+            for style_rules in rules:
+                for selector, declarations in style_rules.iteritems():
+                    stylesheet.setdefault(selector, OrderedDict()).update(declarations)
+            self._stylesheet = rules, stylesheet
+        return self._stylesheet[1]
+
+    def region(self, caption):
+        u"""Returns the region referenced by the settings of a caption or None."""
+        name = caption.settings.region
+        if name is None:
+            return None
+        regions = tuple(self._regions or ())
+        if self._regions_by_id is None or self._regions_by_id[0] != regions:
+            self._regions_by_id = regions, dict((region.id, region) for region in regions if region.id)
+        return self._regions_by_id[1].get(name)
@@ -1,33 +1,87 @@
-
 from __future__ import division
+
+CHUNK_PARTS = 8192  # number of strings joined in each write
+
+WEBVTT_TIMINGS = u'%02d:%02d:%02d.%03d --> %02d:%02d:%02d.%03d'
+SRT_TIMINGS = u'%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d'
+
+
+def _timings(template, start_ms, end_ms):
+    u"""Formats both timestamps of a caption with a single formatting operation."""
+    start, start_milliseconds = divmod(start_ms, 1000)
+    start_minutes, start_seconds = divmod(start, 60)
+    end, end_milliseconds = divmod(end_ms, 1000)
+    end_minutes, end_seconds = divmod(end, 60)
+    return template % (
+        start_minutes // 60, start_minutes % 60, start_seconds, start_milliseconds,
+        end_minutes // 60, end_minutes % 60, end_seconds, end_milliseconds
+    )
+
+
 class WebVTTWriter(object):
 
-    def write(self, captions, f):
-        f.write(u'WEBVTT\n')
+    def write(self, captions, f, styles=None, regions=None):
+        for chunk in self.iter_chunks(captions, styles, regions):
+            f.write(chunk)
+
+    def iter_chunks(self, captions, styles=None, regions=None):
+        u"""Yields the document in large strings so it is written with few calls."""
+        parts = [u'WEBVTT\n']
+        append = parts.append
+        timings = _timings
+
+        for region in regions or ():
+            append(u'\nREGION\n{}\n'.format(region.text))
+        for style in styles or ():
+            append(u'\nSTYLE\n')
+            for line in style.lines:
+                append(line + u'\n')
+
         for c in captions:
-            if c.identifier:
-                f.write(u'\n' + c.identifier)
-            f.write(u'\n{} --> {}\n'.format(c.start, c.end))
-            f.writelines([u'{}\n'.format(l) for l in c.lines])
+            identifier, settings, lines = c.identifier, c.raw_settings, c.lines
+            if identifier:
+                append(u'\n' + identifier)
+            if settings:
+                append(u'\n' + timings(WEBVTT_TIMINGS, c.start_ms, c.end_ms) + u' ' + settings + u'\n')
+            else:
+                append(u'\n' + timings(WEBVTT_TIMINGS, c.start_ms, c.end_ms) + u'\n')
+            if lines:
+                append(u'\n'.join(lines) + u'\n')
+
+            if len(parts) >= CHUNK_PARTS:
+                yield u''.join(parts)
+                del parts[:]
+
+        if parts:
+            yield u''.join(parts)
 
 
 class SRTWriter(object):
 
     def write(self, captions, f):
+        for chunk in self.iter_chunks(captions):
+            f.write(chunk)
+
+    def iter_chunks(self, captions):
+        u"""Yields the document in large strings so it is written with few calls."""
+        parts = []
+        append = parts.append
+        timings = _timings
+
         for line_number, caption in enumerate(captions, start=1):
-            f.write(u'{}\n'.format(line_number))
-            f.write(u'{} --> {}\n'.format(self._to_srt_timestamp(caption.start_in_seconds),
-                                         self._to_srt_timestamp(caption.end_in_seconds)))
-            f.writelines([u'{}\n'.format(l) for l in caption.lines])
-            f.write(u'\n')
-
-    def _to_srt_timestamp(self, total_seconds):
-        hours = int(total_seconds / 3600)
-        minutes = int(total_seconds / 60 - hours * 60)
-        seconds = int(total_seconds - hours * 3600 - minutes * 60)
-        milliseconds = int(round((total_seconds - seconds - hours * 3600 - minutes * 60)*1000))
-
-        return u'{:02d}:{:02d}:{:02d},{:03d}'.format(hours, minutes, seconds, milliseconds)
+            append(u'%d\n' % line_number + timings(SRT_TIMINGS, caption.start_ms, caption.end_ms) + u'\n')
+            lines = caption.lines
+            if lines:
+                append(u'\n'.join(lines) + u'\n\n')
+            else:
+                append(u'\n')
+
+            if len(parts) >= CHUNK_PARTS:
+                yield u''.join(parts)
+                del parts[:]
+
+        if parts:
+            yield u''.join(parts)
 
 
 class SBVWriter(object):